@@ -23,6 +23,7 @@ from utils.validators import (
     calculate_bmi,
     assess_health,
     generate_patient_id,
+    patient_id_prefix,
     calculate_ideal_body_weight,
     validate_patient_registration_form
 )
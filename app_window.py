@@ -4,11 +4,18 @@ from tkinter import ttk
 import tkinter as tk
 from tkinter import messagebox
 from ui.forms import PatientForm
-from database.patient_manager import refresh_treeview, search_patient
+from database.patient_manager import get_patient_record, fill_treeview, follow_patient_changes, LIST_PROJECTION
+from database.patient_search import BASIC_SEARCH_COLUMNS
 from ui.photo_handler import load_image, take_picture, add_photo
 from utils.crypto import check_trial_status, show_expiry_message
 from functools import partial
 from ui.forms import HealthHistoryForm
+from ui.patient_list import VirtualPatientList
+from ui.virtual_list import VirtualTreeview
+from ui.export_dialog import open_export_dialog
+from ui.cohort_panel import open_cohort_panel
+from ui.stats_panel import open_stats_panel
+from ui.live_search import LiveSearch
 
 def run_app(db_path):
     """Launch the main application window."""
@@ -51,15 +58,22 @@ def run_app(db_path):
         "Email", "Profession", "Telephone", "Marital Status"
     )
 
-    treeview = ttk.Treeview(data_area, columns=columns, show="headings",
-                            yscrollcommand=None, xscrollcommand=None)
+    treeview = VirtualTreeview(data_area, columns=columns, show="headings")
     for col in columns:
         treeview.heading(col, text=col)
         treeview.column(col, width=100)
+    scrollbar_y = ttk.Scrollbar(data_area, orient=tk.VERTICAL, command=treeview.yview)
+    treeview.configure(yscrollcommand=scrollbar_y.set)
+    scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
     treeview.pack(fill=tk.BOTH, expand=True)
 
+    # Only the visible rows are drawn; they are read a page at a time as the user scrolls
+    patient_list = VirtualPatientList(treeview, db_path, columns=LIST_PROJECTION)
+    # Each saved or deleted patient updates just its own row
+    follow_patient_changes(treeview, db_path)
+
     # Initialize PatientForm
-    patient_form = PatientForm(form_frame, db_path, treeview, lambda: refresh_treeview(treeview, db_path), photo_label)
+    patient_form = PatientForm(form_frame, db_path, treeview, photo_label)
 
     # Initialize HealthHistoryForm below the patient form
     health_form = HealthHistoryForm(form_area)
@@ -73,21 +87,46 @@ def run_app(db_path):
     search_entry = ttk.Entry(search_frame)
     search_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
 
-    ttk.Button(search_frame, text="Search", command=lambda: search_patient(treeview, db_path, search_entry.get())).pack(
+    def show_search_results(rows):
+        fill_treeview(treeview, rows)
+
+    # Results follow the search box as the user types; clearing it brings
+    # back the paged list of every patient
+    live_search = LiveSearch(search_entry, db_path, show_search_results, on_clear=patient_list.reload,
+                             columns=BASIC_SEARCH_COLUMNS, select=LIST_PROJECTION)
+
+    def refresh():
+        live_search.reset()
+        patient_list.reload()
+
+    def show_cohort(rows):
+        live_search.cancel()
+        show_search_results(rows)
+
+    ttk.Button(search_frame, text="Search", command=lambda: live_search.search_now(force=True)).pack(
+        side=tk.LEFT, padx=5)
+    ttk.Button(search_frame, text="Refresh", command=refresh).pack(
+        side=tk.LEFT, padx=5)
+    ttk.Button(search_frame, text="Filters",
+               command=lambda: open_cohort_panel(root, db_path, show_cohort, LIST_PROJECTION)).pack(
+        side=tk.LEFT, padx=5)
+    ttk.Button(search_frame, text="Export", command=lambda: open_export_dialog(root, db_path)).pack(
         side=tk.LEFT, padx=5)
-    ttk.Button(search_frame, text="Refresh", command=lambda: refresh_treeview(treeview, db_path)).pack(
+    ttk.Button(search_frame, text="Dashboard", command=lambda: open_stats_panel(root, db_path)).pack(
         side=tk.LEFT, padx=5)
 
-    # Populate existing data
-    refresh_treeview(treeview, db_path)
+    # Populate the first page of existing data
+    patient_list.reload()
 
-    # Bind selection to populate forms
+    # Bind selection to populate forms from the full patient record
     def on_select(event):
         selected_item = treeview.focus()
         if selected_item:
-            item_values = treeview.item(selected_item, 'values')
-            health_form.populate_health_form(item_values)
-            patient_form.populate_form(item_values)
+            patient_id = treeview.item(selected_item, 'values')[0]
+            record = get_patient_record(db_path, patient_id)
+            if record:
+                health_form.populate_health_form(record)
+                patient_form.populate_form(record)
 
     treeview.bind("<<TreeviewSelect>>", on_select)
 
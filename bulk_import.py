@@ -0,0 +1,330 @@
+# pulse/database/bulk_import.py
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+
+from database.db_manager import get_connection_manager, get_db_path
+from database.migrations import migrate
+from database.statements import PATIENT_COLUMNS, CONDITION_COLUMNS, insert_patients
+from database.name_index import index_names
+from database.date_index import backfill_date_index
+from database.query_cache import get_query_cache
+from database.patient_index import get_patient_index
+from database.uid_allocator import allocate_file_uids, file_uids_in_use
+from database.patient_fields import (
+    is_valid_date, validate_name, validate_email, validate_phone, validate_weight,
+    validate_height, validate_blood_pressure, validate_pulse, validate_temperature,
+    calculate_age, calculate_bmi, get_weight_status, calculate_ideal_body_weight
+)
+
+BATCH_SIZE = 1000
+
+REQUIRED_FIELDS = ('name', 'birth_date', 'gender')
+
+TRUE_VALUES = ('1', 'yes', 'y', 'true', 'x', 'oui')
+
+
+class RowError(ValueError):
+    """Raised when a source row cannot be turned into a patient record."""
+
+
+class ImportReport:
+    """Counters, per-row errors and timing of one import run."""
+
+    def __init__(self, source):
+        self.source = source
+        self.rows_read = 0
+        self.imported = 0
+        self.batches = 0
+        self.errors = []  # (line number, message)
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def summary(self):
+        return (
+            f"{self.source}: {self.imported}/{self.rows_read} rows imported in "
+            f"{self.batches} batches, {len(self.errors)} errors, "
+            f"{self.elapsed:.2f} s ({self.rows_per_second:.0f} rows/s)"
+        )
+
+
+def read_csv(path):
+    """Yield (line number, row dict) pairs from a CSV file with a header row."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def read_jsonl(path):
+    """Yield (line number, row dict) pairs from a file of one JSON object per line."""
+    with open(path, encoding='utf-8-sig') as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_num, RowError(f"invalid JSON: {e}")
+                continue
+            if not isinstance(row, dict):
+                row = RowError("expected a JSON object")
+            yield line_num, row
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
+
+
+def _text(row, field):
+    value = row.get(field)
+    return '' if value is None else str(value).strip()
+
+
+def _flag(row, field):
+    return 1 if _text(row, field).lower() in TRUE_VALUES else 0
+
+
+def _check(row, field, validator, message):
+    """Return the stripped field, or '' if empty; raise RowError if it fails validation."""
+    value = _text(row, field)
+    if value and not validator(value):
+        raise RowError(f"{field}: {message} ({value!r})")
+    return value
+
+
+def prepare_row(row, today, used_uids):
+    """
+    Validate a source row and compute the derived patient fields.
+
+    Args:
+        row (dict): Column name -> raw value, as read from the source file.
+        today (str): Registration date stamped on the record ('dd-mm-yyyy').
+        used_uids (set): file_UIDs given by earlier rows of this run.
+
+    Returns:
+        tuple: Values in PATIENT_COLUMNS order. file_UID is None when the
+        row has none; `assign_file_uids` numbers it when the batch is written.
+
+    Raises:
+        RowError: If a required field is missing or a value is invalid.
+    """
+    missing = [field for field in REQUIRED_FIELDS if not _text(row, field)]
+    if missing:
+        raise RowError("missing " + ", ".join(missing))
+
+    name = _check(row, 'name', validate_name, "letters, spaces, hyphens and apostrophes only")
+    birth_date = _check(row, 'birth_date', lambda v: is_valid_date(v, "%d-%m-%Y"), "expected dd-mm-yyyy")
+    gender = _text(row, 'gender').capitalize()
+    if gender not in ('Male', 'Female'):
+        raise RowError(f"gender: expected Male or Female ({gender!r})")
+
+    weight = _check(row, 'weight', validate_weight, "must be a positive number")
+    height = _check(row, 'height', validate_height, "expected meters between 0.5 and 2.5")
+    systolic_bp = _text(row, 'systolic_bp')
+    diastolic_bp = _text(row, 'diastolic_bp')
+    if (systolic_bp or diastolic_bp) and not validate_blood_pressure(systolic_bp, diastolic_bp):
+        raise RowError(f"blood pressure out of range ({systolic_bp}/{diastolic_bp})")
+    pulse = _check(row, 'pulse', validate_pulse, "expected 30-200")
+    temperature = _check(row, 'temperature', validate_temperature, "expected 34-42")
+    email = _check(row, 'email', validate_email, "invalid email")
+    telephone = _check(row, 'telephone', validate_phone, "invalid phone number")
+
+    weight = float(weight) if weight else None
+    height = float(height) if height else None
+    bmi = calculate_bmi(weight, height) if weight and height else None
+
+    file_uid = _text(row, 'file_UID')
+    if file_uid:
+        if file_uid in used_uids:
+            raise RowError(f"file_UID: used by an earlier row ({file_uid!r})")
+        used_uids.add(file_uid)
+
+    values = {
+        'name': name,
+        'birth_date': birth_date,
+        'current_date': _text(row, 'current_date') or today,
+        'age': calculate_age(birth_date),
+        'weight': weight,
+        'height': height,
+        'bmi': bmi,
+        'weight_status': get_weight_status(bmi),
+        'systolic_bp': int(systolic_bp) if systolic_bp else None,
+        'diastolic_bp': int(diastolic_bp) if diastolic_bp else None,
+        'pulse': int(pulse) if pulse else None,
+        'temperature': float(temperature) if temperature else None,
+        'gender': gender,
+        'menses': _text(row, 'menses') or None,
+        'photo_path': _text(row, 'photo_path'),
+        'email': email,
+        'telephone': telephone,
+        'ideal_weight': calculate_ideal_body_weight(height, gender) if height else None,
+        'file_UID': file_uid or None,
+        'qrcode': '',
+    }
+    for field in ('glucose', 'cholesterol', 'uric_acid'):
+        value = _text(row, field)
+        try:
+            values[field] = float(value) if value else 0
+        except ValueError:
+            raise RowError(f"{field}: must be a number ({value!r})")
+    for field in ('address', 'profession', 'marital_status', 'alerts', 'observations'):
+        values[field] = _text(row, field)
+    for field in CONDITION_COLUMNS:
+        values[field] = _flag(row, field)
+
+    return tuple(values[col] for col in PATIENT_COLUMNS)
+
+
+_UID = PATIENT_COLUMNS.index('file_UID')
+_GENDER = PATIENT_COLUMNS.index('gender')
+_BIRTH_DATE = PATIENT_COLUMNS.index('birth_date')
+
+
+def assign_file_uids(conn, records, report):
+    """
+    Reject rows whose file_UID is already registered and number the others.
+
+    Rows without a file_UID get one from the sequence allocator, which
+    reserves the numbers of each prefix in the batch as one block. Runs in
+    the batch's write transaction, begun IMMEDIATE so that another instance
+    cannot take a checked file_UID before the batch is inserted.
+
+    Args:
+        conn (sqlite3.Connection): Connection writing the batch.
+        records (list): (line number, prepare_row values) pairs.
+        report (ImportReport): Receives the rejected rows.
+
+    Returns:
+        list: The values to insert.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    taken = file_uids_in_use(conn, [values[_UID] for _, values in records if values[_UID]])
+    kept = []
+    for line_num, values in records:
+        if values[_UID] in taken:
+            report.errors.append((line_num, f"file_UID: already registered ({values[_UID]!r})"))
+        else:
+            kept.append(values)
+    missing = [i for i, values in enumerate(kept) if not values[_UID]]
+    uids = allocate_file_uids(conn, [(kept[i][_GENDER], kept[i][_BIRTH_DATE]) for i in missing])
+    for i, uid in zip(missing, uids):
+        kept[i] = kept[i][:_UID] + (uid,) + kept[i][_UID + 1:]
+    return kept
+
+
+def import_patients(db_path, path, file_format=None, batch_size=BATCH_SIZE, dry_run=False, progress=None):
+    """
+    Stream patients from a CSV or JSONL file into the database.
+
+    Rows are validated and completed (age, BMI, weight status, ideal weight,
+    file_UID) a batch at a time, and each batch is written with one
+    executemany in its own transaction. Invalid rows are skipped and
+    reported with their line number; they never abort the import.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        path (str): Source file; column names match the `patients` table.
+        file_format (str): 'csv' or 'jsonl' (default: from the file extension).
+        batch_size (int): Rows per transaction.
+        dry_run (bool): Validate only, write nothing.
+        progress (callable): Called with the report after every batch.
+
+    Returns:
+        ImportReport: Counts, errors and throughput of the run.
+    """
+    if file_format is None:
+        file_format = 'jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson') else 'csv'
+    rows = READERS[file_format](path)
+    report = ImportReport(path)
+    manager = get_connection_manager(db_path)
+    if not dry_run:
+        migrate(manager.connection())
+    used_uids = set()
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        today = datetime.now().strftime("%d-%m-%Y")
+        records = []
+        for line_num, row in batch:
+            report.rows_read += 1
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                records.append((line_num, prepare_row(row, today, used_uids)))
+            except RowError as e:
+                report.errors.append((line_num, str(e)))
+        if records and not dry_run:
+            with manager.transaction() as conn:
+                records = assign_file_uids(conn, records, report)
+                insert_patients(conn, records, index=False)
+        report.imported += len(records)
+        report.batches += 1
+        if progress is not None:
+            progress(report)
+
+    if report.imported and not dry_run:
+        # Names and dates were only queued per batch; build their indexes
+        # afterwards, the dates in batches of their own
+        with manager.transaction() as conn:
+            index_names(conn)
+        backfill_date_index(manager.connection())
+        get_query_cache(db_path).invalidate()
+        get_patient_index(db_path).clear()
+    return report.finish()
+
+
+def write_errors(report, path):
+    """Write the rejected rows of a report to a CSV file (line, error)."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(('line', 'error'))
+        writer.writerows(report.errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import patients from a CSV or JSONL file.")
+    parser.add_argument('source', help="CSV (with header) or JSONL file of patients")
+    parser.add_argument('--db', default=None, help="database path (default: the configured database)")
+    parser.add_argument('--format', choices=sorted(READERS), default=None, help="input format (default: from extension)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="rows per transaction")
+    parser.add_argument('--errors', default=None, help="write rejected rows to this CSV file")
+    parser.add_argument('--dry-run', action='store_true', help="validate only, do not write")
+    args = parser.parse_args(argv)
+
+    def progress(report):
+        print(f"\r{report.rows_read} rows read, {report.imported} valid, {len(report.errors)} errors",
+              end='', file=sys.stderr, flush=True)
+
+    report = import_patients(args.db or get_db_path(), args.source, args.format,
+                             args.batch_size, args.dry_run, progress)
+    print(file=sys.stderr)
+    print(report.summary())
+    for line_num, message in report.errors[:20]:
+        print(f"  line {line_num}: {message}")
+    if len(report.errors) > 20:
+        print(f"  ... {len(report.errors) - 20} more")
+    if args.errors:
+        write_errors(report, args.errors)
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# pulse/database/clinic_stats.py
+
+from datetime import date, timedelta
+
+from database.statements import CONDITION_COLUMNS
+from database.date_index import DATE_TABLES, refresh_date_index
+
+STATS_TABLE = 'clinic_stats'
+
+# Patient columns whose clinic-wide average is kept
+VITAL_COLUMNS = (
+    'age', 'weight', 'height', 'bmi', 'systolic_bp', 'diastolic_bp',
+    'pulse', 'temperature', 'glucose', 'cholesterol', 'uric_acid'
+)
+
+# Vital totals are kept in hundredths of a unit, as whole numbers: adding and
+# subtracting them is exact, so the running totals always equal a rebuild
+VITAL_SCALE = 100
+
+# Patient columns the summary rows depend on
+_TRACKED_COLUMNS = ('gender', 'weight_status') + CONDITION_COLUMNS + VITAL_COLUMNS
+
+# Days of visit counts returned by default
+STATS_DAYS = 30
+
+
+def _is_number(expr):
+    # Text the forms could not convert to a number is left out of averages
+    return f"(typeof({expr}) IN ('integer', 'real'))"
+
+
+def _scaled(expr):
+    return f"CAST(ROUND({expr} * {VITAL_SCALE}) AS INTEGER)"
+
+
+def _patient_deltas(row, sign):
+    """VALUES rows adding (sign 1) or removing (sign -1) one patient from the summary."""
+    deltas = [
+        f"('patients', '', {sign}, 0)",
+        f"('gender', COALESCE({row}.gender, ''), {sign}, 0)",
+        f"('weight_status', COALESCE({row}.weight_status, ''), {sign}, 0)",
+    ]
+    deltas += [f"('condition', '{col}', {sign} * (COALESCE({row}.{col}, 0) != 0), 0)"
+               for col in CONDITION_COLUMNS]
+    deltas += [f"('vital', '{col}', {sign} * {_is_number(f'{row}.{col}')}, "
+               f"CASE WHEN {_is_number(f'{row}.{col}')} THEN {sign} * {_scaled(f'{row}.{col}')} ELSE 0 END)"
+               for col in VITAL_COLUMNS]
+    return ', '.join(deltas)
+
+
+def _upsert(values):
+    return (f"INSERT INTO {STATS_TABLE}(metric, key, count, total) VALUES {values} "
+            f"ON CONFLICT(metric, key) DO UPDATE SET "
+            f"count = count + excluded.count, total = total + excluded.total;")
+
+
+def _drop_empty(metric, key):
+    # Keys no row has any more are removed, as a rebuild would not list them
+    return f"DELETE FROM {STATS_TABLE} WHERE metric = '{metric}' AND key = {key} AND count = 0;"
+
+
+def _drop_empty_patient_keys(row):
+    return ' '.join(_drop_empty(col, f"COALESCE({row}.{col}, '')") for col in ('gender', 'weight_status'))
+
+
+def create_clinic_stats(conn):
+    """
+    Create the clinic statistics summary table, its triggers, and fill it.
+
+    Each (metric, key) row holds a count and, for vitals, a running total:
+    patients per gender, weight status and condition flag, the number of
+    values and their sum (in VITAL_SCALE units) per vital, total patients
+    and visits, and visits per ISO day. Triggers add and subtract each
+    written row and drop keys whose count falls to zero, so reading the
+    dashboard costs a few dozen rows whatever the size of the history.
+    Visits per day follow `visit_dates`, i.e. they are counted once a
+    visit's date has been normalized by the date index.
+    """
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+            metric TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (metric, key)
+        ) WITHOUT ROWID
+    ''')
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS patients_stats_ai AFTER INSERT ON patients BEGIN
+            {_upsert(_patient_deltas('new', 1))}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS patients_stats_ad AFTER DELETE ON patients BEGIN
+            {_upsert(_patient_deltas('old', -1))}
+            {_drop_empty_patient_keys('old')}
+        END
+    ''')
+    tracked = ', '.join(f'"{col}"' for col in _TRACKED_COLUMNS)
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS patients_stats_au AFTER UPDATE OF {tracked} ON patients BEGIN
+            {_upsert(_patient_deltas('old', -1))}
+            {_upsert(_patient_deltas('new', 1))}
+            {_drop_empty_patient_keys('old')}
+        END
+    ''')
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS visits_stats_ai AFTER INSERT ON visits BEGIN
+            {_upsert("('visits', '', 1, 0)")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS visits_stats_ad AFTER DELETE ON visits BEGIN
+            {_upsert("('visits', '', -1, 0)")}
+        END
+    ''')
+
+    visit_dates = DATE_TABLES['visits'].shadow
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {visit_dates}_stats_ai AFTER INSERT ON {visit_dates}
+        WHEN new.visit_date IS NOT NULL BEGIN
+            {_upsert("('visit_day', new.visit_date, 1, 0)")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {visit_dates}_stats_ad AFTER DELETE ON {visit_dates}
+        WHEN old.visit_date IS NOT NULL BEGIN
+            {_upsert("('visit_day', old.visit_date, -1, 0)")}
+            {_drop_empty('visit_day', 'old.visit_date')}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {visit_dates}_stats_au AFTER UPDATE OF visit_date ON {visit_dates} BEGIN
+            {_upsert("('visit_day', COALESCE(old.visit_date, ''), -(old.visit_date IS NOT NULL), 0)")}
+            {_upsert("('visit_day', COALESCE(new.visit_date, ''), new.visit_date IS NOT NULL, 0)")}
+            {_drop_empty('visit_day', "COALESCE(old.visit_date, '')")}
+            {_drop_empty('visit_day', "COALESCE(new.visit_date, '')")}
+        END
+    ''')
+    rebuild_clinic_stats(conn)
+
+
+def rebuild_clinic_stats(conn):
+    """
+    Recompute the summary from the patients, visits and visit_dates tables.
+
+    Used to fill the table when it is created. The triggers keep the table
+    equal to what this computes, so running it again changes nothing
+    unless the triggers were bypassed. The caller commits.
+    """
+    conn.execute(f"DELETE FROM {STATS_TABLE}")
+    insert = f"INSERT INTO {STATS_TABLE}(metric, key, count, total) "
+    conn.execute(insert + "SELECT 'patients', '', COUNT(*), 0 FROM patients")
+    conn.execute(insert + "SELECT 'visits', '', COUNT(*), 0 FROM visits")
+    for col in ('gender', 'weight_status'):
+        conn.execute(insert + f"SELECT '{col}', COALESCE({col}, ''), COUNT(*), 0 FROM patients "
+                              f"GROUP BY COALESCE({col}, '')")
+
+    sums = [f"TOTAL(COALESCE({col}, 0) != 0)" for col in CONDITION_COLUMNS]
+    for col in VITAL_COLUMNS:
+        sums.append(f"TOTAL({_is_number(col)})")
+        sums.append(f"TOTAL(CASE WHEN {_is_number(col)} THEN {_scaled(col)} END)")
+    values = conn.execute(f"SELECT {', '.join(sums)} FROM patients").fetchone()
+    conditions, vitals = values[:len(CONDITION_COLUMNS)], values[len(CONDITION_COLUMNS):]
+    conn.executemany(insert + "VALUES ('condition', ?, ?, 0)",
+                     ((col, int(count)) for col, count in zip(CONDITION_COLUMNS, conditions)))
+    conn.executemany(insert + "VALUES ('vital', ?, ?, ?)",
+                     ((col, int(vitals[2 * i]), vitals[2 * i + 1]) for i, col in enumerate(VITAL_COLUMNS)))
+
+    conn.execute(insert + f"SELECT 'visit_day', visit_date, COUNT(*), 0 FROM {DATE_TABLES['visits'].shadow} "
+                          f"WHERE visit_date IS NOT NULL GROUP BY visit_date")
+
+
+def read_clinic_stats(conn, days=STATS_DAYS, today=None):
+    """
+    Return the clinic statistics from the summary table.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        days (int): Number of days of visit counts, ending today.
+        today (date): Last day of the visit counts (default: today).
+
+    Returns:
+        dict: 'patients' and 'visits' totals; 'gender', 'weight_status' and
+        'conditions' as {key: patient count}; 'vitals' as
+        {column: (average or None, number of values)}; 'visits_per_day' as
+        a list of (ISO day, visits) for every day of the period, oldest first.
+    """
+    refresh_date_index(conn)  # counts visits per day of recently written visits
+    stats = {'patients': 0, 'visits': 0, 'gender': {}, 'weight_status': {},
+             'conditions': dict.fromkeys(CONDITION_COLUMNS, 0), 'vitals': {}}
+    vitals = {}
+    for metric, key, count, total in conn.execute(
+            f"SELECT metric, key, count, total FROM {STATS_TABLE} WHERE metric != 'visit_day'"):
+        if metric in ('patients', 'visits'):
+            stats[metric] = count
+        elif metric == 'condition':
+            stats['conditions'][key] = count
+        elif metric == 'vital':
+            vitals[key] = (total / count / VITAL_SCALE if count else None, count)
+        elif count:
+            stats[metric][key] = count
+    stats['vitals'] = {col: vitals.get(col, (None, 0)) for col in VITAL_COLUMNS}
+
+    today = today or date.today()
+    first = today - timedelta(days=days - 1)
+    counts = dict(conn.execute(
+        f"SELECT key, count FROM {STATS_TABLE} WHERE metric = 'visit_day' AND key BETWEEN ? AND ?",
+        (first.isoformat(), today.isoformat())).fetchall())
+    period = (first + timedelta(days=offset) for offset in range(days))
+    stats['visits_per_day'] = [(day.isoformat(), counts.get(day.isoformat(), 0)) for day in period]
+    return stats
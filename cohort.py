@@ -0,0 +1,56 @@
+# pulse/database/cohort.py
+
+from database.patient_index import get_patient_index
+
+FETCH_CHUNK = 500  # ids per IN (...) query when reading a cohort's rows
+
+
+def cohort_ids(db_path, conditions=(), without=(), **ranges):
+    """
+    Return the ids of patients matching a cohort filter.
+
+    Flags are answered from the in-memory bitmaps of the patient index, so
+    "diabetes AND hypertension AND smoking" costs a few bitwise ANDs; only
+    the patients left over are checked against the ranges.
+
+    Args:
+        db_path (str): Path to the database.
+        conditions (iterable): Condition flags every patient must have.
+        without (iterable): Condition flags no patient may have.
+        **ranges: age, bmi, systolic_bp or diastolic_bp mapped to an
+            inclusive (low, high) pair; None leaves that side open.
+
+    Returns:
+        list: Matching patient ids in ascending order.
+    """
+    ranges = {col: bounds for col, bounds in ranges.items()
+              if bounds is not None and bounds != (None, None)}
+    return get_patient_index(db_path).select(conditions, without, ranges)
+
+
+def cohort_patients(conn, db_path, conditions=(), without=(), select='*', limit=None, **ranges):
+    """
+    Return patient rows matching a cohort filter, in id order.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        db_path (str): Path to the database (selects the patient index).
+        conditions, without, **ranges: As for `cohort_ids`.
+        select (str): Projection of `patients` columns to return.
+        limit (int): Maximum number of rows.
+
+    Returns:
+        list: Matching patient rows.
+    """
+    ids = cohort_ids(db_path, conditions, without, **ranges)
+    if limit is not None:
+        ids = ids[:limit]
+    rows = []
+    for start in range(0, len(ids), FETCH_CHUNK):
+        chunk = ids[start:start + FETCH_CHUNK]
+        placeholders = ', '.join('?' for _ in chunk)
+        rows.extend(conn.execute(
+            f"SELECT {select} FROM patients WHERE id IN ({placeholders}) ORDER BY id", chunk
+        ).fetchall())
+    return rows
+
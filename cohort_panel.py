@@ -0,0 +1,131 @@
+# pulse/ui/cohort_panel.py
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from database.cohort import cohort_patients
+from database.db_worker import get_db_worker, deliver
+
+CONDITION_LABELS = (
+    ("Diabetes", "diabetes"),
+    ("Kidney Disease", "kidney"),
+    ("Epilepsy", "epilepsy"),
+    ("Allergy", "allergy"),
+    ("Asthma", "asthma"),
+    ("Heart Disease", "heart"),
+    ("Cancer", "cancer"),
+    ("Surgery", "surgery"),
+    ("Stroke", "stroke"),
+    ("Hypertension", "hypertension"),
+    ("Hypotension", "hypotension"),
+    ("Smoking", "smoking"),
+    ("Sports", "sports"),
+    ("Alcohol", "alcohol"),
+)
+
+RANGE_LABELS = (
+    ("Age", "age"),
+    ("BMI", "bmi"),
+    ("Systolic BP", "systolic_bp"),
+    ("Diastolic BP", "diastolic_bp"),
+)
+
+CHOICES = ("Any", "Yes", "No")
+
+
+def open_cohort_panel(root, db_path, on_results, select='*'):
+    """
+    Open a window to filter patients by conditions and by age, BMI and BP ranges.
+
+    Args:
+        root: Tkinter root window.
+        db_path: Path to the SQLite database.
+        on_results (callable): Called on the Tk thread with the matching rows.
+        select (str): Projection of `patients` columns passed to on_results.
+    """
+    panel = tk.Toplevel(root)
+    panel.title("Patient Filters")
+    panel.resizable(False, False)
+    panel.transient(root)
+
+    condition_frame = ttk.LabelFrame(panel, text="Conditions", padding=(10, 10))
+    condition_frame.grid(row=0, column=0, sticky='nsew', padx=10, pady=5)
+    condition_vars = {}
+    for index, (label, key) in enumerate(CONDITION_LABELS):
+        row, col = divmod(index, 3)
+        ttk.Label(condition_frame, text=label).grid(row=row, column=2 * col, sticky='w', padx=5, pady=2)
+        var = tk.StringVar(value="Any")
+        ttk.Combobox(condition_frame, textvariable=var, values=CHOICES, state='readonly', width=5).grid(
+            row=row, column=2 * col + 1, sticky='w', padx=5, pady=2)
+        condition_vars[key] = var
+
+    range_frame = ttk.LabelFrame(panel, text="Ranges (inclusive)", padding=(10, 10))
+    range_frame.grid(row=1, column=0, sticky='nsew', padx=10, pady=5)
+    ttk.Label(range_frame, text="Min").grid(row=0, column=1, padx=5)
+    ttk.Label(range_frame, text="Max").grid(row=0, column=2, padx=5)
+    range_entries = {}
+    for row, (label, key) in enumerate(RANGE_LABELS, start=1):
+        ttk.Label(range_frame, text=label).grid(row=row, column=0, sticky='w', padx=5, pady=2)
+        low_entry = ttk.Entry(range_frame, width=8)
+        low_entry.grid(row=row, column=1, padx=5, pady=2)
+        high_entry = ttk.Entry(range_frame, width=8)
+        high_entry.grid(row=row, column=2, padx=5, pady=2)
+        range_entries[key] = (low_entry, high_entry)
+
+    status_var = tk.StringVar(value="")
+    ttk.Label(panel, textvariable=status_var).grid(row=3, column=0, sticky='w', padx=10)
+
+    def read_filters():
+        conditions = [key for key, var in condition_vars.items() if var.get() == "Yes"]
+        without = [key for key, var in condition_vars.items() if var.get() == "No"]
+        ranges = {}
+        for label, key in RANGE_LABELS:
+            bounds = []
+            for entry in range_entries[key]:
+                text = entry.get().strip()
+                if not text:
+                    bounds.append(None)
+                    continue
+                try:
+                    bounds.append(float(text))
+                except ValueError:
+                    raise ValueError(f"{label} bounds must be numbers.")
+            ranges[key] = tuple(bounds)
+        return conditions, without, ranges
+
+    def on_apply():
+        try:
+            conditions, without, ranges = read_filters()
+        except ValueError as e:
+            messagebox.showwarning("Patient Filters", str(e), parent=panel)
+            return
+
+        def show(rows):
+            apply_button.config(state=tk.NORMAL)
+            status_var.set(f"{len(rows)} patients")
+            on_results(rows)
+
+        def fail(e):
+            apply_button.config(state=tk.NORMAL)
+            status_var.set("")
+            messagebox.showerror("Filter Error", f"Could not filter patients:\n{e}", parent=panel)
+
+        apply_button.config(state=tk.DISABLED)
+        status_var.set("Filtering...")
+        future = get_db_worker(db_path).submit(
+            cohort_patients, db_path, conditions, without, select=select, **ranges)
+        deliver(panel, future, show, fail)
+
+    def on_reset():
+        for var in condition_vars.values():
+            var.set("Any")
+        for low_entry, high_entry in range_entries.values():
+            low_entry.delete(0, tk.END)
+            high_entry.delete(0, tk.END)
+        status_var.set("")
+
+    button_frame = ttk.Frame(panel)
+    button_frame.grid(row=2, column=0, sticky='e', padx=10, pady=5)
+    ttk.Button(button_frame, text="Reset", command=on_reset).pack(side=tk.LEFT, padx=5)
+    apply_button = ttk.Button(button_frame, text="Apply", command=on_apply)
+    apply_button.pack(side=tk.LEFT, padx=5)
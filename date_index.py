@@ -0,0 +1,246 @@
+# pulse/database/date_index.py
+
+from collections import namedtuple
+from datetime import date, datetime
+
+# Dates are stored as typed in the forms; DateEntry widgets without an
+# explicit pattern use the locale's short format.
+DATE_FORMATS = ("%d-%m-%Y", "%Y-%m-%d", "%m/%d/%y", "%m/%d/%Y", "%d/%m/%Y")
+
+BACKFILL_BATCH = 2000  # rows normalized per transaction by `backfill_date_index`
+
+# Shadow table mirroring a table's date columns as ISO-8601 text, keyed by
+# the source row id; `copied` columns are mirrored as they are.
+DateTable = namedtuple('DateTable', ['shadow', 'key', 'dates', 'copied', 'indexes'])
+
+DATE_TABLES = {
+    'patients': DateTable(
+        'patient_dates', 'patient_id', ('birth_date', 'current_date', 'menses'), (),
+        (('birth_date',), ('current_date',), ('menses',)),
+    ),
+    'visits': DateTable(
+        'visit_dates', 'visit_id', ('visit_date',), ('patient_id',),
+        (('visit_date',), ('patient_id', 'visit_date')),
+    ),
+}
+
+
+def parse_date(value):
+    """Parse a stored or user-typed date, returning a date or None."""
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    value = str(value).strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def iso_date(value):
+    """Return a stored date as 'YYYY-MM-DD', or None if it cannot be read."""
+    day = parse_date(value)
+    return day.isoformat() if day else None
+
+
+def _quote(columns):
+    # current_date must be quoted, otherwise SQLite reads the CURRENT_DATE keyword
+    return ', '.join(f'"{col}"' for col in columns)
+
+
+def _dirty(spec):
+    return f"{spec.shadow}_dirty"
+
+
+def create_date_index(conn):
+    """
+    Create the ISO date shadow tables, their indexes and triggers.
+
+    `patients` and `visits` keep their dd-mm-yyyy (or m/d/yy) text, which
+    neither sorts nor range-scans. Each gets a shadow table with the same
+    dates as ISO text, indexed per column. As with the fuzzy name index,
+    triggers only queue the ids of written rows; the dates are parsed in
+    Python by `index_dates`, which the shared write path calls right away
+    and date queries call for anything written by other code. Existing
+    rows are only queued here and normalized by `backfill_date_index` in
+    small transactions, so the upgrade itself is quick.
+    """
+    for table, spec in DATE_TABLES.items():
+        columns = ', '.join(f'"{col}" {"INTEGER" if col in spec.copied else "TEXT"}'
+                            for col in spec.copied + spec.dates)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {spec.shadow} ({spec.key} INTEGER PRIMARY KEY, {columns})")
+        for index_columns in spec.indexes:
+            name = f"idx_{spec.shadow}_{'_'.join(index_columns)}"
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {spec.shadow}({_quote(index_columns)})")
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {_dirty(spec)} (row_id INTEGER PRIMARY KEY)")
+
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_dates_ai AFTER INSERT ON {table} BEGIN
+                INSERT OR IGNORE INTO {_dirty(spec)}(row_id) VALUES (new.id);
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_dates_au
+            AFTER UPDATE OF {_quote(spec.dates + spec.copied)} ON {table} BEGIN
+                INSERT OR IGNORE INTO {_dirty(spec)}(row_id) VALUES (new.id);
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_dates_ad AFTER DELETE ON {table} BEGIN
+                INSERT OR IGNORE INTO {_dirty(spec)}(row_id) VALUES (old.id);
+            END
+        ''')
+        conn.execute(f"INSERT OR IGNORE INTO {_dirty(spec)}(row_id) SELECT id FROM {table}")
+
+
+def has_date_index(conn):
+    """Check whether the ISO date shadow tables exist in this database."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (DATE_TABLES['visits'].shadow,)
+    ).fetchone()
+    return row is not None
+
+
+def index_dates(conn, table, row_ids=None):
+    """
+    (Re)compute the ISO dates of queued rows of one table.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        table (str): 'patients' or 'visits'.
+        row_ids (list): Only these rows (default: everything queued).
+
+    Returns:
+        int: Number of rows indexed.
+    """
+    spec = DATE_TABLES[table]
+    if row_ids is None:
+        row_ids = [row[0] for row in conn.execute(f"SELECT row_id FROM {_dirty(spec)}")]
+    if not row_ids:
+        return 0
+
+    selected = spec.copied + spec.dates
+    upserts, deletes = [], []
+    for start in range(0, len(row_ids), 500):
+        chunk = list(row_ids[start:start + 500])
+        placeholders = ', '.join('?' for _ in chunk)
+        rows = {row[0]: row[1:] for row in conn.execute(
+            f"SELECT id, {_quote(selected)} FROM {table} WHERE id IN ({placeholders})", chunk)}
+        for row_id in chunk:
+            values = rows.get(row_id)
+            if values is None:
+                deletes.append((row_id,))  # deleted row
+                continue
+            copied, dates = values[:len(spec.copied)], values[len(spec.copied):]
+            upserts.append((row_id, *copied, *(iso_date(value) for value in dates)))
+
+    ids = [(row_id,) for row_id in row_ids]
+    placeholders = ', '.join('?' for _ in (spec.key,) + selected)
+    conn.executemany(f"DELETE FROM {spec.shadow} WHERE {spec.key} = ?", deletes)
+    # An upsert rather than INSERT OR REPLACE, whose implicit delete would
+    # bypass the triggers of tables summarizing the shadow rows
+    updates = ', '.join(f'"{col}" = excluded."{col}"' for col in selected)
+    conn.executemany(
+        f"INSERT INTO {spec.shadow} ({spec.key}, {_quote(selected)}) VALUES ({placeholders}) "
+        f"ON CONFLICT({spec.key}) DO UPDATE SET {updates}",
+        upserts)
+    conn.executemany(f"DELETE FROM {_dirty(spec)} WHERE row_id = ?", ids)
+    return len(ids)
+
+
+def refresh_date_index(conn):
+    """Normalize rows written since the last refresh, committing if anything changed."""
+    in_transaction = conn.in_transaction
+    count = sum(index_dates(conn, table) for table in DATE_TABLES)
+    if count and not in_transaction:
+        conn.commit()
+    return count
+
+
+def backfill_date_index(conn, batch_size=BACKFILL_BATCH, progress=None):
+    """
+    Normalize every queued row, one short transaction per batch.
+
+    Meant for the first run after the upgrade: other connections can write
+    between batches instead of waiting for one long transaction.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        batch_size (int): Rows per transaction.
+        progress (callable): Called with the running total after each batch.
+
+    Returns:
+        int: Number of rows normalized.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    total = 0
+    for table, spec in DATE_TABLES.items():
+        while True:
+            row_ids = [row[0] for row in conn.execute(
+                f"SELECT row_id FROM {_dirty(spec)} LIMIT ?", (batch_size,))]
+            if not row_ids:
+                break
+            try:
+                total += index_dates(conn, table, row_ids)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            if progress is not None:
+                progress(total)
+    return total
+
+
+def _bound(value, default):
+    if value is None:
+        return default
+    iso = iso_date(value)
+    if iso is None:
+        raise ValueError(f"Unreadable date: {value}")
+    return iso
+
+
+def rows_between(conn, table, column, start=None, end=None, select='t.*', limit=None):
+    """
+    Return rows of `table` whose `column` falls between two dates, by date.
+
+    The range is an index range scan on the shadow table; rows are then
+    read by id.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        table (str): 'patients' or 'visits'.
+        column (str): One of the table's date columns.
+        start, end: Inclusive bounds (date or any stored date format);
+            None leaves that side open.
+        select (str): Projection; the table is aliased `t`.
+        limit (int): Maximum number of rows.
+
+    Returns:
+        list: Matching rows, earliest date first.
+    """
+    spec = DATE_TABLES[table]
+    if column not in spec.dates:
+        raise ValueError(f"Unknown {table} date column: {column}")
+    refresh_date_index(conn)
+    params = [_bound(start, '0000-00-00'), _bound(end, '9999-99-99')]
+    sql = (f'SELECT {select} FROM {spec.shadow} d JOIN {table} t ON t.id = d.{spec.key} '
+           f'WHERE d."{column}" BETWEEN ? AND ? ORDER BY d."{column}", d.{spec.key}')
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def visits_between(conn, start=None, end=None, select='t.*', limit=None):
+    """Return visits dated between two days, e.g. this week's."""
+    return rows_between(conn, 'visits', 'visit_date', start, end, select, limit)
+
+
+def patients_born_between(conn, start=None, end=None, select='t.*', limit=None):
+    """Return patients born between two days, e.g. 1980-01-01 and 1990-12-31."""
+    return rows_between(conn, 'patients', 'birth_date', start, end, select, limit)
@@ -2,7 +2,10 @@
 
 import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from database.statements import STATEMENT_CACHE_SIZE
 
 # Constants for folder structure
 DOCUMENTS_FOLDER = os.path.join(os.path.expanduser('~'), 'Documents')
@@ -11,6 +14,23 @@ INVOICES_FOLDER = os.path.join(MEDEASE_FOLDER, 'invoices')
 PHOTOS_FOLDER = os.path.join(MEDEASE_FOLDER, 'photos')
 REPORTS_FOLDER = os.path.join(MEDEASE_FOLDER, 'reports')
 
+# PRAGMA profile applied to every managed connection when it is opened.
+# WAL lets the list refresh read while a registration is being written, and
+# synchronous=NORMAL only fsyncs at checkpoints instead of on every commit.
+PERFORMANCE_PROFILE = {
+    'busy_timeout': 5000,            # milliseconds
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,            # negative = KiB, i.e. ~16 MB page cache
+    'mmap_size': 64 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'journal_size_limit': 32 * 1024 * 1024,
+}
+
+# Background WAL checkpoint policy
+WAL_CHECKPOINT_INTERVAL = 300            # seconds between passive checkpoints
+WAL_TRUNCATE_THRESHOLD = 16 * 1024 * 1024  # truncate the -wal file past this size
+
 def create_folders():
     """Create necessary directories if they don't exist."""
     os.makedirs(MEDEASE_FOLDER, exist_ok=True)
@@ -30,8 +50,232 @@ def connect_db(db_path):
     except sqlite3.Error as e:
         raise RuntimeError(f"Failed to connect to database: {e}")
 
+def apply_performance_profile(conn, profile=None):
+    """
+    Apply a PRAGMA performance profile to an open connection.
+
+    Args:
+        conn (sqlite3.Connection): Connection to tune.
+        profile (dict): PRAGMA name -> value. Defaults to PERFORMANCE_PROFILE.
+
+    Returns:
+        dict: The value each PRAGMA reports after being set.
+    """
+    applied = {}
+    for pragma, value in (PERFORMANCE_PROFILE if profile is None else profile).items():
+        row = conn.execute(f"PRAGMA {pragma}={value}").fetchone()
+        applied[pragma] = row[0] if row else value
+    return applied
+
+
+class ConnectionManager:
+    """
+    Own one long-lived SQLite connection per thread for a database file.
+
+    Connections are opened lazily on first use by a thread and then reused
+    for every later call from that thread. Handles left behind by threads
+    that exited without calling close() are reaped and counted as leaked.
+    """
+
+    def __init__(self, db_path, timeout=5.0, profile=None):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.profile = PERFORMANCE_PROFILE if profile is None else profile
+        self._checkpointer = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}  # thread ident -> (thread, connection)
+        self.opens = 0
+        self.reuses = 0
+        self.leaked = 0
+
+    def _open(self):
+        """Open and register a new connection for the calling thread."""
+        try:
+            # The manager enforces one thread per connection itself; the check
+            # is only relaxed so that leaked handles can be closed on reap.
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
+            apply_performance_profile(conn, self.profile)
+        except sqlite3.Error as e:
+            raise RuntimeError(f"Failed to connect to database: {e}")
+
+        with self._lock:
+            self._connections[threading.get_ident()] = (threading.current_thread(), conn)
+            self.opens += 1
+        return conn
+
+    def connection(self):
+        """Return the calling thread's connection, opening it if needed."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            with self._lock:
+                self.reuses += 1
+            return conn
+
+        self.reap()
+        conn = self._open()
+        self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run a block inside a transaction on the calling thread's connection.
+
+        Commits when the block succeeds and rolls back if it raises. Nested
+        use joins the outer transaction.
+
+        Yields:
+            sqlite3.Connection: The thread's connection.
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+    def close(self):
+        """Close the calling thread's connection, if it has one."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            self._connections.pop(threading.get_ident(), None)
+        conn.close()
+
+    def reap(self):
+        """Close connections whose owning thread has exited and count them as leaked."""
+        with self._lock:
+            dead = [ident for ident, (thread, _) in self._connections.items() if not thread.is_alive()]
+            handles = [self._connections.pop(ident)[1] for ident in dead]
+            self.leaked += len(handles)
+        for conn in handles:
+            conn.close()
+        return len(handles)
+
+    def start_checkpointer(self, interval=WAL_CHECKPOINT_INTERVAL, truncate_threshold=WAL_TRUNCATE_THRESHOLD):
+        """Start the background WAL checkpointer if it is not already running."""
+        if self._checkpointer is None or not self._checkpointer.is_alive():
+            self._checkpointer = WalCheckpointer(self, interval, truncate_threshold)
+            self._checkpointer.start()
+        return self._checkpointer
+
+    def stop_checkpointer(self):
+        """Stop the background WAL checkpointer and wait for it to exit."""
+        if self._checkpointer is not None:
+            self._checkpointer.stop()
+            self._checkpointer = None
+
+    def close_all(self):
+        """Close every connection owned by this manager."""
+        self.stop_checkpointer()
+        with self._lock:
+            handles = [conn for _, conn in self._connections.values()]
+            self._connections.clear()
+        self._local = threading.local()
+        for conn in handles:
+            conn.close()
+
+    def stats(self):
+        """Return open/reuse/leak counters and the number of live handles."""
+        with self._lock:
+            return {
+                'opens': self.opens,
+                'reuses': self.reuses,
+                'leaked': self.leaked,
+                'active': len(self._connections),
+            }
+
+
+class WalCheckpointer(threading.Thread):
+    """
+    Daemon thread that checkpoints the WAL on a fixed interval.
+
+    A PASSIVE checkpoint never blocks readers or writers. Once the -wal file
+    has grown past the truncate threshold, a TRUNCATE checkpoint is tried so a
+    long clinic day does not leave a huge file behind.
+    """
+
+    def __init__(self, manager, interval=WAL_CHECKPOINT_INTERVAL, truncate_threshold=WAL_TRUNCATE_THRESHOLD):
+        super().__init__(name="wal-checkpointer", daemon=True)
+        self.manager = manager
+        self.interval = interval
+        self.truncate_threshold = truncate_threshold
+        self.checkpoints = 0
+        self.truncations = 0
+        self._stop_event = threading.Event()
+
+    def wal_size(self):
+        """Return the size of the -wal file in bytes (0 if absent)."""
+        try:
+            return os.path.getsize(self.manager.db_path + '-wal')
+        except OSError:
+            return 0
+
+    def checkpoint(self):
+        """Run one checkpoint pass and return SQLite's (busy, log, checkpointed) row."""
+        mode = 'TRUNCATE' if self.wal_size() > self.truncate_threshold else 'PASSIVE'
+        result = self.manager.connection().execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        self.checkpoints += 1
+        if mode == 'TRUNCATE' and result and result[0] == 0:
+            self.truncations += 1
+        return result
+
+    def run(self):
+        try:
+            while not self._stop_event.wait(self.interval):
+                try:
+                    self.checkpoint()
+                except sqlite3.Error:
+                    # Busy or locked: simply try again on the next tick
+                    pass
+        finally:
+            self.manager.close()
+
+    def stop(self):
+        self._stop_event.set()
+        if self is not threading.current_thread():
+            self.join()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path, profile=None):
+    """
+    Return the process-wide ConnectionManager for a database file.
+
+    The profile only takes effect when the manager is first created.
+    """
+    key = os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = ConnectionManager(db_path, profile=profile)
+        return manager
+
+
+def close_all_connections():
+    """Stop the database workers and close every managed connection, e.g. at exit."""
+    from database.db_worker import shutdown_db_workers
+    shutdown_db_workers()
+    with _managers_lock:
+        managers = list(_managers.values())
+    for manager in managers:
+        manager.close_all()
+
 def create_tables(conn):
-    """Create database tables if they do not exist."""
+    """Create database tables if they do not exist (the caller commits)."""
     cursor = conn.cursor()
 
     # Patients table
@@ -104,15 +348,21 @@ def create_tables(conn):
     )
     ''')
 
-    conn.commit()
+def initialize_database(profile=None):
+    """
+    Initialize folders and database, then return the database path.
+
+    The connection manager applies the PRAGMA profile (WAL, synchronous=NORMAL,
+    cache and mmap sizes, ...), pending schema migrations are run and the
+    background WAL checkpointer is started.
+    """
+    from database.migrations import migrate
 
-def initialize_database():
-    """Initialize folders and database, then return the database path."""
     create_folders()
     db_path = get_db_path()
-    conn = connect_db(db_path)
-    create_tables(conn)
-    conn.close()
+    manager = get_connection_manager(db_path, profile)
+    migrate(manager.connection())
+    manager.start_checkpointer()
     return db_path
 
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+# pulse/database/db_worker.py
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from database.db_manager import get_connection_manager
+from database.query_cache import get_query_cache
+
+POLL_INTERVAL = 20       # ms between checks for a finished job on the Tk side
+SHUTDOWN_TIMEOUT = 5.0   # seconds to wait for a running job at exit
+
+
+class DatabaseWorker:
+    """
+    Run database jobs off the Tk event thread.
+
+    Jobs are callables taking the worker thread's connection as first
+    argument; `submit` queues one and returns a concurrent.futures.Future.
+    Each worker thread uses its own connection from the ConnectionManager,
+    so a slow query or a lock held by another process only delays the
+    futures, never the UI. Pair with `deliver` to get results back on the
+    Tk thread.
+    """
+
+    def __init__(self, db_path, workers=1, name='pulse-db'):
+        self.db_path = db_path
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.running = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_wait = 0.0
+        self.max_run = 0.0
+        for index in range(workers):
+            thread = threading.Thread(target=self._run, name=f"{name}-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue `fn(conn, *args, **kwargs)` and return a Future for its result.
+
+        Write jobs should wrap their statements in `transaction()` of the
+        database's ConnectionManager, as the synchronous code does.
+        """
+        future = Future()
+        with self._lock:
+            if not self._threads:
+                raise RuntimeError("Database worker has been shut down")
+            self.submitted += 1
+        self._queue.put((future, fn, args, kwargs, time.perf_counter()))
+        return future
+
+    def execute(self, sql, params=(), cache=False):
+        """
+        Queue a single statement and return a Future for its fetched rows.
+
+        With `cache`, a SELECT on patients is answered from the database's
+        QueryCache while no write has happened since it was last read.
+        """
+        if cache:
+            return self.submit(lambda conn: get_query_cache(self.db_path).execute(conn, sql, params))
+        return self.submit(lambda conn: conn.execute(sql, params).fetchall())
+
+    def _run(self):
+        manager = get_connection_manager(self.db_path)
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    break
+                future, fn, args, kwargs, queued_at = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                started = time.perf_counter()
+                with self._lock:
+                    self.running += 1
+                try:
+                    result = fn(manager.connection(), *args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                    ok = False
+                else:
+                    future.set_result(result)
+                    ok = True
+                self._record(started - queued_at, time.perf_counter() - started, ok)
+        finally:
+            manager.close()
+
+    def _record(self, wait, run, ok):
+        with self._lock:
+            self.running -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self.total_wait += wait
+            self.total_run += run
+            self.max_wait = max(self.max_wait, wait)
+            self.max_run = max(self.max_run, run)
+
+    def queue_depth(self):
+        """Return the number of jobs waiting for a worker thread."""
+        return self._queue.qsize()
+
+    def stats(self):
+        """Return queue depth, job counts and latencies (ms) for monitoring."""
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                'queued': self._queue.qsize(),
+                'running': self.running,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'avg_wait_ms': self.total_wait / finished * 1000 if finished else 0.0,
+                'avg_run_ms': self.total_run / finished * 1000 if finished else 0.0,
+                'max_wait_ms': self.max_wait * 1000,
+                'max_run_ms': self.max_run * 1000,
+            }
+
+    def shutdown(self, timeout=SHUTDOWN_TIMEOUT):
+        """Cancel queued jobs, let running ones finish and stop the threads."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[0].cancel()
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+
+def deliver(widget, future, on_result, on_error=None, interval=POLL_INTERVAL):
+    """
+    Call back on the Tk thread once a future is done.
+
+    The future is polled with `widget.after`, so Tk is only ever touched
+    from the event loop. Cancelled futures are dropped silently.
+
+    Args:
+        widget: Any Tk widget (usually root or the widget being filled).
+        future (Future): Job returned by DatabaseWorker.submit.
+        on_result (callable): Called with the job's result.
+        on_error (callable): Called with the exception (default: re-raise
+            into Tk's error handler).
+        interval (int): Polling period in ms.
+    """
+    def poll():
+        if not future.done():
+            widget.after(interval, poll)
+            return
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            on_result(future.result())
+        elif on_error is not None:
+            on_error(error)
+        else:
+            raise error
+
+    poll()
+
+
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def get_db_worker(db_path, workers=1):
+    """Return the process-wide DatabaseWorker for a database file."""
+    key = os.path.abspath(db_path)
+    with _workers_lock:
+        worker = _workers.get(key)
+        if worker is None:
+            worker = _workers[key] = DatabaseWorker(db_path, workers)
+        return worker
+
+
+def shutdown_db_workers():
+    """Stop every database worker, e.g. when the application exits."""
+    with _workers_lock:
+        workers = list(_workers.values())
+        _workers.clear()
+    for worker in workers:
+        worker.shutdown()
@@ -0,0 +1,293 @@
+# pulse/database/duplicates.py
+
+import argparse
+import csv
+import sys
+import time
+from collections import defaultdict, namedtuple
+from itertools import combinations
+
+from database.db_manager import get_connection_manager, get_db_path
+from database.name_index import name_key, trigrams, match_names, refresh_name_index, KEY_TABLE
+from database.date_index import DATE_TABLES, iso_date, refresh_date_index
+from database.patient_index import get_patient_index, normalize_telephone
+
+DUPLICATE_THRESHOLD = 0.8   # minimum score reported as a likely duplicate
+NAME_CANDIDATES = 0.6       # minimum name similarity fetched by the on-register check
+MAX_BLOCK_SIZE = 200        # larger blocks (placeholder dates or numbers) are skipped
+
+# What is compared for each patient; `key` is the phonetic name key and
+# `birth_date` the ISO date
+Profile = namedtuple('Profile', ['id', 'name', 'key', 'birth_date', 'gender', 'phone', 'file_uid'])
+
+DuplicateMatch = namedtuple('DuplicateMatch', ['first_id', 'second_id', 'score', 'reasons'])
+
+SELECT_PROFILES = (
+    f"SELECT p.id, p.name, k.name_key, d.birth_date, p.gender, p.telephone, p.file_UID "
+    f"FROM patients p "
+    f"LEFT JOIN {KEY_TABLE} k ON k.patient_id = p.id "
+    f"LEFT JOIN {DATE_TABLES['patients'].shadow} d ON d.patient_id = p.id"
+)
+
+
+def _profile(patient_id, name, key, birth_date, gender, telephone, file_uid):
+    return Profile(patient_id, name, key if key is not None else name_key(name), birth_date,
+                   (gender or '').strip(), normalize_telephone(telephone), (file_uid or '').strip())
+
+
+def load_profiles(conn, patient_ids=None):
+    """Read the compared columns of every patient (or of `patient_ids`)."""
+    refresh_name_index(conn)
+    refresh_date_index(conn)
+    if patient_ids is None:
+        return [_profile(*row) for row in conn.execute(SELECT_PROFILES)]
+    profiles = []
+    patient_ids = list(patient_ids)
+    for start in range(0, len(patient_ids), 500):
+        chunk = patient_ids[start:start + 500]
+        placeholders = ', '.join('?' for _ in chunk)
+        profiles.extend(_profile(*row) for row in conn.execute(
+            f"{SELECT_PROFILES} WHERE p.id IN ({placeholders})", chunk))
+    return profiles
+
+
+def blocking_keys(profile):
+    """
+    Return the blocks a patient is compared within.
+
+    Patients are only compared with others sharing a birth date, a telephone
+    number or a phonetic name (word order ignored), which catches typos in
+    any one of the three without comparing every pair. Patients sharing a
+    file_UID (left by older versions, see uid_allocator) are always compared.
+    """
+    keys = []
+    if profile.file_uid:
+        keys.append(('file_uid', profile.file_uid))
+    if profile.birth_date:
+        keys.append(('birth_date', profile.birth_date))
+    if profile.phone:
+        keys.append(('phone', profile.phone))
+    if profile.key:
+        keys.append(('name', ' '.join(sorted(profile.key.split()))))
+    return keys
+
+
+def score_pair(first, second, grams=None):
+    """
+    Score how likely two patients are the same person.
+
+    The name similarity (Dice coefficient of phonetic trigrams) weighs 0.6,
+    the same birth date 0.3 (the same birth year 0.1) and the same telephone
+    number 0.1. Patients of different recorded genders never match; a
+    shared file_UID always does.
+
+    Args:
+        first, second (Profile): Patients to compare.
+        grams (dict): Optional cache of trigram sets by phonetic key.
+
+    Returns:
+        tuple: (score between 0 and 1, list of reasons)
+    """
+    if first.file_uid and first.file_uid == second.file_uid:
+        return 1.0, ['same file UID']
+    if first.gender and second.gender and first.gender.lower() != second.gender.lower():
+        return 0.0, []
+
+    grams = {} if grams is None else grams
+    first_grams = grams.get(first.key)
+    if first_grams is None:
+        first_grams = grams[first.key] = trigrams(first.key or '')
+    second_grams = grams.get(second.key)
+    if second_grams is None:
+        second_grams = grams[second.key] = trigrams(second.key or '')
+    size = len(first_grams) + len(second_grams)
+    similarity = 2.0 * len(first_grams & second_grams) / size if size else 0.0
+
+    score = 0.6 * similarity
+    reasons = [f"name {similarity:.0%}"]
+    if first.birth_date and first.birth_date == second.birth_date:
+        score += 0.3
+        reasons.append('same birth date')
+    elif first.birth_date and second.birth_date and first.birth_date[:4] == second.birth_date[:4]:
+        score += 0.1
+        reasons.append('same birth year')
+    if first.phone and first.phone == second.phone:
+        score += 0.1
+        reasons.append('same telephone')
+    return round(score, 3), reasons
+
+
+def find_duplicates(conn, threshold=DUPLICATE_THRESHOLD, max_block_size=MAX_BLOCK_SIZE, stats=None):
+    """
+    Find likely duplicate patients across the whole table.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        threshold (float): Minimum score of a reported pair.
+        max_block_size (int): Blocks with more patients are skipped.
+        stats (dict): If given, filled with 'patients', 'blocks',
+            'skipped_blocks' and 'comparisons' counts.
+
+    Returns:
+        list: DuplicateMatch entries, highest score first.
+    """
+    profiles = load_profiles(conn)
+    blocks = defaultdict(list)
+    for profile in profiles:
+        for key in blocking_keys(profile):
+            blocks[key].append(profile)
+
+    seen = set()
+    matches = []
+    grams = {}
+    skipped = comparisons = 0
+    for block in blocks.values():
+        if len(block) < 2:
+            continue
+        if len(block) > max_block_size:
+            skipped += 1
+            continue
+        for first, second in combinations(block, 2):
+            pair = (first.id, second.id) if first.id < second.id else (second.id, first.id)
+            if pair in seen:
+                continue
+            seen.add(pair)
+            comparisons += 1
+            score, reasons = score_pair(first, second, grams)
+            if score >= threshold:
+                matches.append(DuplicateMatch(pair[0], pair[1], score, reasons))
+
+    if stats is not None:
+        stats.update(patients=len(profiles), blocks=sum(len(block) > 1 for block in blocks.values()),
+                     skipped_blocks=skipped, comparisons=comparisons)
+    matches.sort(key=lambda match: (-match.score, match.first_id, match.second_id))
+    return matches
+
+
+def find_patient_duplicates(conn, db_path, record, threshold=DUPLICATE_THRESHOLD, limit=5):
+    """
+    Return existing patients likely to be the one about to be registered.
+
+    Candidates come from the same blocks as the batch job, each through an
+    index: the ISO birth date index, the in-memory telephone lookup and the
+    fuzzy name index.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        db_path (str): Path to the database (selects the patient index).
+        record (dict): Columns of the new patient.
+        threshold (float): Minimum score.
+        limit (int): Maximum number of matches.
+
+    Returns:
+        list: (Profile, score, reasons) tuples, highest score first.
+    """
+    new = _profile(None, record.get('name'), None, iso_date(record.get('birth_date')),
+                   record.get('gender'), record.get('telephone'), None)
+    refresh_date_index(conn)
+    candidates = set()
+    if new.birth_date:
+        spec = DATE_TABLES['patients']
+        candidates.update(row[0] for row in conn.execute(
+            f"SELECT {spec.key} FROM {spec.shadow} WHERE birth_date = ?", (new.birth_date,)))
+    if new.phone:
+        candidates.update(entry['id'] for entry in get_patient_index(db_path).find_by_telephone(new.phone))
+    if new.key:
+        candidates.update(patient_id for patient_id, _ in match_names(conn, new.name, threshold=NAME_CANDIDATES))
+
+    matches = []
+    for profile in load_profiles(conn, candidates):
+        score, reasons = score_pair(new, profile)
+        if score >= threshold:
+            matches.append((profile, score, reasons))
+    matches.sort(key=lambda match: (-match[1], match[0].id))
+    return matches[:limit]
+
+
+def duplicate_groups(matches):
+    """Merge matched pairs into groups of patients (sorted id lists)."""
+    parent = {}
+
+    def root(patient_id):
+        parent.setdefault(patient_id, patient_id)
+        while parent[patient_id] != patient_id:
+            parent[patient_id] = parent[parent[patient_id]]
+            patient_id = parent[patient_id]
+        return patient_id
+
+    for match in matches:
+        first, second = root(match.first_id), root(match.second_id)
+        if first != second:
+            parent[max(first, second)] = min(first, second)
+    groups = defaultdict(list)
+    for patient_id in parent:
+        groups[root(patient_id)].append(patient_id)
+    return sorted(sorted(group) for group in groups.values())
+
+
+def write_merge_report(conn, matches, path):
+    """
+    Write the duplicate groups to a CSV merge report.
+
+    One line per patient, grouped; in each group the patient with the most
+    visits (then the oldest record) is marked 'keep' and the others 'merge
+    into' it, with the best score and reasons linking them to the group.
+
+    Returns:
+        int: Number of groups written.
+    """
+    best = {}
+    for match in matches:
+        for patient_id, other in ((match.first_id, match.second_id), (match.second_id, match.first_id)):
+            if patient_id not in best or match.score > best[patient_id][1]:
+                best[patient_id] = (other, match.score, match.reasons)
+
+    groups = duplicate_groups(matches)
+    patient_ids = [patient_id for group in groups for patient_id in group]
+    profiles = {profile.id: profile for profile in load_profiles(conn, patient_ids)}
+    visits = {}
+    for start in range(0, len(patient_ids), 500):
+        chunk = patient_ids[start:start + 500]
+        placeholders = ', '.join('?' for _ in chunk)
+        visits.update(conn.execute(
+            f"SELECT patient_id, COUNT(*) FROM visits WHERE patient_id IN ({placeholders}) GROUP BY patient_id",
+            chunk).fetchall())
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(('group', 'action', 'patient_id', 'name', 'birth_date', 'gender', 'telephone',
+                         'file_UID', 'visits', 'matched_with', 'score', 'reasons'))
+        for number, group in enumerate(groups, start=1):
+            keep = min(group, key=lambda patient_id: (-visits.get(patient_id, 0), patient_id))
+            for patient_id in group:
+                profile = profiles.get(patient_id)
+                if profile is None:
+                    continue  # deleted since the matches were found
+                other, score, reasons = best[patient_id]
+                action = 'keep' if patient_id == keep else f'merge into {keep}'
+                writer.writerow((number, action, patient_id, profile.name, profile.birth_date, profile.gender,
+                                 profile.phone, profile.file_uid, visits.get(patient_id, 0), other, score,
+                                 '; '.join(reasons)))
+    return len(groups)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find likely duplicate patients and write a merge report.")
+    parser.add_argument('--db', default=None, help="database path (default: the configured database)")
+    parser.add_argument('--report', default='duplicates.csv', help="CSV merge report to write")
+    parser.add_argument('--threshold', type=float, default=DUPLICATE_THRESHOLD, help="minimum match score")
+    args = parser.parse_args(argv)
+
+    conn = get_connection_manager(args.db or get_db_path()).connection()
+    start = time.perf_counter()
+    stats = {}
+    matches = find_duplicates(conn, args.threshold, stats=stats)
+    groups = write_merge_report(conn, matches, args.report)
+    print(f"{stats['patients']} patients, {stats['comparisons']} comparisons in {stats['blocks']} blocks "
+          f"({stats['skipped_blocks']} oversized blocks skipped), {time.perf_counter() - start:.1f}s")
+    print(f"{len(matches)} likely duplicate pairs in {groups} groups written to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
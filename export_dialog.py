@@ -0,0 +1,124 @@
+# pulse/ui/export_dialog.py
+
+import threading
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+from database.db_manager import get_connection_manager
+from database.exporter import DATE_COLUMNS, export_table, parse_date, table_columns
+
+POLL_INTERVAL = 100  # ms between checks on a running export
+
+
+def open_export_dialog(root, db_path):
+    """
+    Open a window to export patients or visits to a CSV or columnar file.
+
+    The export runs on a background thread with its own connection, so the
+    main window keeps responding while large tables are written out.
+
+    Args:
+        root: Tkinter root window.
+        db_path: Path to the SQLite database.
+    """
+    conn = get_connection_manager(db_path).connection()
+    columns_by_table = {table: table_columns(conn, table) for table in DATE_COLUMNS}
+
+    export_window = tk.Toplevel(root)
+    export_window.title("Export Data")
+    export_window.resizable(False, False)
+    export_window.transient(root)
+
+    table_var = tk.StringVar(value='patients')
+    format_var = tk.StringVar(value='csv')
+    status_var = tk.StringVar(value="")
+
+    ttk.Label(export_window, text="Table").grid(row=0, column=0, sticky='w', padx=5, pady=2)
+    table_combo = ttk.Combobox(export_window, textvariable=table_var, values=sorted(DATE_COLUMNS), state='readonly')
+    table_combo.grid(row=0, column=1, sticky='ew', padx=5, pady=2)
+
+    ttk.Label(export_window, text="Format").grid(row=1, column=0, sticky='w', padx=5, pady=2)
+    format_frame = ttk.Frame(export_window)
+    format_frame.grid(row=1, column=1, sticky='w', padx=5, pady=2)
+    ttk.Radiobutton(format_frame, text="CSV", variable=format_var, value='csv').pack(side=tk.LEFT)
+    ttk.Radiobutton(format_frame, text="Columnar (.pcol)", variable=format_var, value='columnar').pack(side=tk.LEFT)
+
+    ttk.Label(export_window, text="From (dd-mm-yyyy)").grid(row=2, column=0, sticky='w', padx=5, pady=2)
+    from_entry = ttk.Entry(export_window)
+    from_entry.grid(row=2, column=1, sticky='ew', padx=5, pady=2)
+
+    ttk.Label(export_window, text="To (dd-mm-yyyy)").grid(row=3, column=0, sticky='w', padx=5, pady=2)
+    to_entry = ttk.Entry(export_window)
+    to_entry.grid(row=3, column=1, sticky='ew', padx=5, pady=2)
+
+    ttk.Label(export_window, text="Columns").grid(row=4, column=0, sticky='nw', padx=5, pady=2)
+    column_list = tk.Listbox(export_window, selectmode=tk.MULTIPLE, height=12, exportselection=False)
+    column_list.grid(row=4, column=1, sticky='ew', padx=5, pady=2)
+
+    ttk.Label(export_window, textvariable=status_var).grid(row=6, column=0, columnspan=2, sticky='w', padx=5)
+
+    def fill_columns(event=None):
+        column_list.delete(0, tk.END)
+        for col in columns_by_table[table_var.get()]:
+            column_list.insert(tk.END, col)
+        column_list.select_set(0, tk.END)
+
+    table_combo.bind("<<ComboboxSelected>>", fill_columns)
+    fill_columns()
+
+    def on_export():
+        table = table_var.get()
+        columns = [column_list.get(i) for i in column_list.curselection()]
+        if not columns:
+            messagebox.showwarning("Export", "Select at least one column.", parent=export_window)
+            return
+        date_from, date_to = parse_date(from_entry.get()), parse_date(to_entry.get())
+        if (from_entry.get().strip() and date_from is None) or (to_entry.get().strip() and date_to is None):
+            messagebox.showwarning("Export", "Dates must be dd-mm-yyyy.", parent=export_window)
+            return
+
+        file_format = format_var.get()
+        extension = '.csv' if file_format == 'csv' else '.pcol'
+        path = filedialog.asksaveasfilename(
+            parent=export_window,
+            defaultextension=extension,
+            initialfile=table + extension,
+            filetypes=[("CSV files", "*.csv")] if file_format == 'csv' else [("Columnar export", "*.pcol")]
+        )
+        if not path:
+            return
+
+        state = {'rows': 0, 'result': None, 'error': None}
+
+        def run():
+            manager = get_connection_manager(db_path)
+            try:
+                state['result'] = export_table(
+                    db_path, table, path, file_format, columns, date_from, date_to,
+                    progress=lambda count: state.update(rows=count)
+                )
+            except Exception as e:
+                state['error'] = e
+            finally:
+                manager.close()
+
+        def poll():
+            if worker.is_alive():
+                status_var.set(f"Exporting... {state['rows']} rows")
+                export_window.after(POLL_INTERVAL, poll)
+                return
+            export_button.config(state=tk.NORMAL)
+            if state['error'] is not None:
+                status_var.set("")
+                messagebox.showerror("Export Error", f"Failed to export {table}:\n{state['error']}", parent=export_window)
+            else:
+                result = state['result']
+                status_var.set(f"{result['rows']} rows exported in {result['elapsed']:.1f} s")
+
+        export_button.config(state=tk.DISABLED)
+        worker = threading.Thread(target=run, name="pulse-export", daemon=True)
+        worker.start()
+        poll()
+
+    export_button = ttk.Button(export_window, text="Export", command=on_export)
+    export_button.grid(row=5, column=1, sticky='e', padx=5, pady=5)
@@ -0,0 +1,212 @@
+# pulse/database/exporter.py
+
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+
+from database.db_manager import get_connection_manager, get_db_path
+from database.date_index import DATE_TABLES, has_date_index, parse_date, refresh_date_index
+
+FETCH_SIZE = 500
+
+# Column holding the date each table is filtered on
+DATE_COLUMNS = {'patients': 'current_date', 'visits': 'visit_date'}
+
+FORMATS = ('csv', 'columnar')
+COLUMNAR_MAGIC = 'pulse-columnar'
+
+
+def table_columns(conn, table):
+    """Return the column names of an exportable table, in table order."""
+    if table not in DATE_COLUMNS:
+        raise ValueError(f"Unknown table: {table}")
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def iter_batches(conn, table, columns=None, date_from=None, date_to=None, batch_size=FETCH_SIZE):
+    """
+    Stream rows of a table in batches, oldest id first.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        table (str): 'patients' or 'visits'.
+        columns (list): Columns to export (default: all).
+        date_from (date): Keep rows dated on or after this day.
+        date_to (date): Keep rows dated on or before this day.
+        batch_size (int): Rows fetched per fetchmany call.
+
+    Yields:
+        list: Up to `batch_size` row tuples in `columns` order. Rows whose
+        date cannot be parsed are skipped when a date range is given.
+
+    With the ISO date index in place the range is an index range scan;
+    older databases filter row by row instead.
+    """
+    available = table_columns(conn, table)
+    columns = list(columns or available)
+    unknown = [col for col in columns if col not in available]
+    if unknown:
+        raise ValueError(f"Unknown {table} columns: {', '.join(unknown)}")
+
+    filtered = date_from is not None or date_to is not None
+    if filtered and has_date_index(conn):
+        refresh_date_index(conn)
+        spec = DATE_TABLES[table]
+        bounds = (date_from.isoformat() if date_from else '0000-00-00',
+                  date_to.isoformat() if date_to else '9999-99-99')
+        projection = ', '.join(f'"{col}"' for col in columns)
+        cursor = conn.execute(
+            f'SELECT {projection} FROM {table} WHERE id IN ('
+            f'SELECT {spec.key} FROM {spec.shadow} WHERE "{DATE_COLUMNS[table]}" BETWEEN ? AND ?'
+            f') ORDER BY id', bounds)
+        filtered = False
+    else:
+        selected = columns + [DATE_COLUMNS[table]] if filtered else columns
+        projection = ', '.join(f'"{col}"' for col in selected)
+        cursor = conn.execute(f"SELECT {projection} FROM {table} ORDER BY id")
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        if filtered:
+            kept = []
+            for row in rows:
+                day = parse_date(row[-1])
+                if day is None or (date_from and day < date_from) or (date_to and day > date_to):
+                    continue
+                kept.append(row[:-1])
+            rows = kept
+        if rows:
+            yield rows
+
+
+class CsvWriter:
+    """Write batches as CSV with a header row."""
+
+    def __init__(self, path, table, columns):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ColumnarWriter:
+    """
+    Write batches as gzip-compressed column blocks.
+
+    The first line is a JSON header naming the table and columns; every
+    following line holds one batch as a list of per-column value lists, so
+    similar values sit together and compress well. Read it back with
+    `read_columnar`.
+    """
+
+    def __init__(self, path, table, columns):
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+        header = {'format': COLUMNAR_MAGIC, 'version': 1, 'table': table, 'columns': columns}
+        self.file.write(json.dumps(header) + '\n')
+
+    def write(self, rows):
+        self.file.write(json.dumps({'rows': len(rows), 'data': [list(col) for col in zip(*rows)]}) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+WRITERS = {'csv': CsvWriter, 'columnar': ColumnarWriter}
+
+
+def read_columnar(path):
+    """
+    Read a columnar export back row by row.
+
+    Yields:
+        dict: Column name -> value for each exported row.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('format') != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar export")
+        columns = header['columns']
+        for line in f:
+            block = json.loads(line)
+            for values in zip(*block['data']):
+                yield dict(zip(columns, values))
+
+
+def guess_format(path):
+    """Pick the export format from a file name (.csv, otherwise columnar for .gz/.pcol)."""
+    return 'columnar' if path.lower().endswith(('.gz', '.pcol')) else 'csv'
+
+
+def export_table(db_path, table, path, file_format=None, columns=None, date_from=None, date_to=None,
+                 batch_size=FETCH_SIZE, progress=None):
+    """
+    Export a table to a file in constant memory.
+
+    Args:
+        db_path (str): Path to the SQLite database.
+        table (str): 'patients' or 'visits'.
+        path (str): Destination file.
+        file_format (str): 'csv' or 'columnar' (default: from the file name).
+        columns (list): Columns to export (default: all).
+        date_from (date): Keep rows dated on or after this day.
+        date_to (date): Keep rows dated on or before this day.
+        batch_size (int): Rows per fetchmany / write.
+        progress (callable): Called with the running row count after each batch.
+
+    Returns:
+        dict: 'rows' written and 'elapsed' seconds.
+    """
+    started = time.perf_counter()
+    conn = get_connection_manager(db_path).connection()
+    columns = list(columns or table_columns(conn, table))
+    batches = iter_batches(conn, table, columns, date_from, date_to, batch_size)
+    writer = WRITERS[file_format or guess_format(path)](path, table, columns)
+    count = 0
+    try:
+        for rows in batches:
+            writer.write(rows)
+            count += len(rows)
+            if progress is not None:
+                progress(count)
+    finally:
+        batches.close()
+        writer.close()
+    return {'rows': count, 'elapsed': time.perf_counter() - started}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export patients or visits to CSV or columnar files.")
+    parser.add_argument('table', choices=sorted(DATE_COLUMNS), help="table to export")
+    parser.add_argument('destination', help="output file (.csv, or .gz/.pcol for columnar)")
+    parser.add_argument('--db', default=None, help="database path (default: the configured database)")
+    parser.add_argument('--format', choices=FORMATS, default=None, help="output format (default: from extension)")
+    parser.add_argument('--columns', default=None, help="comma-separated columns to export")
+    parser.add_argument('--from', dest='date_from', default=None, help="first day to include (dd-mm-yyyy)")
+    parser.add_argument('--to', dest='date_to', default=None, help="last day to include (dd-mm-yyyy)")
+    parser.add_argument('--batch-size', type=int, default=FETCH_SIZE, help="rows per fetch")
+    args = parser.parse_args(argv)
+
+    date_from, date_to = parse_date(args.date_from), parse_date(args.date_to)
+    if (args.date_from and date_from is None) or (args.date_to and date_to is None):
+        parser.error("dates must be dd-mm-yyyy")
+    columns = [col.strip() for col in args.columns.split(',')] if args.columns else None
+
+    result = export_table(args.db or get_db_path(), args.table, args.destination, args.format,
+                          columns, date_from, date_to, args.batch_size)
+    print(f"{result['rows']} {args.table} rows written to {os.path.abspath(args.destination)} "
+          f"in {result['elapsed']:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# pulse/ui/field_validation.py
+
+import time
+
+from ui.form_binding import entry_variable
+
+VALIDATION_DELAY = 150   # ms of typing pause before changed fields are checked
+
+
+class FieldValidator:
+    """
+    Check a form's required fields once typing pauses.
+
+    Fields are watched through their Tk variable, so typing, pasting and
+    the program filling or clearing the form all count as changes. A change
+    only marks its field: the first one starts a timer and later ones push
+    its deadline back, so a keystroke costs no Tcl call. When the timer
+    fires, only the marked fields are read, a field's rule only runs if its
+    text differs from the last check, and `on_change(valid)` is only called
+    when the form as a whole turns valid or invalid.
+    """
+
+    def __init__(self, widget, on_change, delay=VALIDATION_DELAY):
+        """
+        Args:
+            widget: Any widget, used to schedule the check.
+            on_change (callable): Called with True or False when the form's
+                validity changes (e.g. to enable the register button).
+            delay (int): Typing pause in ms before checking.
+        """
+        self.widget = widget
+        self.on_change = on_change
+        self.delay = delay
+        self.valid = None
+        self._fields = []       # (variable, rule)
+        self._texts = []        # text each field was last checked with
+        self._results = []      # result of that check
+        self._changed = set()
+        self._after_id = None
+        self._last_change = 0.0
+
+    def add(self, entry, rule=bool):
+        """Watch an entry; `rule(text)` tells whether its text is acceptable (default: not empty)."""
+        index = len(self._fields)
+        variable = entry_variable(entry)
+        self._fields.append((variable, rule))
+        self._texts.append(None)
+        self._results.append(False)
+        variable.trace_add('write', lambda *args: self._on_write(index))
+        self._on_write(index)
+
+    def check_now(self):
+        """Check the changed fields without waiting; returns the form's validity."""
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        for index in self._changed:
+            variable, rule = self._fields[index]
+            text = variable.get()
+            if text != self._texts[index]:
+                self._texts[index] = text
+                self._results[index] = bool(rule(text))
+        self._changed.clear()
+        valid = all(self._results)
+        if valid != self.valid:
+            self.valid = valid
+            self.on_change(valid)
+        return valid
+
+    def _on_write(self, index):
+        self._changed.add(index)
+        self._last_change = time.monotonic()
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.delay, self._on_timer)
+
+    def _on_timer(self):
+        # Typing went on after the timer was set: wait out the rest of the pause
+        waited = (time.monotonic() - self._last_change) * 1000
+        if waited < self.delay:
+            self._after_id = self.widget.after(int(self.delay - waited) + 1, self._on_timer)
+            return
+        self._after_id = None
+        self.check_now()
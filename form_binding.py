@@ -0,0 +1,118 @@
+# pulse/ui/form_binding.py
+
+import tkinter as tk
+
+from database.statements import PATIENT_RECORD_COLUMNS
+
+
+class FormBinding:
+    """
+    Record columns bound once to the widgets that show them.
+
+    `apply(record)` fills every bound widget from a full patients row in
+    one pass, reading columns by name rather than by position, and writes
+    only the widgets whose value differs from the record. Entries are
+    given a Tk variable, so comparing and writing are a variable read and
+    a variable write rather than a delete, an insert and a redraw; moving
+    through the list only touches the fields that differ between two
+    patients.
+
+    Usage:
+        binding = FormBinding()
+        binding.entry('name', entry_name)
+        binding.date('birth_date', birth_date_entry)
+        binding.variable('gender', gender_var)
+        binding.text('observations', observations)
+        binding.apply(record)
+    """
+
+    def __init__(self, columns=PATIENT_RECORD_COLUMNS):
+        self.columns = columns
+        self._position = {column: index for index, column in enumerate(columns)}
+        self._fields = []   # (column position, read, write, convert)
+
+    def entry(self, column, widget, convert=None):
+        """
+        Bind an Entry, Spinbox or Combobox (through its textvariable).
+
+        `convert`, if given, maps the stored value to what is shown.
+        """
+        variable = entry_variable(widget)
+        shown = _text if convert is None else lambda value: _text(convert(value))
+        self._bind(column, variable.get, variable.set, shown)
+
+    def date(self, column, widget, fallback=None):
+        """
+        Bind a tkcalendar DateEntry.
+
+        With `fallback` (a callable returning a date), an empty or invalid
+        stored date shows the fallback instead of raising ValueError.
+        """
+        def write(value):
+            if fallback is None:
+                widget.set_date(value)
+                return
+            try:
+                widget.set_date(value or fallback())
+            except ValueError:
+                widget.set_date(fallback())
+
+        self._bind(column, widget.get, write, _text)
+
+    def variable(self, column, variable):
+        """Bind a Tk variable (checkbutton, radiobutton or combobox state)."""
+        def read():
+            try:
+                return variable.get()
+            except tk.TclError:  # holds a value its type cannot read
+                return None
+
+        self._bind(column, read, variable.set, None)
+
+    def text(self, column, widget):
+        """Bind a multi-line Text widget."""
+        def write(value):
+            widget.delete("1.0", tk.END)
+            widget.insert("1.0", value)
+
+        self._bind(column, lambda: widget.get("1.0", "end-1c"), write, _text)
+
+    def apply(self, record):
+        """
+        Show `record` (a full patients row) in the bound widgets.
+
+        Returns:
+            int: Number of widgets written.
+        """
+        written = 0
+        for position, read, write, convert in self._fields:
+            value = record[position]
+            if convert is not None:
+                value = convert(value)
+            if read() != value:
+                write(value)
+                written += 1
+        return written
+
+    def _bind(self, column, read, write, convert):
+        self._fields.append((self._position[column], read, write, convert))
+
+
+def entry_variable(widget):
+    """
+    Return the Tk variable holding an entry's text, giving it one if needed.
+
+    The caller must keep the returned variable: Tk forgets a variable once
+    its Python object is collected.
+    """
+    name = str(widget.cget('textvariable'))
+    if name:
+        return tk.StringVar(widget, name=name)
+    # Keep what the widget shows (e.g. a Spinbox default)
+    variable = tk.StringVar(widget, value=widget.get())
+    widget.configure(textvariable=variable)
+    return variable
+
+
+def _text(value):
+    return '' if value is None else str(value)
@@ -3,10 +3,18 @@
 import tkinter as tk
 from tkinter import ttk, END, messagebox
 from tkcalendar import DateEntry
-import sqlite3
 import os
 from datetime import datetime
 from ui.photo_handler import load_image, take_picture, add_photo
+from database import statements
+from database.db_manager import get_connection_manager
+from database.patient_search import BASIC_SEARCH_COLUMNS
+from database.patient_manager import LIST_PROJECTION, get_patient_record, patient_saved, patient_deleted, fill_treeview, confirm_new_patient
+from database.db_worker import get_db_worker, deliver
+from database.uid_allocator import allocate_file_uid
+from ui.live_search import LiveSearch
+from ui.form_binding import FormBinding
+from ui.field_validation import FieldValidator
 
 def add_spacer(frame, row, col_span=4):
     """Add vertical spacing."""
@@ -15,11 +23,10 @@ def add_spacer(frame, row, col_span=4):
 
 
 class PatientForm:
-    def __init__(self, parent, db_path, treeview, refresh_treeview, photo_label):
+    def __init__(self, parent, db_path, treeview, photo_label):
         self.parent = parent
         self.db_path = db_path
-        self.treeview = treeview
-        self.refresh_treeview = refresh_treeview
+        self.treeview = treeview  # follows patient changes (follow_patient_changes)
         self.photo_label = photo_label
         self.photos_folder = os.path.join(os.path.dirname(db_path), 'photos')
         self.create_widgets()
@@ -156,6 +163,28 @@ class PatientForm:
 
         # Event bindings
         self.gender_combo.bind("<<ComboboxSelected>>", lambda e: self.toggle_menstrual_period())
+
+        # Record columns shown by each widget, filled in one pass on selection
+        self.binding = FormBinding()
+        self.binding.entry('name', self.entry_name)
+        self.binding.date('birth_date', self.birth_date_entry)
+        self.binding.variable('gender', self.gender_var)
+        self.binding.entry('weight', self.entry_weight)
+        self.binding.entry('height', self.entry_height)
+        self.binding.entry('systolic_bp', self.entry_systolic)
+        self.binding.entry('diastolic_bp', self.entry_diastolic)
+        self.binding.entry('pulse', self.entry_pulse)
+        self.binding.entry('temperature', self.entry_temperature)
+        self.binding.entry('address', self.entry_address)
+        self.binding.entry('email', self.entry_email)
+        self.binding.entry('profession', self.entry_profession)
+        self.binding.entry('telephone', self.entry_telephone)
+        self.binding.variable('marital_status', self.marital_status_var)
+        self.binding.entry('ideal_weight', self.entry_ibw, convert=lambda ibw: ibw or "N/A")
+
+        # Required fields are checked once typing pauses, and only those that changed
+        self.field_checks = FieldValidator(self.widgets_frame, lambda valid: self.register_button.config(
+            state=tk.NORMAL if valid else tk.DISABLED))
         for entry in [
             self.entry_name,
             self.entry_weight,
@@ -166,7 +195,7 @@ class PatientForm:
             self.entry_temperature,
             self.entry_telephone
         ]:
-            entry.bind("<KeyRelease>", lambda e: self.check_fields())
+            self.field_checks.add(entry)
 
     def get_data(self):
         return {
@@ -188,19 +217,8 @@ class PatientForm:
         }
 
     def check_fields(self):
-        if (
-            self.entry_name.get() and
-            self.entry_weight.get() and
-            self.entry_height.get() and
-            self.entry_systolic.get() and
-            self.entry_diastolic.get() and
-            self.entry_pulse.get() and
-            self.entry_temperature.get() and
-            self.entry_telephone.get()
-        ):
-            self.register_button.config(state=tk.NORMAL)
-        else:
-            self.register_button.config(state=tk.DISABLED)
+        """Update the register button now rather than when typing pauses."""
+        self.field_checks.check_now()
     
     def capture_and_preview(self):
         """Trigger camera and preview image in the form without saving yet."""
@@ -223,9 +241,12 @@ class PatientForm:
         """Passes current form data to register_patient."""
         form_data = self.form.get_data()
         from database.patient_manager import register_patient
-        register_patient(self.db_path, form_data)
+        # Keep the form filled in if the user backs out of a likely duplicate
+        if register_patient(self.db_path, form_data) is False:
+            return
+        # The new patient's row reaches the list through the change notification
         self.form.on_clear()
-        self.refresh_treeview()
+        self.treeview.clear_selection()
 
     def on_update(self):
         print("Updating selected patient...")
@@ -262,51 +283,10 @@ class PatientForm:
 
     def populate_form(self, item_values):
         if item_values:
-            self.entry_name.delete(0, END)
-            self.entry_name.insert(0, item_values[1])  # Name
-
-            self.birth_date_entry.set_date(item_values[2])  # Birth Date
-
-            gender = item_values[16]
-            self.gender_var.set(gender)
+            # Only the fields that differ from the patient shown before are written
+            self.binding.apply(item_values)
             self.toggle_menstrual_period()
 
-            self.entry_weight.delete(0, END)
-            self.entry_weight.insert(0, item_values[5])  # Weight
-
-            self.entry_height.delete(0, END)
-            self.entry_height.insert(0, item_values[6])  # Height
-
-            self.entry_systolic.delete(0, END)
-            self.entry_systolic.insert(0, item_values[9])  # Systolic BP
-
-            self.entry_diastolic.delete(0, END)
-            self.entry_diastolic.insert(0, item_values[10])  # Diastolic BP
-
-            self.entry_pulse.delete(0, END)
-            self.entry_pulse.insert(0, item_values[11])  # Pulse
-
-            self.entry_temperature.delete(0, END)
-            self.entry_temperature.insert(0, item_values[12])  # Temperature
-
-            self.entry_address.delete(0, END)
-            self.entry_address.insert(0, item_values[19])  # Address
-
-            self.entry_email.delete(0, END)
-            self.entry_email.insert(0, item_values[20])  # Email
-
-            self.entry_profession.delete(0, END)
-            self.entry_profession.insert(0, item_values[21])  # Profession
-
-            self.entry_telephone.delete(0, END)
-            self.entry_telephone.insert(0, item_values[22])  # Telephone
-
-            self.marital_status_var.set(item_values[23])  # Marital Status
-
-            ibw = item_values[38] or "N/A"
-            self.entry_ibw.delete(0, END)
-            self.entry_ibw.insert(0, ibw)  # Ideal Body Weight
-
             # Load photo path and display image
             global photo_path
             photo_path = item_values[18]
@@ -373,6 +353,11 @@ class HealthHistoryForm:
         if self.observations_callback:
             self.observations.bind("<KeyRelease>", lambda e: self.observations_callback())
 
+        self.binding = FormBinding()
+        for key, var in self.check_vars.items():
+            self.binding.variable(key, var)
+        self.binding.text('observations', self.observations)
+
     def get_data(self):
         data = {key: var.get() for key, var in self.check_vars.items()}
         data['observations'] = self.observations.get("1.0", tk.END).strip()
@@ -384,22 +369,7 @@ class HealthHistoryForm:
 
     def populate_health_form(self, values):
         if values:
-            self.check_vars['diabetes'].set(values[24])
-            self.check_vars['kidney'].set(values[25])
-            self.check_vars['epilepsy'].set(values[26])
-            self.check_vars['allergy'].set(values[27])
-            self.check_vars['asthma'].set(values[28])
-            self.check_vars['heart'].set(values[29])
-            self.check_vars['cancer'].set(values[30])
-            self.check_vars['surgery'].set(values[31])
-            self.check_vars['stroke'].set(values[32])
-            self.check_vars['hypertension'].set(values[33])
-            self.check_vars['hypotension'].set(values[34])
-            self.check_vars['alcohol'].set(values[35])
-            self.check_vars['sports'].set(values[36])
-            self.check_vars['smoking'].set(values[37])
-
-            self.set_observations(values[40])  # Observations
+            self.binding.apply(values)
 
 class SearchAndActionButtons:
     """
@@ -413,7 +383,8 @@ class SearchAndActionButtons:
         self.form = form
         self.observations = observations
         self.db_path = db_path
-        self.treeview = treeview
+        self.treeview = treeview  # follows patient changes (follow_patient_changes)
+        self.db = get_connection_manager(db_path)
         self.create_widgets()
 
     def create_widgets(self):
@@ -426,6 +397,10 @@ class SearchAndActionButtons:
         self.search_entry = ttk.Entry(button_frame, width=40)
         self.search_entry.grid(row=0, column=1, padx=5, sticky='w')
 
+        self.live_search = LiveSearch(self.search_entry, self.db_path, lambda rows: fill_treeview(self.treeview, rows),
+                                      on_clear=self.on_refresh, on_error=self.on_search_error,
+                                      columns=BASIC_SEARCH_COLUMNS, select=LIST_PROJECTION)
+
         self.search_button = ttk.Button(button_frame, text="Search", command=self.on_search)
         self.search_button.grid(row=0, column=2, padx=5)
 
@@ -458,9 +433,6 @@ class SearchAndActionButtons:
     def on_register(self):
         """Handle register button click."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
             data = self.form.get_data()
             name = data['name']
             birth_date = data['birth_date']
@@ -476,24 +448,25 @@ class SearchAndActionButtons:
             bmi = round(weight / (height ** 2), 2)
             age = calculate_age(birth_date)  # Make sure this function is imported or defined here
             ideal_weight = calculate_ideal_body_weight(height, gender)
-            alerts = assess_health(pulse, temperature, systolic_bp, diastolic_bp, gender)
+            alerts = ' '.join(assess_health(pulse, temperature, systolic_bp, diastolic_bp, gender))
 
             # Insert into DB
-            cursor.execute('''
-                INSERT INTO patients (
-                    name, birth_date, gender, weight, height, systolic_bp, diastolic_bp,
-                    pulse, temperature, bmi, age, ideal_weight, alerts, observations
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                name, birth_date, gender, weight, height, systolic_bp, diastolic_bp,
-                pulse, temperature, bmi, age, ideal_weight, alerts, self.observations.get("1.0", END).strip()
-            ))
-
-            conn.commit()
-            conn.close()
+            record = {
+                'name': name, 'birth_date': birth_date, 'gender': gender, 'weight': weight,
+                'height': height, 'systolic_bp': systolic_bp, 'diastolic_bp': diastolic_bp,
+                'pulse': pulse, 'temperature': temperature, 'bmi': bmi, 'age': age,
+                'ideal_weight': ideal_weight, 'alerts': alerts,
+                'observations': self.observations.get("1.0", END).strip(),
+            }
+            if not confirm_new_patient(self.db_path, record):
+                return
+            with self.db.transaction() as conn:
+                record['file_UID'] = allocate_file_uid(conn, gender, birth_date)
+                patient_id = statements.insert_patient(conn, record)
+            patient_saved(self.db_path, patient_id, record)
 
             messagebox.showinfo("Success", "Patient registered successfully!")
-            self.on_refresh()
+            self.reset_form()
 
         except Exception as e:
             messagebox.showerror("Registration Error", f"Could not register patient:\n{e}")
@@ -506,9 +479,6 @@ class SearchAndActionButtons:
             return
 
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
             item_values = self.treeview.item(selected_item, 'values')
             patient_id = item_values[0]
 
@@ -527,24 +497,21 @@ class SearchAndActionButtons:
             bmi = round(weight / (height ** 2), 2)
             age = calculate_age(birth_date)
             ideal_weight = calculate_ideal_body_weight(height, gender)
-            alerts = assess_health(pulse, temperature, systolic_bp, diastolic_bp, gender)
-
-            cursor.execute('''
-                UPDATE patients SET 
-                    name=?, birth_date=?, gender=?, weight=?, height=?, systolic_bp=?, diastolic_bp=?,
-                    pulse=?, temperature=?, bmi=?, age=?, ideal_weight=?, alerts=?, observations=?
-                WHERE id=?
-            ''', (
-                name, birth_date, gender, weight, height, systolic_bp, diastolic_bp,
-                pulse, temperature, bmi, age, ideal_weight, alerts,
-                self.observations.get("1.0", END).strip(),
-                patient_id
-            ))
-            conn.commit()
-            conn.close()
+            alerts = ' '.join(assess_health(pulse, temperature, systolic_bp, diastolic_bp, gender))
+
+            changes = {
+                'name': name, 'birth_date': birth_date, 'gender': gender, 'weight': weight,
+                'height': height, 'systolic_bp': systolic_bp, 'diastolic_bp': diastolic_bp,
+                'pulse': pulse, 'temperature': temperature, 'bmi': bmi, 'age': age,
+                'ideal_weight': ideal_weight, 'alerts': alerts,
+                'observations': self.observations.get("1.0", END).strip(),
+            }
+            with self.db.transaction() as conn:
+                statements.update_patient(conn, patient_id, changes)
+            patient_saved(self.db_path, patient_id, changes)
 
             messagebox.showinfo("Success", "Patient updated successfully!")
-            self.on_refresh()
+            self.reset_form()
 
         except ValueError as ve:
             messagebox.showerror("Validation Error", f"Please enter valid numbers.\n{ve}")
@@ -563,16 +530,13 @@ class SearchAndActionButtons:
             return
 
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
             patient_id = self.treeview.item(selected_item)['values'][0]
-            cursor.execute("DELETE FROM patients WHERE id=?", (patient_id,))
-            conn.commit()
-            conn.close()
+            with self.db.transaction() as conn:
+                statements.delete_patient(conn, patient_id)
+            patient_deleted(self.db_path, patient_id)
 
             messagebox.showinfo("Success", "Patient deleted successfully!")
-            self.on_refresh()
+            self.reset_form()
 
         except Exception as e:
             messagebox.showerror("Delete Error", f"Could not delete patient:\n{e}")
@@ -587,55 +551,34 @@ class SearchAndActionButtons:
             return
 
         try:
-            item_values = self.treeview.item(selected_item, 'values')
+            # The list only holds the summary columns; the report needs the full record
+            patient_id = self.treeview.item(selected_item, 'values')[0]
+            record = get_patient_record(self.db_path, patient_id)
             medease_folder = os.path.dirname(self.db_path)  # Assuming MedEase folder structure
-            generate_patient_report(item_values, medease_folder)
+            generate_patient_report(record, medease_folder)
 
         except Exception as e:
             messagebox.showerror("PDF Error", f"Failed to generate PDF:\n{e}")
 
     def on_search(self):
         """Handle search functionality."""
-        search_term = self.search_entry.get().strip()
-        if not search_term:
-            self.on_refresh()
-            return
-
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT * FROM patients WHERE
-                name LIKE ? OR birth_date LIKE ? OR address LIKE ?
-            ''', ('%' + search_term + '%', '%' + search_term + '%', '%' + search_term + '%'))
-
-            rows = cursor.fetchall()
-            conn.close()
-
-            for row in self.treeview.get_children():
-                self.treeview.delete(row)
-
-            for row in rows:
-                self.treeview.insert("", tk.END, values=row)
+        self.live_search.search_now(force=True)
 
-        except Exception as e:
-            messagebox.showerror("Search Error", f"An error occurred during search:\n{e}")
+    def on_search_error(self, e):
+        messagebox.showerror("Search Error", f"An error occurred during search:\n{e}")
 
     def on_refresh(self):
         """Refresh the patient list."""
+        self.live_search.cancel()
+        future = get_db_worker(self.db_path).execute(f"SELECT {LIST_PROJECTION} FROM patients", cache=True)
+        deliver(self.treeview, future, lambda rows: fill_treeview(self.treeview, rows),
+                lambda e: messagebox.showerror("Refresh Error", f"Could not refresh patient list:\n{e}"))
+        self.reset_form()
+
+    def reset_form(self):
+        """Clear the form and the selection, e.g. once a write has reached the list."""
+        self.treeview.clear_selection()
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM patients")
-            rows = cursor.fetchall()
-            conn.close()
-
-            for row in self.treeview.get_children():
-                self.treeview.delete(row)
-
-            for row in rows:
-                self.treeview.insert("", tk.END, values=row)
-
             self.form.reset_form()  # If implemented in PatientForm
             self.observations.delete("1.0", tk.END)
 
@@ -0,0 +1,115 @@
+# pulse/ui/live_search.py
+
+from database.db_worker import get_db_worker, deliver
+from database.patient_search import search_patients
+from database.query_cache import get_query_cache
+
+SEARCH_DELAY = 250     # ms of typing pause before a search runs
+PROGRESS_OPS = 1000    # SQLite VM steps between checks for a newer search
+
+
+class LiveSearch:
+    """
+    Search patients as the user types in an entry.
+
+    Keystrokes restart a short timer, so the query only runs once typing
+    pauses. Every search gets a generation number: a newer search cancels an
+    older one still waiting in the database worker's queue, interrupts it
+    if it is already running, and drops its result if it arrives anyway, so
+    only the newest result set ever reaches `on_results`.
+    """
+
+    def __init__(self, entry, db_path, on_results, on_clear=None, on_error=None,
+                 delay=SEARCH_DELAY, **search_options):
+        """
+        Args:
+            entry: Tk entry widget holding the search term.
+            db_path (str): Path to the SQLite database.
+            on_results (callable): Called on the Tk thread with the matching rows.
+            on_clear (callable): Called instead of searching when the entry is emptied
+                (default: search with a blank term, i.e. list every patient).
+            on_error (callable): Called with the exception of a failed search.
+            delay (int): Typing pause in ms before searching.
+            **search_options: Passed on to `search_patients` (columns, select, limit).
+        """
+        self.entry = entry
+        self.db_path = db_path
+        self.on_results = on_results
+        self.on_clear = on_clear
+        self.on_error = on_error
+        self.delay = delay
+        self.search_options = search_options
+        self.generation = 0
+        self.last_term = None
+        self._after_id = None
+        self._future = None
+
+        entry.bind("<KeyRelease>", self._on_key, add='+')
+        entry.bind("<Return>", lambda event: self.search_now(force=True), add='+')
+
+    def _on_key(self, event=None):
+        if self._after_id is not None:
+            self.entry.after_cancel(self._after_id)
+        self._after_id = self.entry.after(self.delay, self.search_now)
+
+    def _cancel_pending(self):
+        if self._after_id is not None:
+            self.entry.after_cancel(self._after_id)
+            self._after_id = None
+        if self._future is not None:
+            # Only succeeds while the job is still queued; a running query is
+            # interrupted by its progress handler instead
+            self._future.cancel()
+            self._future = None
+
+    def cancel(self):
+        """Drop any search still on its way, e.g. before reloading the list."""
+        self._cancel_pending()
+        self.generation += 1
+
+    def reset(self):
+        """Cancel and forget the last term, so the next keystroke searches again."""
+        self.cancel()
+        self.last_term = None
+
+    def search_now(self, force=False):
+        """Search for the entry's current text without waiting for the timer."""
+        term = self.entry.get().strip()
+        if term == self.last_term and not force:
+            self._after_id = None
+            return
+        self._cancel_pending()
+        self.generation += 1
+        self.last_term = term
+
+        if not term and self.on_clear is not None:
+            self.on_clear()
+            return
+
+        generation = self.generation
+        self._future = get_db_worker(self.db_path).submit(self._run, term, generation)
+        deliver(self.entry, self._future,
+                lambda rows: self._apply(generation, rows),
+                lambda error: self._fail(generation, error))
+
+    def _run(self, conn, term, generation):
+        # Runs on the database worker thread; a non-zero return aborts the query
+        conn.set_progress_handler(lambda: generation != self.generation, PROGRESS_OPS)
+        try:
+            return get_query_cache(self.db_path).call(conn, search_patients, term, **self.search_options)
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    def _apply(self, generation, rows):
+        if generation == self.generation:
+            self._future = None
+            self.on_results(rows)
+
+    def _fail(self, generation, error):
+        if generation != self.generation:
+            return  # superseded, usually "interrupted" by the progress handler
+        self._future = None
+        if self.on_error is not None:
+            self.on_error(error)
+        else:
+            raise error
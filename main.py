@@ -12,7 +12,7 @@ import cv2
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import core modules
-from database.db_manager import initialize_database
+from database.db_manager import initialize_database, close_all_connections
 from utils.crypto import check_trial_status, show_expiry_message
 from ui.app_window import run_app
 from ui.photo_handler import load_image
@@ -30,6 +30,7 @@ def main():
 
         # Run the application UI
         run_app(db_path)
+        close_all_connections()
 
     except Exception as e:
         messagebox.showerror("Startup Error", f"An error occurred while starting the application:\n{e}")
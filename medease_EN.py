@@ -17,11 +17,24 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.units import cm, inch
 import time
 from datetime import datetime, date
-import random
 import re
 import qrcode
 from typing import List
 from cryptography.fernet import Fernet
+from database.db_manager import get_connection_manager, close_all_connections
+from database.migrations import migrate
+from database.db_worker import get_db_worker, deliver
+from database.visit_history import get_visit_history
+from database.uid_allocator import allocate_file_uid
+from database import statements
+from ui.live_search import LiveSearch
+from database.patient_manager import LIST_PROJECTION, get_patient_record, patient_saved, patient_deleted, lookup_patient, confirm_new_patient, follow_patient_changes
+from ui.export_dialog import open_export_dialog
+from ui.cohort_panel import open_cohort_panel
+from ui.stats_panel import open_stats_panel
+from ui.virtual_list import VirtualTreeview
+from ui.form_binding import FormBinding
+from ui.field_validation import FieldValidator
 
 ############################################################# FOLDERS SET UP ######################################################
 # Define the paths for the MedEase folder and subfolders
@@ -133,7 +146,12 @@ def main_app():
 
     db_path = os.path.join(medease_folder, 'patients.db')
 
-    conn = sqlite3.connect(db_path)
+    db = get_connection_manager(db_path)
+    db.start_checkpointer()
+    db_worker = get_db_worker(db_path)
+    visit_history = get_visit_history(db_path)
+    visit_page = {'number': 0, 'count': 1}
+    conn = db.connection()
     cursor = conn.cursor()
 
     # Create table if it does not exist
@@ -201,6 +219,10 @@ def main_app():
     qrcode TEXT,
     FOREIGN KEY(patient_id) REFERENCES patients(id)
 )''')
+    conn.commit()
+
+    # Bring the schema (indexes, ...) up to the current version
+    migrate(conn)
 
     ################################################## PRESCRIPTION AND BILLING ########################################################
     def create_invoice_pdf():
@@ -389,16 +411,27 @@ def main_app():
         quantity_entry.insert(0, "1")
         price_entry.delete(0, tk.END)
 
-    def search_visit():
-        search_term = entry_name.get()
-        cursor.execute('''
-        SELECT * FROM visits WHERE
-        name LIKE ? OR
-        file_UID LIKE ?
-        ''', ('%'+search_term+'%', '%'+search_term+'%'))
-        rows = cursor.fetchall()
+    def show_visit_history(page=0):
+        # Visits are looked up by patient id, most recent first; they are
+        # usually in memory already, prefetched when the patient was selected
+        try:
+            patient_id = int(id_entry.get())
+        except ValueError:
+            update_visit_tree([])
+            return
+        rows, page_count = visit_history.page(conn, patient_id, page)
+        visit_page.update(number=page, count=page_count)
+        visit_page_label.config(text=f"Page {page + 1} of {page_count}")
         update_visit_tree(rows)
 
+    def show_newer_visits():
+        if visit_page['number'] > 0:
+            show_visit_history(visit_page['number'] - 1)
+
+    def show_older_visits():
+        if visit_page['number'] + 1 < visit_page['count']:
+            show_visit_history(visit_page['number'] + 1)
+
     def update_visit_tree(rows):
         for row in visit_tree.get_children():
             visit_tree.delete(row)
@@ -407,22 +440,24 @@ def main_app():
 
     # FUNCTION TO INSERT NEW VISIT
     def insert_visit(patient_id, visit_date, reason, diagnosis, treatment, systolic_bp, diastolic_bp, weight, telephone, address, file_uid):
-        # Query the patients table for current values
-        cursor.execute('''
-        SELECT name, systolic_bp, diastolic_bp, weight, telephone, address, file_UID FROM patients WHERE id = ?
-        ''', (patient_id,))
-        patient_data = cursor.fetchone()
+        # Current values come from the in-memory patient index
+        patient_data = lookup_patient(db_path, patient_id)
         if patient_data:
-            name, systolic_bp, diastolic_bp, weight, telephone, address, uid = patient_data
+            name, systolic_bp, diastolic_bp, weight, telephone, address, uid = (
+                patient_data[col] for col in
+                ('name', 'systolic_bp', 'diastolic_bp', 'weight', 'telephone', 'address', 'file_UID'))
 
             # Insert into visits table
-            cursor.execute('''
-            INSERT INTO visits(patient_id, name, visit_date, reason, diagnosis, treatment, systolic_bp, diastolic_bp, weight, telephone, address, file_UID)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (patient_id, name, visit_date, reason, diagnosis, treatment, systolic_bp, diastolic_bp, weight, telephone, address, uid))
+            statements.insert_visit(conn, {
+                'patient_id': patient_id, 'name': name, 'visit_date': visit_date, 'reason': reason,
+                'diagnosis': diagnosis, 'treatment': treatment, 'systolic_bp': systolic_bp,
+                'diastolic_bp': diastolic_bp, 'weight': weight, 'telephone': telephone,
+                'address': address, 'file_UID': uid
+            })
 
             # Commit changes
             conn.commit()
+            visit_history.invalidate(patient_id)
             messagebox.showinfo("Success", "Visit added successfully")
         else:
             messagebox.showerror("Error", "Patient not found!")
@@ -447,7 +482,7 @@ def main_app():
         file_uid = entry_patient_id.get()
 
         insert_visit(patient_id, visit_date, reason, diagnosis, treatment, systolic_bp, diastolic_bp, weight, telephone, address, file_uid)
-        search_visit()
+        show_visit_history()
 
     def display_previous_visit(event):
         selected_item = visit_tree.focus()
@@ -479,18 +514,20 @@ def main_app():
         selected_item = treeview.focus()
 
         if selected_item:
-            item_values = treeview.item(selected_item, 'values')
+            patient = lookup_patient(db_path, treeview.item(selected_item, 'values')[0])
+            if not patient:
+                return
 
-            patient_id = item_values[0]
-            name = item_values[1]
-            w = item_values[5]
-            syst = item_values[9]
-            diast = item_values[10]
-            telephone = item_values[22]
-            address = item_values[19]
-            uid = item_values[-2]
-            qr = item_values[-1]
-            al = item_values[-4]
+            patient_id = patient['id']
+            name = patient['name']
+            w = patient['weight']
+            syst = patient['systolic_bp']
+            diast = patient['diastolic_bp']
+            telephone = patient['telephone']
+            address = patient['address']
+            uid = patient['file_UID']
+            qr = patient['qrcode']
+            al = patient['alerts']
 
             entry_patient_id.config(state='normal')
             entry_patient_id.delete(0, 'end')
@@ -543,7 +580,7 @@ def main_app():
         new_window1.transient(root)
         new_window1.grab_set()
         
-        global customer_name_entry, visit_tree, diag_entry, treat_entry, entry_patient_id, lbl_BP, entry_visit_date, qr_label, entry_diagnosis, entry_treatment, entry_reason, address_entry, id_entry, item_description_entry, syst_entry, diast_entry, w_entry, quantity_entry, price_entry, total_entry, tel_entry, tree
+        global customer_name_entry, visit_tree, visit_page_label, diag_entry, treat_entry, entry_patient_id, lbl_BP, entry_visit_date, qr_label, entry_diagnosis, entry_treatment, entry_reason, address_entry, id_entry, item_description_entry, syst_entry, diast_entry, w_entry, quantity_entry, price_entry, total_entry, tel_entry, tree
 
         p_frame = tk.LabelFrame(new_window1, padx=10, pady=5)
         p_frame.grid(row=0, column=0, sticky='e')
@@ -666,8 +703,15 @@ def main_app():
 
         visit_tree.bind("<<TreeviewSelect>>", display_previous_visit)
 
+        visit_nav = ttk.Frame(right_frame)
+        visit_nav.grid(row=4, column=0, columnspan=4, pady=5)
+        ttk.Button(visit_nav, text="< Newer", command=show_newer_visits).pack(side=tk.LEFT, padx=5)
+        visit_page_label = ttk.Label(visit_nav)
+        visit_page_label.pack(side=tk.LEFT, padx=5)
+        ttk.Button(visit_nav, text="Older >", command=show_older_visits).pack(side=tk.LEFT, padx=5)
+
         display_previous_details()
-        search_visit()
+        show_visit_history()
         
 ############################################################# END OF PRESCRIPTION AND BILLING LOGIC #############################
     # Function to load and display the placeholder image
@@ -818,32 +862,14 @@ def main_app():
         return alerts
 
     def generate_patient_id(gender, birth_date):
-        # Encode gender
-        if gender == 'Male':
-            sex_code = '1'
-        else:
-            sex_code = '2'
-        
-        # Calculate age
-        age = calculate_age(birth_date)
-        age_code = f'{age:02d}'
-        
-        # Encode date of birth as YYMMDD
-        birth_date_code = datetime.strptime(birth_date, '%d-%m-%Y').strftime('%d%m%y')
-        
-        # Generate a unique identifier
-        unique_id = f'{random.randint(1000, 9999):04d}'
-        
-        # Generate unique patient ID
-        patient_id = f'{sex_code}{age_code}{birth_date_code}{unique_id}'
-        
-        return patient_id
+        # Sex, age and birth date, numbered from the prefix's sequence so two
+        # patients never share an ID; call inside db.transaction() so the
+        # number is kept only if the patient is written with it
+        return allocate_file_uid(conn, gender, birth_date)
 
     def check_fields():
-        if entry_name.get() and entry_weight.get() and entry_height.get() and entry_systolic.get() and entry_diastolic.get() and entry_pulse.get() and entry_temperature.get() and entry_telephone.get():
-            register_button.config(state=tk.NORMAL) 
-        else:
-            register_button.config(state=tk.DISABLED)
+        # Only the required fields changed since the last check are read
+        field_checks.check_now()
 
     def register_patient():
         global qr
@@ -882,7 +908,9 @@ def main_app():
             weight_status = weight_status = "Underweight" if bmi < 18.5 else "Normal" if 18.5 <= bmi < 24.9 else "Overweight" if 25 <= bmi < 29.9 else "Obese"
             age = calculate_age(birth_date)
             ideal_weight = calculate_ideal_body_weight(height, gender)
-            uid = generate_patient_id(gender, birth_date)
+            if not confirm_new_patient(db_path, {'name': name, 'birth_date': birth_date,
+                                                 'gender': gender, 'telephone': telephone}):
+                return
 
             # Additional health-related details
             diabetes_status = a.get()
@@ -900,25 +928,42 @@ def main_app():
             physical_activity = sports.get()
             alcohol_consumption = alcohol.get()
             observation_notes = observations.get("1.0", tk.END).strip()
-            qr = create_patient_qr_code(name, uid, birth_date, gender, telephone, marital_status, allergy_status, surgery_status, cancer_status, hypertension_status)
             alerts = ' '.join(assess_health(pulse, temperature, systolic_bp, diastolic_bp, gender, menses))
 
-            cursor.execute('''
-            INSERT INTO patients (name, birth_date, current_date, age, weight, height, bmi, weight_status, 
-                                systolic_bp, diastolic_bp, pulse, temperature, glucose, cholesterol, uric_acid, gender, menses, photo_path, address, 
-                                email, profession, telephone, marital_status, diabetes, kidney, epilepsy, 
-                                allergy, asthma, heart, cancer, surgery, stroke, hypertension, hypotension, 
-                                smoking, sports, alcohol, ideal_weight, alerts, observations, file_UID, qrcode)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (name, birth_date, current_date, age, weight, height, bmi, weight_status, systolic_bp, diastolic_bp, 
-                pulse, temperature, glucose, cholesterol, uric, gender, menses, photo_path, address, email, profession, telephone, marital_status,
-                diabetes_status, kidney_status, epilepsy_status, allergy_status, asthma_status, heart_status,
-                cancer_status, surgery_status, stroke_status, hypertension_status, hypotension_status,
-                smoking_status, physical_activity, alcohol_consumption, ideal_weight, alerts, observation_notes, uid, qr))
-        
-            conn.commit()
-            clear_fields()
-            refresh_treeview()
+            record = {
+                'name': name, 'birth_date': birth_date, 'current_date': current_date, 'age': age,
+                'weight': weight, 'height': height, 'bmi': bmi, 'weight_status': weight_status,
+                'systolic_bp': systolic_bp, 'diastolic_bp': diastolic_bp, 'pulse': pulse,
+                'temperature': temperature, 'glucose': glucose, 'cholesterol': cholesterol, 'uric_acid': uric,
+                'gender': gender, 'menses': menses, 'photo_path': photo_path, 'address': address,
+                'email': email, 'profession': profession, 'telephone': telephone, 'marital_status': marital_status,
+                'diabetes': diabetes_status, 'kidney': kidney_status, 'epilepsy': epilepsy_status,
+                'allergy': allergy_status, 'asthma': asthma_status, 'heart': heart_status,
+                'cancer': cancer_status, 'surgery': surgery_status, 'stroke': stroke_status,
+                'hypertension': hypertension_status, 'hypotension': hypotension_status,
+                'smoking': smoking_status, 'sports': physical_activity, 'alcohol': alcohol_consumption,
+                'ideal_weight': ideal_weight, 'alerts': alerts, 'observations': observation_notes,
+                'qrcode': ''
+            }
+            # The write lock taken for the file number is held only for the insert
+            with db.transaction() as conn:
+                uid = record['file_UID'] = generate_patient_id(gender, birth_date)
+                patient_id = statements.insert_patient(conn, record)
+            patient_saved(db_path, patient_id, record)
+            clear_form()
+
+            # The QR code encodes the committed file number; its file is written
+            # outside the transaction and its path stored afterwards. The
+            # patient stays registered, with no QR code stored, if it fails
+            try:
+                qr = create_patient_qr_code(name, uid, birth_date, gender, telephone, marital_status, allergy_status, surgery_status, cancer_status, hypertension_status)
+                with db.transaction() as conn:
+                    statements.update_patient(conn, patient_id, {'qrcode': qr})
+                patient_saved(db_path, patient_id, {'qrcode': qr})
+            except Exception as e:
+                messagebox.showwarning("QR Code Error",
+                                       f"Patient registered, but the QR code could not be saved:\n{e}")
+                return
             messagebox.showinfo("Success", "Patient registered successfully!")
 
         except ValueError as e:
@@ -1125,136 +1170,60 @@ def main_app():
             physical_activity = sports.get()
             alcohol_consumption = alcohol.get()
             observation_notes = observations.get("1.0", tk.END).strip()
-            uid = generate_patient_id(gender, birth_date)
+            # The patient keeps their file number (printed on their QR code)
+            stored = lookup_patient(db_path, patient_id)
             alerts = ' '.join(assess_health(pulse, temperature, systolic_bp, diastolic_bp, gender, menses))
 
-            cursor.execute('''
-            UPDATE patients SET name=?, birth_date=?, age=?, weight=?, height=?, bmi=?, weight_status=?, 
-                            systolic_bp=?, diastolic_bp=?, pulse=?, temperature=?, glucose=?, cholesterol=?, uric_acid=?, 
-                            gender=?, menses=?, photo_path=?, address=?, 
-                            email=?, profession=?, telephone=?, marital_status=?, diabetes=?, kidney=?, epilepsy=?, 
-                            allergy=?, asthma=?, heart=?, cancer=?, surgery=?, stroke=?, hypertension=?, hypotension=?, 
-                            smoking=?, sports=?, alcohol=?, alerts=?, observations=?, file_UID=?
-            WHERE id=?
-            ''', (name, birth_date, age, weight, height, bmi, weight_status, systolic_bp, diastolic_bp, 
-                pulse, temperature, glucose, cholesterol, uric, gender, menses, photo_path, address, email, 
-                profession, telephone, marital_status, diabetes_status, kidney_status, epilepsy_status, 
-                allergy_status, asthma_status, heart_status,
-                cancer_status, surgery_status, stroke_status, hypertension_status, hypotension_status, 
-                smoking_status, physical_activity, alcohol_consumption, alerts, observation_notes, uid, patient_id))
-            
-            conn.commit()
-            clear_fields()
-            refresh_treeview()
+            changes = {
+                'name': name, 'birth_date': birth_date, 'age': age, 'weight': weight, 'height': height,
+                'bmi': bmi, 'weight_status': weight_status, 'systolic_bp': systolic_bp,
+                'diastolic_bp': diastolic_bp, 'pulse': pulse, 'temperature': temperature,
+                'glucose': glucose, 'cholesterol': cholesterol, 'uric_acid': uric, 'gender': gender,
+                'menses': menses, 'photo_path': photo_path, 'address': address, 'email': email,
+                'profession': profession, 'telephone': telephone, 'marital_status': marital_status,
+                'diabetes': diabetes_status, 'kidney': kidney_status, 'epilepsy': epilepsy_status,
+                'allergy': allergy_status, 'asthma': asthma_status, 'heart': heart_status,
+                'cancer': cancer_status, 'surgery': surgery_status, 'stroke': stroke_status,
+                'hypertension': hypertension_status, 'hypotension': hypotension_status,
+                'smoking': smoking_status, 'sports': physical_activity, 'alcohol': alcohol_consumption,
+                'alerts': alerts, 'observations': observation_notes
+            }
+            with db.transaction() as conn:
+                changes['file_UID'] = (stored['file_UID'] if stored and stored['file_UID']
+                                       else generate_patient_id(gender, birth_date))
+                statements.update_patient(conn, patient_id, changes)
+            patient_saved(db_path, patient_id, changes)
+            clear_form()
             messagebox.showinfo("Success", "Patient updated successfully!")
 
         except ValueError as e:
             messagebox.showerror("Error", f"Invalid input: {e}")
 
     def search_patient():
-        search_term = search_entry.get()
-        cursor.execute('''
-        SELECT * FROM patients WHERE
-        name LIKE ? OR
-        birth_date LIKE ? OR
-        address LIKE ? OR
-        email LIKE ? OR
-        profession LIKE ? OR
-        telephone LIKE ? OR
-        marital_status LIKE ? OR
-        gender LIKE ? OR
-        file_UID LIKE ?
-        ''', ('%'+search_term+'%', '%'+search_term+'%', '%'+search_term+'%', '%'+search_term+'%', '%'+search_term+'%', '%'+search_term+'%', '%'+search_term+'%', '%'+search_term+'%', '%'+search_term+'%'))
-        rows = cursor.fetchall()
-        update_treeview(rows)
+        # Ranked prefix search over name, birth date, address, email, profession,
+        # telephone, marital status, gender and file ID through the FTS5 index,
+        # run on the database worker so a slow query never freezes the window
+        live_search.search_now(force=True)
 
     def display_selected_item(event):
         global photo_path
         selected_item = treeview.focus()
 
         if selected_item:
-            billing_button.config(state=tk.NORMAL)
-
-            item_values = treeview.item(selected_item, 'values')
-            entry_name.delete(0, tk.END)
-            entry_name.insert(0, item_values[1])
-
-            birth_date_entry.set_date(item_values[2])
-
-            entry_weight.delete(0, tk.END)
-            entry_weight.insert(0, item_values[5])
-
-            entry_height.delete(0, tk.END)
-            entry_height.insert(0, item_values[6])
-
-            entry_ibw.delete(0, tk.END)
-            entry_ibw.insert(0, item_values[38])
-
-            entry_systolic.delete(0, tk.END)
-            entry_systolic.insert(0, item_values[9])
-
-            entry_diastolic.delete(0, tk.END)
-            entry_diastolic.insert(0, item_values[10])
-
-            entry_pulse.delete(0, tk.END)
-            entry_pulse.insert(0, item_values[11])
-
-            entry_temperature.delete(0, tk.END)
-            entry_temperature.insert(0, item_values[12])
-
-            entry_glucose.delete(0, tk.END)
-            entry_glucose.insert(0, item_values[13])
-
-            entry_cholesterol.delete(0, tk.END)
-            entry_cholesterol.insert(0, item_values[14])
-
-            entry_uricemia.delete(0, tk.END)
-            entry_uricemia.insert(0, item_values[15])
+            # The list only holds the summary columns; fetch the full record
+            item_values = get_patient_record(db_path, treeview.item(selected_item, 'values')[0])
+            if not item_values:
+                return
 
-            gender_var.set(item_values[16])
+            # Read the visit history in the background so billing opens at once
+            visit_history.prefetch(item_values[0])
+            billing_button.config(state=tk.NORMAL)
 
+            # Only the fields that differ from the patient shown before are
+            # written; the menses date follows the gender's enabled state
+            patient_fields.apply(item_values)
             toggle_menstrual_period_entry(item_values[16])
-
-            if item_values[17] is None or item_values[17] == "":
-                last_menstrual_period_entry.set_date(date.today())
-            else:
-                try:
-                    last_menstrual_period_entry.set_date(item_values[17])
-                except ValueError:
-                    # Handle invalid date format
-                    last_menstrual_period_entry.set_date(date.today())
-
-            entry_address.delete(0, tk.END)
-            entry_address.insert(0, item_values[19])
-
-            entry_email.delete(0, tk.END)
-            entry_email.insert(0, item_values[20])
-
-            entry_profession.delete(0, tk.END)
-            entry_profession.insert(0, item_values[21])
-
-            entry_telephone.delete(0, tk.END)
-            entry_telephone.insert(0, item_values[22])
-
-            marital_status_var.set(item_values[23])
-            
-            # Additional health-related details
-            a.set(item_values[24])
-            renal.set(item_values[25])
-            epilepsy.set(item_values[26])
-            allergy.set(item_values[27])
-            asthma.set(item_values[28])
-            heart.set(item_values[29])
-            cancer.set(item_values[30])
-            surgery.set(item_values[31])
-            stroke.set(item_values[32])
-            hypertension.set(item_values[33])
-            hypotension.set(item_values[34])
-            alcohol.set(item_values[35])
-            sports.set(item_values[36])
-            smoking.set(item_values[37])
-            observations.delete("1.0", tk.END)
-            observations.insert("1.0", item_values[40])
+            menses_field.apply(item_values)
   
             photo_path = item_values[18]
             if photo_path and os.path.exists(photo_path):
@@ -1273,34 +1242,39 @@ def main_app():
         
         confirm = messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this patient?")
         if confirm:
-            cursor.execute("DELETE FROM patients WHERE id=?", (patient_id,))
-            conn.commit()
-            clear_fields()
-            refresh_treeview()
+            with db.transaction() as conn:
+                statements.delete_patient(conn, patient_id)
+            patient_deleted(db_path, patient_id)
+            clear_form()
             messagebox.showinfo("Success", "Patient deleted successfully!")
 
-    def refresh_treeview():
-
-        for row in treeview.get_children():
-            treeview.delete(row)
+    def load_all_patients():
+        future = db_worker.execute(f"SELECT {LIST_PROJECTION} FROM patients", cache=True)
+        deliver(root, future, update_treeview,
+                lambda e: messagebox.showerror("Refresh Error", f"Could not refresh patient list:\n{e}"))
 
-        cursor.execute("SELECT * FROM patients")
+    def refresh_treeview():
+        live_search.reset()
+        load_all_patients()
+        clear_form()
 
-        for row in cursor.fetchall():
-            treeview.insert("", tk.END, values=row)
+        if search_entry.get():
+            search_entry.delete(0, tk.END)
 
+    def clear_form():
+        # The form is cleared, so nothing stays selected; the list keeps its place
+        treeview.clear_selection()
         clear_fields()
 
         billing_button.config(state=tk.DISABLED)
 
-        if search_entry.get():
-            search_entry.delete(0, tk.END)
-
     def update_treeview(rows):
-        for row in treeview.get_children():
-            treeview.delete(row)
-        for row in rows:
-            treeview.insert("", "end", values=row)
+        # Only the rows that differ from what is shown are redrawn
+        treeview.update_rows(rows)
+
+    def show_filtered_patients(rows):
+        live_search.cancel()
+        update_treeview(rows)
 
     def calculate_ideal_body_weight(height, gender):
         height_in_inches = height * 39.3701 # Convert height from meters to inches
@@ -1315,8 +1289,6 @@ def main_app():
 
 
     def generate_pdf(patient_id, file_path, db_path, photo_path=None):
-        conn = None
-
         try:
             # Get file 
             f_path = os.path.join(medease_folder, 'business.txt')
@@ -1340,13 +1312,9 @@ def main_app():
             footer_text = f"{business_info['Business Name']}, {business_info['Business Address']}, {business_info['Business Phone']} | {business_info['Business Email']}"
             logo_path = business_info['Logo Path']
 
-            # Connect to the database
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-
-            # Fetch patient data
-            cursor.execute("SELECT * FROM patients WHERE id=?", (patient_id,))
-            patient_data = cursor.fetchone()
+            # Fetch patient data over the shared connection
+            patient_data = get_connection_manager(db_path).connection().execute(
+                statements.SELECT_PATIENT, (patient_id,)).fetchone()
             if not patient_data:
                 messagebox.showerror("Error", "Patient data not found.")
                 return
@@ -1417,10 +1385,6 @@ def main_app():
             messagebox.showerror("File Error", f"File error occurred: {io_err}")
         except Exception as e:
             messagebox.showerror("Error", f"An unexpected error occurred: {e}")
-        finally:
-            # Ensure the database connection is closed if it was opened
-            if conn:
-                conn.close()
     
     def on_generate_pdf(treeview, db_path):
         selected_item = treeview.focus()
@@ -1451,6 +1415,7 @@ def main_app():
 
     def close_app():
         cap.release()
+        close_all_connections()
         root.destroy()
 
     def validate_email(content):
@@ -1601,7 +1566,10 @@ def main_app():
     file_menu.add_command(label="New Patient", command=clear_fields)
     file_menu.add_command(label="Billing", state=DISABLED, command=open_billing)
     file_menu.add_command(label="Pharmacy", state=DISABLED)
-    file_menu.add_command(label="Dashboard", state=DISABLED)
+    file_menu.add_command(label="Dashboard", command=lambda: open_stats_panel(root, db_path))
+    file_menu.add_command(label="Patient Filters",
+                          command=lambda: open_cohort_panel(root, db_path, show_filtered_patients, LIST_PROJECTION))
+    file_menu.add_command(label="Export Data", command=lambda: open_export_dialog(root, db_path))
     file_menu.add_command(label="Settings", command=open_new_window)
     file_menu.add_command(label="Exit", command=exit_app)
     menu_bar.add_cascade(label="File", menu=file_menu)
@@ -1761,6 +1729,9 @@ def main_app():
     tk.Label(health_history_frame, text="Filter Database").grid(row=7, column=0, sticky=tk.W, pady=5)
     search_entry = tk.Entry(health_history_frame)
     search_entry.grid(row=7, column=1, padx=5)
+    live_search = LiveSearch(search_entry, db_path, update_treeview, on_clear=load_all_patients,
+                             on_error=lambda e: messagebox.showerror("Search Error", f"An error occurred during search:\n{e}"),
+                             select=LIST_PROJECTION)
     search_button = tk.Button(health_history_frame, text='Search DB', border=0, bg='#57a1f8', fg='white', cursor='hand2', command=search_patient)
     search_button.grid(row=7, column=2, pady=5, sticky='w')
 
@@ -1862,8 +1833,9 @@ def main_app():
         "Email", "Profession", "Telephone", "Marital Status"
     )
 
-    # Create the Treeview widget
-    treeview = ttk.Treeview(data_frame, columns=columns, show="headings")
+    # Create the Treeview widget; it only draws the rows in view, so the
+    # full patient list stays cheap at any size
+    treeview = VirtualTreeview(data_frame, columns=columns, show="headings")
 
     # Set the headings and column widths
     for col in columns:
@@ -1887,21 +1859,44 @@ def main_app():
     # Bind the gender selection to the toggle function
     gender_combo.bind("<<ComboboxSelected>>", toggle_menstrual_period_entry)
 
+    # Record columns shown by each widget, filled in one pass by display_selected_item
+    patient_fields = FormBinding()
+    patient_fields.entry('name', entry_name)
+    patient_fields.date('birth_date', birth_date_entry)
+    for column, widget in (('weight', entry_weight), ('height', entry_height), ('ideal_weight', entry_ibw),
+                           ('systolic_bp', entry_systolic), ('diastolic_bp', entry_diastolic),
+                           ('pulse', entry_pulse), ('temperature', entry_temperature),
+                           ('glucose', entry_glucose), ('cholesterol', entry_cholesterol),
+                           ('uric_acid', entry_uricemia), ('address', entry_address), ('email', entry_email),
+                           ('profession', entry_profession), ('telephone', entry_telephone)):
+        patient_fields.entry(column, widget)
+    for column, variable in (('gender', gender_var), ('marital_status', marital_status_var),
+                             ('diabetes', a), ('kidney', renal), ('epilepsy', epilepsy),
+                             ('allergy', allergy), ('asthma', asthma), ('heart', heart), ('cancer', cancer),
+                             ('surgery', surgery), ('stroke', stroke), ('hypertension', hypertension),
+                             ('hypotension', hypotension), ('alcohol', alcohol), ('sports', sports),
+                             ('smoking', smoking)):
+        patient_fields.variable(column, variable)
+    patient_fields.text('observations', observations)
+    menses_field = FormBinding()
+    menses_field.date('menses', last_menstrual_period_entry, fallback=date.today)
+
     treeview.bind("<<TreeviewSelect>>", display_selected_item)
+    # Registering, updating or deleting a patient redraws only that patient's row
+    follow_patient_changes(treeview, db_path)
 
-    entry_name.bind("<KeyRelease>", lambda event: check_fields())
-    entry_weight.bind("<KeyRelease>", lambda event: check_fields())
-    entry_height.bind("<KeyRelease>", lambda event: check_fields())
-    entry_systolic.bind("<KeyRelease>", lambda event: check_fields())
-    entry_diastolic.bind("<KeyRelease>", lambda event: check_fields())
-    entry_pulse.bind("<KeyRelease>", lambda event: check_fields())
-    entry_temperature.bind("<KeyRelease>", lambda event: check_fields())
-    entry_telephone.bind("<KeyRelease>", lambda event: check_fields())
+    # The register button follows the required fields once typing pauses,
+    # instead of every keystroke re-reading all eight of them
+    field_checks = FieldValidator(root, lambda valid: register_button.config(state=tk.NORMAL if valid else tk.DISABLED))
+    for entry in (entry_name, entry_weight, entry_height, entry_systolic, entry_diastolic,
+                  entry_pulse, entry_temperature, entry_telephone):
+        field_checks.add(entry)
 
     refresh_treeview()  # Populate the treeview with data from the database
 
     # Run the application
     root.mainloop()
+    close_all_connections()
 
 if __name__ == "__main__":
     if check_time_limit():
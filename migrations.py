@@ -0,0 +1,276 @@
+# pulse/database/migrations.py
+
+import random
+import sqlite3
+import time
+from collections import namedtuple
+
+from database.db_manager import create_tables
+from database.patient_search import create_fts_index
+from database.name_index import create_name_index
+from database.date_index import create_date_index, backfill_date_index
+from database.clinic_stats import create_clinic_stats
+from database.uid_allocator import create_uid_sequences
+
+# A migration moves the schema from version - 1 to version. `apply` is either a
+# tuple of SQL statements or a callable taking the connection. `probes` are the
+# lookups the migration is meant to speed up; they drive the benchmark that
+# checks each one turned from a table scan into an index seek. `backfill`, if
+# given, fills derived data after the schema change has committed, in its own
+# short transactions; it must be idempotent as `migrate` calls it every time.
+Migration = namedtuple('Migration', ['version', 'description', 'apply', 'probes', 'backfill'],
+                       defaults=(None,))
+
+# `baseline` is the query the probe replaces when the migration also changes
+# how the lookup is written (e.g. LIKE -> MATCH); None means the same query.
+Probe = namedtuple('Probe', ['sql', 'params', 'baseline'], defaults=(None,))
+
+MIGRATIONS = [
+    Migration(1, "Baseline patients and visits tables", create_tables, ()),
+    Migration(
+        2,
+        "Secondary indexes for patient and visit lookups",
+        (
+            "CREATE INDEX IF NOT EXISTS idx_patients_file_uid ON patients(file_UID)",
+            "CREATE INDEX IF NOT EXISTS idx_patients_telephone ON patients(telephone)",
+            "CREATE INDEX IF NOT EXISTS idx_patients_name ON patients(name)",
+            "CREATE INDEX IF NOT EXISTS idx_visits_patient_id ON visits(patient_id)",
+            "CREATE INDEX IF NOT EXISTS idx_visits_name ON visits(name)",
+        ),
+        (
+            Probe("SELECT * FROM patients WHERE file_UID = ?", ('1350101901234',)),
+            Probe("SELECT * FROM patients WHERE telephone = ?", ('+22670000042',)),
+            Probe("SELECT * FROM patients WHERE name = ?", ('Patient 42',)),
+            Probe("SELECT * FROM visits WHERE patient_id = ?", (42,)),
+            Probe("SELECT * FROM visits WHERE name = ?", ('Patient 42',)),
+        ),
+    ),
+    Migration(
+        3,
+        "FTS5 full-text index over patients kept in sync by triggers",
+        create_fts_index,
+        (
+            Probe(
+                "SELECT p.* FROM patients_fts JOIN patients p ON p.id = patients_fts.rowid "
+                "WHERE patients_fts MATCH ? ORDER BY patients_fts.rank",
+                ('{name birth_date address} : ("Patient"* AND "42"*)',),
+                ("SELECT * FROM patients WHERE name LIKE ? OR birth_date LIKE ? OR address LIKE ?",
+                 ('%Patient 42%',) * 3),
+            ),
+        ),
+    ),
+    Migration(
+        4,
+        "Phonetic trigram index over patient names for fuzzy matching",
+        create_name_index,
+        (
+            Probe(
+                "SELECT patient_id FROM patient_name_trigrams WHERE trigram IN (?, ?, ?)",
+                (' ka', 'kab', 'abo'),
+                ("SELECT id FROM patients WHERE name LIKE ?", ('%Kabo%',)),
+            ),
+        ),
+    ),
+    Migration(
+        5,
+        "ISO-8601 shadow columns with indexes for patient and visit dates",
+        create_date_index,
+        (
+            Probe(
+                "SELECT visit_id FROM visit_dates WHERE visit_date BETWEEN ? AND ?",
+                ('2024-03-04', '2024-03-10'),
+                ("SELECT id FROM visits WHERE substr(visit_date, 7, 4) || substr(visit_date, 4, 2) "
+                 "|| substr(visit_date, 1, 2) BETWEEN ? AND ?", ('20240304', '20240310')),
+            ),
+            Probe(
+                "SELECT patient_id FROM patient_dates WHERE birth_date BETWEEN ? AND ?",
+                ('1980-01-01', '1990-12-31'),
+                ("SELECT id FROM patients WHERE substr(birth_date, 7, 4) BETWEEN ? AND ?", ('1980', '1990')),
+            ),
+        ),
+        backfill_date_index,
+    ),
+    Migration(
+        6,
+        "Clinic statistics summary table kept up to date by triggers",
+        create_clinic_stats,
+        (
+            Probe(
+                "SELECT count FROM clinic_stats WHERE metric = ? AND key = ?",
+                ('condition', 'diabetes'),
+                ("SELECT COUNT(*) FROM patients WHERE diabetes != 0", ()),
+            ),
+            Probe(
+                "SELECT key, count FROM clinic_stats WHERE metric = ?",
+                ('gender',),
+                ("SELECT gender, COUNT(*) FROM patients GROUP BY gender", ()),
+            ),
+            Probe(
+                "SELECT key, count FROM clinic_stats WHERE metric = ? AND key BETWEEN ? AND ?",
+                ('visit_day', '2024-03-01', '2024-03-31'),
+                ("SELECT visit_date, COUNT(*) FROM visits GROUP BY visit_date", ()),
+            ),
+        ),
+    ),
+    # file_UID lookups were already indexed by v2; this one is about integrity
+    Migration(7, "Sequence-backed file_UID allocation with a UNIQUE index", create_uid_sequences, ()),
+]
+
+
+def current_version(conn):
+    """Return the schema version stored in PRAGMA user_version."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _apply(conn, migration):
+    """Apply one migration and bump user_version in the same transaction."""
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Another instance may have migrated while we waited for the lock
+        if current_version(conn) >= migration.version:
+            conn.rollback()
+            return False
+        if callable(migration.apply):
+            migration.apply(conn)
+        else:
+            for statement in migration.apply:
+                conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return True
+
+
+def migrate(conn, migrations=MIGRATIONS, target=None):
+    """
+    Bring the database schema up to date.
+
+    Migrations newer than the stored PRAGMA user_version are applied in order,
+    each in its own transaction, so existing deployments upgrade in place.
+    Backfills of applied migrations then run in batches; they only find work
+    right after an upgrade or after an interrupted backfill.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        migrations (list): Ordered list of Migration entries.
+        target (int): Stop after this version (default: latest).
+
+    Returns:
+        list: Versions that were applied.
+    """
+    applied = []
+    version = current_version(conn)
+    for migration in migrations:
+        if migration.version <= version:
+            continue
+        if target is not None and migration.version > target:
+            break
+        if _apply(conn, migration):
+            applied.append(migration.version)
+    version = current_version(conn)
+    for migration in migrations:
+        if migration.backfill is not None and migration.version <= version:
+            migration.backfill(conn)
+    return applied
+
+
+def explain(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN details of a statement as one string."""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return "; ".join(row[-1] for row in rows)
+
+
+def uses_index(plan):
+    """Check whether a query plan seeks through an index instead of scanning."""
+    first_step = plan.split('; ')[0]
+    return (
+        # SEARCH steps seek; "SCAN ... USING COVERING INDEX" still reads every entry
+        first_step.startswith('SEARCH')
+        # FTS5 answers MATCH constraints ("M" in the index string) from its index
+        or ('VIRTUAL TABLE INDEX' in first_step and ':M' in first_step)
+    )
+
+
+def _time_query(conn, sql, params, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / repeat
+
+
+def seed_benchmark_data(conn, patients=20000, visits_per_patient=2):
+    """Fill an empty database with synthetic patients and visits for benchmarking."""
+    rng = random.Random(42)
+    conn.executemany(
+        "INSERT INTO patients (id, name, birth_date, telephone, gender, file_UID) VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (i, f"Patient {i}", f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.randint(1940, 2020)}",
+             f"+2267{i:07d}", rng.choice(("Male", "Female")), f"{rng.randint(1, 2)}{rng.randint(10, 99)}{i:010d}")
+            for i in range(1, patients + 1)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO visits (patient_id, name, visit_date, reason) VALUES (?, ?, ?, ?)",
+        (
+            (i, f"Patient {i}", f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2024", "Checkup")
+            for i in range(1, patients + 1) for _ in range(visits_per_patient)
+        ),
+    )
+    conn.commit()
+
+
+def benchmark_migrations(migrations=MIGRATIONS, patients=20000, repeat=20):
+    """
+    Benchmark every migration's probe queries before and after it is applied.
+
+    An in-memory database is migrated up to the version just before each
+    migration, filled with synthetic rows, and each probe is planned and timed
+    on both sides of the migration.
+
+    Returns:
+        list: One dict per probe with the plans, timings and an `index_seek`
+        flag that is True when the scan turned into an index seek.
+    """
+    results = []
+    for migration in migrations:
+        if not migration.probes:
+            continue
+        conn = sqlite3.connect(':memory:')
+        try:
+            migrate(conn, migrations, target=migration.version - 1)
+            seed_benchmark_data(conn, patients)
+            before = []
+            for probe in migration.probes:
+                sql, params = probe.baseline or (probe.sql, probe.params)
+                before.append((explain(conn, sql, params), _time_query(conn, sql, params, repeat)))
+            _apply(conn, migration)
+            if migration.backfill is not None:
+                migration.backfill(conn)
+            for probe, (plan_before, time_before) in zip(migration.probes, before):
+                sql, params = probe.sql, probe.params
+                plan_after = explain(conn, sql, params)
+                results.append({
+                    'version': migration.version,
+                    'query': sql,
+                    'plan_before': plan_before,
+                    'plan_after': plan_after,
+                    'ms_before': time_before * 1000,
+                    'ms_after': _time_query(conn, sql, params, repeat) * 1000,
+                    'index_seek': not uses_index(plan_before) and uses_index(plan_after),
+                })
+        finally:
+            conn.close()
+    return results
+
+
+if __name__ == "__main__":
+    # Benchmark the migrations against a synthetic database
+    for result in benchmark_migrations():
+        status = "OK  " if result['index_seek'] else "FAIL"
+        print(f"{status} v{result['version']} {result['query']}")
+        print(f"     before: {result['plan_before']} ({result['ms_before']:.3f} ms)")
+        print(f"     after:  {result['plan_after']} ({result['ms_after']:.3f} ms)")
@@ -0,0 +1,233 @@
+# pulse/database/name_index.py
+
+import re
+import unicodedata
+from functools import lru_cache
+
+TRIGRAM_TABLE = 'patient_name_trigrams'
+KEY_TABLE = 'patient_name_keys'
+DIRTY_TABLE = 'patient_name_dirty'
+
+FUZZY_THRESHOLD = 0.35   # minimum Dice similarity of trigram sets
+FUZZY_LIMIT = 50
+
+# Spelling variants that sound alike in the transliterated names seen at the
+# clinics (French and English spellings of West African and Arabic names),
+# applied in order to each lower-case ASCII word.
+PHONETIC_RULES = tuple((re.compile(pattern), replacement) for pattern, replacement in (
+    (r'ph', 'f'),
+    (r'ck', 'k'),
+    (r'q', 'k'),
+    (r'c(?=[aou]|$)', 'k'),
+    (r'c(?=[eiy])', 's'),
+    (r'dj', 'j'),
+    (r'gu(?=[ei])', 'g'),
+    (r'ou', 'u'),
+    (r'oo', 'u'),
+    (r'w', 'u'),
+    (r'ee', 'i'),
+    (r'y', 'i'),
+    (r'z', 's'),
+    (r'(?<=[^cs])h', ''),
+    (r'^h', ''),
+    (r'(.)\1+', r'\1'),
+))
+
+
+@lru_cache(maxsize=65536)
+def _word_key(word):
+    for pattern, replacement in PHONETIC_RULES:
+        word = pattern.sub(replacement, word)
+    return word
+
+
+def name_key(name):
+    """
+    Reduce a name to its phonetic key.
+
+    Accents and punctuation are dropped and common spelling variants are
+    folded together, e.g. "Ouédraogo" and "Wedrahogo" both give "uedraogo".
+    """
+    text = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode().lower()
+    words = (_word_key(word) for word in re.sub(r'[^a-z]+', ' ', text).split())
+    return ' '.join(word for word in words if word)
+
+
+def trigrams(key):
+    """Return the set of padded trigrams of every word in a phonetic key."""
+    grams = set()
+    for word in key.split():
+        # One space of padding: a "  x" gram per first letter would match a
+        # large share of all names and only slow the lookup down
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def create_name_index(conn):
+    """
+    Create the fuzzy name index over patients and fill it.
+
+    Triggers only queue the ids of inserted, renamed or deleted patients in
+    patient_name_dirty; their trigrams are computed in Python (the phonetic
+    rules are not expressible in SQL) by `index_names`, which the shared
+    write path calls right away and every fuzzy search calls for anything
+    written by other code. Stale postings are found again from the stored
+    key, so the posting table needs no second index on patient_id.
+    """
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {TRIGRAM_TABLE} (
+            trigram TEXT NOT NULL,
+            patient_id INTEGER NOT NULL,
+            PRIMARY KEY (trigram, patient_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {KEY_TABLE} (
+            patient_id INTEGER PRIMARY KEY,
+            name_key TEXT,
+            trigram_count INTEGER
+        )
+    ''')
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {DIRTY_TABLE} (patient_id INTEGER PRIMARY KEY)")
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS patients_name_ai AFTER INSERT ON patients BEGIN
+            INSERT OR IGNORE INTO {DIRTY_TABLE}(patient_id) VALUES (new.id);
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS patients_name_au AFTER UPDATE OF name ON patients BEGIN
+            INSERT OR IGNORE INTO {DIRTY_TABLE}(patient_id) VALUES (new.id);
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS patients_name_ad AFTER DELETE ON patients BEGIN
+            INSERT OR IGNORE INTO {DIRTY_TABLE}(patient_id) VALUES (old.id);
+        END
+    ''')
+    conn.execute(f"INSERT OR IGNORE INTO {DIRTY_TABLE}(patient_id) SELECT id FROM patients")
+    index_names(conn)
+
+
+def has_name_index(conn):
+    """Check whether the fuzzy name index exists in this database."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (KEY_TABLE,)
+    ).fetchone()
+    return row is not None
+
+
+def index_names(conn, patient_ids=None):
+    """
+    (Re)compute the trigrams of queued patients.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        patient_ids (list): Only these patients (default: everything queued).
+
+    Returns:
+        int: Number of patients indexed.
+    """
+    if patient_ids is None:
+        patient_ids = [row[0] for row in conn.execute(f"SELECT patient_id FROM {DIRTY_TABLE}")]
+    if not patient_ids:
+        return 0
+
+    old_postings, new_postings, keys = [], [], []
+    for start in range(0, len(patient_ids), 500):
+        chunk = list(patient_ids[start:start + 500])
+        placeholders = ', '.join('?' for _ in chunk)
+        old_keys = dict(conn.execute(
+            f"SELECT patient_id, name_key FROM {KEY_TABLE} WHERE patient_id IN ({placeholders})", chunk))
+        names = dict(conn.execute(f"SELECT id, name FROM patients WHERE id IN ({placeholders})", chunk))
+        for patient_id in chunk:
+            old_grams = trigrams(old_keys[patient_id]) if patient_id in old_keys else set()
+            if patient_id in names:
+                key = name_key(names[patient_id])
+                grams = trigrams(key)
+                keys.append((patient_id, key, len(grams)))
+            else:
+                grams = set()  # deleted patient
+            old_postings.extend((gram, patient_id) for gram in old_grams - grams)
+            new_postings.extend((gram, patient_id) for gram in grams - old_grams)
+
+    ids = [(patient_id,) for patient_id in patient_ids]
+    # Sorted postings hit the WITHOUT ROWID b-tree in order, which keeps bulk builds fast
+    conn.executemany(f"DELETE FROM {TRIGRAM_TABLE} WHERE trigram = ? AND patient_id = ?", sorted(old_postings))
+    conn.executemany(f"INSERT OR IGNORE INTO {TRIGRAM_TABLE}(trigram, patient_id) VALUES (?, ?)", sorted(new_postings))
+    conn.executemany(f"DELETE FROM {KEY_TABLE} WHERE patient_id = ?", ids)
+    conn.executemany(f"INSERT INTO {KEY_TABLE}(patient_id, name_key, trigram_count) VALUES (?, ?, ?)", keys)
+    conn.executemany(f"DELETE FROM {DIRTY_TABLE} WHERE patient_id = ?", ids)
+    return len(ids)
+
+
+def refresh_name_index(conn):
+    """Index patients written since the last refresh, committing if anything changed."""
+    if conn.execute(f"SELECT 1 FROM {DIRTY_TABLE} LIMIT 1").fetchone() is None:
+        return 0
+    in_transaction = conn.in_transaction
+    count = index_names(conn)
+    if not in_transaction:
+        conn.commit()
+    return count
+
+
+def match_names(conn, term, limit=FUZZY_LIMIT, threshold=FUZZY_THRESHOLD):
+    """
+    Find patients whose name sounds or is spelled like `term`.
+
+    Similarity is the Dice coefficient of the phonetic trigram sets, so
+    typos, swapped words and transliteration variants still score high.
+
+    Returns:
+        list: (patient_id, similarity) pairs, best first.
+    """
+    refresh_name_index(conn)
+    grams = trigrams(name_key(term))
+    if not grams:
+        return []
+
+    # Dice >= threshold needs at least threshold * |query| / 2 shared trigrams
+    min_shared = max(1, int(threshold * len(grams) / 2))
+    placeholders = ', '.join('?' for _ in grams)
+    # Count shared trigrams first and only look up the key of candidates
+    # that pass the bound
+    return conn.execute(f'''
+        SELECT g.patient_id, 2.0 * g.shared / (? + k.trigram_count) AS similarity
+        FROM (
+            SELECT patient_id, COUNT(*) AS shared FROM {TRIGRAM_TABLE}
+            WHERE trigram IN ({placeholders})
+            GROUP BY patient_id
+            HAVING COUNT(*) >= ?
+        ) g
+        JOIN {KEY_TABLE} k ON k.patient_id = g.patient_id
+        WHERE similarity >= ?
+        ORDER BY similarity DESC, g.patient_id
+        LIMIT ?
+    ''', (len(grams), *grams, min_shared, threshold, limit)).fetchall()
+
+
+def fuzzy_search_patients(conn, term, select='*', limit=FUZZY_LIMIT, threshold=FUZZY_THRESHOLD):
+    """
+    Return patient rows whose names fuzzily match `term`, most similar first.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        term (str): Name typed by the user.
+        select (str): Projection of `patients` columns to return.
+        limit (int): Maximum number of rows.
+        threshold (float): Minimum similarity between 0 and 1.
+
+    Returns:
+        list: Matching patient rows.
+    """
+    matches = match_names(conn, term, limit, threshold)
+    if not matches:
+        return []
+    order = {patient_id: rank for rank, (patient_id, _) in enumerate(matches)}
+    placeholders = ', '.join('?' for _ in matches)
+    rows = conn.execute(
+        f"SELECT id, {select} FROM patients WHERE id IN ({placeholders})", list(order)
+    ).fetchall()
+    rows.sort(key=lambda row: order[row[0]])
+    return [row[1:] for row in rows]
@@ -0,0 +1,226 @@
+# pulse/database/patient_fields.py
+
+import re
+from datetime import datetime
+
+# Checks and derived values for patient fields, with no Tk dependency so
+# the bulk importer can run headless; utils.validators re-exports them
+
+
+def is_valid_date(date_str, date_format="%Y-%m-%d"):
+    """
+    Check if a string is a valid date.
+    
+    Args:
+        date_str (str): The date string to validate.
+        date_format (str): Expected format (default: YYYY-MM-DD)
+
+    Returns:
+        bool: True if valid date, False otherwise.
+    """
+    try:
+        datetime.strptime(date_str, date_format)
+        return True
+    except ValueError:
+        return False
+
+def validate_email(content):
+    """
+    Validate an email address using regex.
+    
+    Args:
+        content (str): Email string to check.
+    
+    Returns:
+        bool: True if valid, False otherwise.
+    """
+    email_pattern = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
+    return re.match(email_pattern, content) is not None
+
+
+def validate_phone(phone: str) -> bool:
+    """
+    Validate phone number format.
+    
+    Args:
+        phone (str): Phone number to validate.
+    
+    Returns:
+        bool: True if valid, False otherwise.
+    """
+    phone_pattern = r'^\+?1?\d{9,15}$'
+    return re.match(phone_pattern, phone) is not None
+
+
+def validate_weight(weight: str) -> bool:
+    """
+    Check if weight is a positive float.
+    
+    Args:
+        weight (str): Weight input as string.
+    
+    Returns:
+        bool: True if valid, False otherwise.
+    """
+    try:
+        value = float(weight)
+        return value > 0
+    except ValueError:
+        return False
+
+
+def validate_height(height: str) -> bool:
+    """
+    Check if height is within human range (0.5m - 2.5m).
+    
+    Args:
+        height (str): Height in meters.
+    
+    Returns:
+        bool: True if valid, False otherwise.
+    """
+    try:
+        value = float(height)
+        return 0.5 <= value <= 2.5
+    except ValueError:
+        return False
+
+
+def validate_blood_pressure(systolic: str, diastolic: str) -> bool:
+    """
+    Validate systolic and diastolic blood pressure values.
+    
+    Args:
+        systolic (str): Systolic BP value.
+        diastolic (str): Diastolic BP value.
+    
+    Returns:
+        bool: True if both are valid integers within normal ranges.
+    """
+    try:
+        sys_val = int(systolic)
+        dia_val = int(diastolic)
+        return 50 <= sys_val <= 250 and 30 <= dia_val <= 180
+    except ValueError:
+        return False
+
+
+def validate_pulse(pulse: str) -> bool:
+    """
+    Validate that pulse rate is a reasonable integer.
+    
+    Args:
+        pulse (str): Pulse input as string.
+    
+    Returns:
+        bool: True if valid, False otherwise.
+    """
+    try:
+        value = int(pulse)
+        return 30 <= value <= 200
+    except ValueError:
+        return False
+
+
+def validate_temperature(temp: str) -> bool:
+    """
+    Validate body temperature is within a realistic range.
+    
+    Args:
+        temp (str): Temperature input as string.
+    
+    Returns:
+        bool: True if valid, False otherwise.
+    """
+    try:
+        value = float(temp)
+        return 34.0 <= value <= 42.0
+    except ValueError:
+        return False
+
+
+def validate_name(name: str) -> bool:
+    """
+    Validate that name contains only letters and spaces.
+    
+    Args:
+        name (str): Name input as string.
+    
+    Returns:
+        bool: True if valid, False otherwise.
+    """
+    return bool(re.match(r'^[A-Za-z\s\-\' ]+$', name.strip()))
+
+
+def calculate_age(birth_date: str) -> int:
+    """
+    Calculate age from birth date.
+    
+    Args:
+        birth_date (str): Birth date in 'dd-mm-yyyy' format.
+    
+    Returns:
+        int: Calculated age.
+    """
+    today = datetime.today()
+    birth_date = datetime.strptime(birth_date, "%d-%m-%Y")
+    age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+    return age
+
+
+def calculate_bmi(weight: float, height: float) -> float:
+    """
+    Calculate BMI from weight and height.
+    
+    Args:
+        weight (float): Weight in kg.
+        height (float): Height in meters.
+    
+    Returns:
+        float: BMI value rounded to two decimal places.
+    """
+    try:
+        bmi = weight / (height ** 2)
+        return round(bmi, 2)
+    except ZeroDivisionError:
+        return None
+
+
+def get_weight_status(bmi: float) -> str:
+    """
+    Classify a BMI value into a weight status.
+    
+    Args:
+        bmi (float): Body mass index.
+    
+    Returns:
+        str: 'Underweight', 'Normal', 'Overweight' or 'Obese' (None if bmi is None).
+    """
+    if bmi is None:
+        return None
+    if bmi < 18.5:
+        return "Underweight"
+    if bmi < 25:
+        return "Normal"
+    if bmi < 30:
+        return "Overweight"
+    return "Obese"
+
+
+def calculate_ideal_body_weight(height: float, gender: str) -> float:
+    """
+    Calculate ideal body weight based on Devine formula.
+    
+    Args:
+        height (float): Height in meters.
+        gender (str): Gender ('Male' or 'Female').
+    
+    Returns:
+        float: Ideal body weight in kg.
+    """
+    height_in_inches = height * 39.3701  # Convert height to inches
+    if gender == "Male":
+        ibw = 50 + 2.3 * (height_in_inches - 60)
+    else:
+        ibw = 45.5 + 2.3 * (height_in_inches - 60)
+    return round(ibw, 2)
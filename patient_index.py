@@ -0,0 +1,364 @@
+# pulse/database/patient_index.py
+
+import math
+import os
+import re
+import threading
+import time
+from array import array
+
+from database.db_manager import get_connection_manager
+from database.statements import CONDITION_COLUMNS, PATIENT_DEFAULTS
+
+# Columns kept in memory for every patient: what the billing and visit
+# forms copy from the patient record, plus the lookup keys.
+LOOKUP_COLUMNS = (
+    'name', 'file_UID', 'telephone', 'address', 'weight',
+    'systolic_bp', 'diastolic_bp', 'alerts', 'qrcode'
+)
+
+# Numeric columns cohort filters can ask a range of
+RANGE_COLUMNS = ('age', 'bmi', 'systolic_bp', 'diastolic_bp')
+
+# Seconds between checks for writes made by other connections or processes
+STALE_CHECK_INTERVAL = 1.0
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_telephone(telephone):
+    """
+    Reduce a telephone number to its digits for lookups.
+
+    Spaces, dashes, dots and brackets are dropped and a leading "00" is read
+    as "+", so "+226 70-12-34-56" and "0022670123456" give the same key.
+
+    Returns:
+        str: The key, or '' if the number has no digits.
+    """
+    text = str(telephone or '').strip()
+    if text.startswith('00'):
+        text = '+' + text[2:]
+    digits = _NON_DIGITS.sub('', text)
+    if not digits:
+        return ''
+    return '+' + digits if text.startswith('+') else digits
+
+
+def _number(value):
+    # Form values may have been stored as text; anything unreadable is NaN,
+    # which fails every range comparison
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+# bytes.translate tables turning a byte into b'1' or b'0' for one of its bits
+_BIT_TABLES = tuple(bytes(ord('1') if byte >> bit & 1 else ord('0') for byte in range(256))
+                    for bit in range(8))
+
+# Packs the condition flags of a row into one integer, bit i = CONDITION_COLUMNS[i]
+_PACKED_CONDITIONS = ' | '.join(f'((COALESCE("{col}", 0) != 0) << {bit})'
+                                for bit, col in enumerate(CONDITION_COLUMNS))
+
+
+def _bitmaps(masks, count):
+    """Split packed condition masks into one bitmap per flag (bit i = row i)."""
+    bitmaps = []
+    for shift in range(0, count, 8):
+        # One byte of each mask, last row first so row 0 ends up as bit 0
+        column = bytes(mask >> shift & 0xFF for mask in reversed(masks))
+        for bit in range(min(8, count - shift)):
+            bitmaps.append(int(column.translate(_BIT_TABLES[bit]) or b'0', 2))
+    return bitmaps
+
+
+def _set_bits(bits):
+    text = bin(bits)[:1:-1]
+    slots = []
+    slot = text.find('1')
+    while slot != -1:
+        slots.append(slot)
+        slot = text.find('1', slot + 1)
+    return slots
+
+
+class PatientIndex:
+    """
+    In-memory point lookups and cohort filters over patients.
+
+    LOOKUP_COLUMNS are stored column-wise: one list per column plus an
+    array of ids, all indexed by a slot number. Three dicts map id,
+    file_UID and normalized telephone to slots. Each condition flag is a
+    bitmap (a Python int, bit = slot) and RANGE_COLUMNS are float arrays,
+    so a flag combination is a few bitwise ANDs and ranges are only checked
+    on the slots left over.
+
+    The whole table is read with one query on first use; after that the
+    write paths keep it exact through `put` and `remove`, so lookups do not
+    touch SQLite. Writes by another connection or process (bulk imports, a
+    second instance) bump SQLite's data_version, which is checked at most
+    every STALE_CHECK_INTERVAL seconds and triggers a full reload. The
+    counter is per connection, so a thread's first check only records its
+    starting value.
+    """
+
+    def __init__(self, db_path, check_interval=STALE_CHECK_INTERVAL):
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._checked_at = 0.0
+        self._versions = {}
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+        self._reset()
+
+    def _reset(self):
+        self._ids = array('q')
+        self._columns = {col: [] for col in LOOKUP_COLUMNS}
+        self._numbers = {col: array('d') for col in RANGE_COLUMNS}
+        self._flags = dict.fromkeys(CONDITION_COLUMNS, 0)
+        self._live = 0
+        self._free = []
+        self._slot_by_id = {}
+        self._slot_by_uid = {}
+        self._slots_by_phone = {}
+
+    def _data_version(self, conn):
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load(self, conn=None):
+        """(Re)build the index from the patients table."""
+        conn = conn or get_connection_manager(self.db_path).connection()
+        selected = LOOKUP_COLUMNS + ('age', 'bmi')
+        projection = ', '.join(f'"{col}"' for col in selected)
+        with self._lock:
+            self._reset()
+            rows = conn.execute(f"SELECT id, {projection}, {_PACKED_CONDITIONS} FROM patients").fetchall()
+            if rows:
+                ids, *columns, masks = zip(*rows)
+                columns = dict(zip(selected, columns))
+                self._ids = array('q', ids)
+                self._columns = {col: list(columns[col]) for col in LOOKUP_COLUMNS}
+                self._numbers = {col: array('d', map(_number, columns[col])) for col in RANGE_COLUMNS}
+                self._flags = dict(zip(CONDITION_COLUMNS, _bitmaps(masks, len(CONDITION_COLUMNS))))
+                self._live = (1 << len(ids)) - 1
+                self._slot_by_id = dict(zip(ids, range(len(ids))))
+                for slot in range(len(ids)):
+                    self._link(slot)
+            # data_version is only comparable within one connection
+            self._versions = {id(conn): self._data_version(conn)}
+            self._checked_at = time.monotonic()
+            self._loaded = True
+            self.loads += 1
+
+    def _ensure_fresh(self):
+        if not self._loaded:
+            self.load()
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        conn = get_connection_manager(self.db_path).connection()
+        version = self._data_version(conn)
+        known = self._versions.setdefault(id(conn), version)
+        if version != known:
+            self.load(conn)
+        else:
+            self._checked_at = now
+
+    def _store(self, patient_id, values):
+        # A new patient's unwritten columns hold the INSERT defaults
+        values = {col: values.get(col, PATIENT_DEFAULTS.get(col))
+                  for col in LOOKUP_COLUMNS + RANGE_COLUMNS + CONDITION_COLUMNS}
+        slot = self._free.pop() if self._free else None
+        if slot is None:
+            slot = len(self._ids)
+            self._ids.append(patient_id)
+            for col in LOOKUP_COLUMNS:
+                self._columns[col].append(None)
+            for col in RANGE_COLUMNS:
+                self._numbers[col].append(math.nan)
+        else:
+            self._ids[slot] = patient_id
+        self._slot_by_id[patient_id] = slot
+        self._live |= 1 << slot
+        self._write(slot, values)
+        self._link(slot)
+
+    def _write(self, slot, values):
+        for col in LOOKUP_COLUMNS:
+            if col in values:
+                self._columns[col][slot] = values[col]
+        for col in RANGE_COLUMNS:
+            if col in values:
+                self._numbers[col][slot] = _number(values[col])
+        bit = 1 << slot
+        for col in CONDITION_COLUMNS:
+            if col in values:
+                if values[col]:
+                    self._flags[col] |= bit
+                else:
+                    self._flags[col] &= ~bit
+
+    def _link(self, slot):
+        uid = self._columns['file_UID'][slot]
+        if uid:
+            self._slot_by_uid[uid] = slot
+        phone = normalize_telephone(self._columns['telephone'][slot])
+        if phone:
+            self._slots_by_phone.setdefault(phone, []).append(slot)
+
+    def _unlink(self, slot):
+        uid = self._columns['file_UID'][slot]
+        if uid and self._slot_by_uid.get(uid) == slot:
+            del self._slot_by_uid[uid]
+        phone = normalize_telephone(self._columns['telephone'][slot])
+        slots = self._slots_by_phone.get(phone)
+        if slots and slot in slots:
+            slots.remove(slot)
+            if not slots:
+                del self._slots_by_phone[phone]
+
+    def _entry(self, slot):
+        entry = {col: self._columns[col][slot] for col in LOOKUP_COLUMNS}
+        entry['id'] = self._ids[slot]
+        return entry
+
+    def get(self, patient_id):
+        """Return the lookup columns of a patient as a dict (with 'id'), or None."""
+        with self._lock:
+            self._ensure_fresh()
+            slot = self._slot_by_id.get(int(patient_id))
+            return self._found(slot)
+
+    def find_by_file_uid(self, file_uid):
+        """Return the patient with this file_UID, or None."""
+        with self._lock:
+            self._ensure_fresh()
+            return self._found(self._slot_by_uid.get(str(file_uid).strip()))
+
+    def find_by_telephone(self, telephone):
+        """Return every patient sharing this telephone number (e.g. a family)."""
+        key = normalize_telephone(telephone)
+        with self._lock:
+            self._ensure_fresh()
+            slots = self._slots_by_phone.get(key, []) if key else []
+            if slots:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return [self._entry(slot) for slot in sorted(slots, key=self._ids.__getitem__)]
+
+    def _found(self, slot):
+        if slot is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._entry(slot)
+
+    def select(self, conditions=(), without=(), ranges=None):
+        """
+        Return the ids of patients matching a cohort filter.
+
+        Args:
+            conditions (iterable): Flags every patient must have.
+            without (iterable): Flags no patient may have.
+            ranges (dict): RANGE_COLUMNS mapped to (low, high) bounds,
+                inclusive; None leaves that side open. Patients with no
+                value for a filtered column are left out.
+
+        Returns:
+            list: Matching patient ids in ascending order.
+        """
+        unknown = (set(conditions) | set(without)) - set(CONDITION_COLUMNS)
+        unknown |= set(ranges or ()) - set(RANGE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown filter columns: {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            self._ensure_fresh()
+            ranges = [(self._numbers[col], -math.inf if low is None else low, math.inf if high is None else high)
+                      for col, (low, high) in (ranges or {}).items()]
+            if conditions or without or not ranges:
+                bits = self._live
+                for col in conditions:
+                    bits &= self._flags[col]
+                for col in without:
+                    bits &= ~self._flags[col]
+                slots = _set_bits(bits)
+            else:
+                # Ranges only: scan the first column directly; free slots
+                # hold NaN and never match
+                values, low, high = ranges.pop(0)
+                slots = [slot for slot, value in enumerate(values) if low <= value <= high]
+            for values, low, high in ranges:
+                slots = [slot for slot in slots if low <= values[slot] <= high]
+            return sorted(self._ids[slot] for slot in slots)
+
+    def put(self, patient_id, values):
+        """
+        Record an inserted or updated patient.
+
+        Args:
+            patient_id (int): Patient id.
+            values (dict): Columns written; others keep their indexed value.
+        """
+        patient_id = int(patient_id)
+        with self._lock:
+            if not self._loaded:
+                return  # the first lookup reads everything anyway
+            slot = self._slot_by_id.get(patient_id)
+            if slot is None:
+                self._store(patient_id, values)
+                return
+            self._unlink(slot)
+            self._write(slot, values)
+            self._link(slot)
+
+    def remove(self, patient_id):
+        """Forget a deleted patient."""
+        with self._lock:
+            slot = self._slot_by_id.pop(int(patient_id), None)
+            if slot is None:
+                return
+            self._unlink(slot)
+            self._ids[slot] = 0
+            for col in LOOKUP_COLUMNS:
+                self._columns[col][slot] = None
+            self._write(slot, dict.fromkeys(RANGE_COLUMNS + CONDITION_COLUMNS))
+            self._live &= ~(1 << slot)
+            self._free.append(slot)
+
+    def clear(self):
+        """Drop everything; the next lookup reloads the table."""
+        with self._lock:
+            self._reset()
+            self._loaded = False
+
+    def stats(self):
+        """Return size, load count and hit/miss counters."""
+        with self._lock:
+            return {
+                'patients': len(self._slot_by_id),
+                'loads': self.loads,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_patient_index(db_path):
+    """Return the process-wide PatientIndex for a database file."""
+    key = os.path.abspath(db_path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = PatientIndex(db_path)
+        return index
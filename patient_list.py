@@ -0,0 +1,148 @@
+# pulse/ui/patient_list.py
+
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Sequence
+
+from database.db_manager import get_connection_manager
+from database.patient_manager import fetch_patient_page
+
+PAGE_SIZE = 200   # rows read per query as they scroll into view
+MAX_PAGES = 20    # pages kept in memory per list
+
+
+class PatientRows(Sequence):
+    """
+    Every patient in id order, as a sequence that reads its rows lazily.
+
+    Opening it only counts the patients. A row is read with the rest of its
+    page, by keyset (`WHERE id > ? ORDER BY id LIMIT ?`), the first time it
+    is asked for, and the last `max_pages` pages are kept. Reading a page
+    also gives the id the next page starts after, so scrolling down never
+    skips rows; a page jumped to (by dragging the scrollbar) is found by
+    stepping over the ids from the nearest known page or from the end. A
+    VirtualTreeview showing it reads only the pages the user scrolls
+    through. Rows can be replaced, deleted or appended as single patients
+    are saved.
+    """
+
+    def __init__(self, db_path, columns='*', page_size=PAGE_SIZE, max_pages=MAX_PAGES):
+        self.db_path = db_path
+        self.columns = columns  # must start with id
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.count = self._conn().execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+        self._pages = OrderedDict()   # page number -> (rows, number read from the database)
+        self._after = {0: 0}    # page number -> id the page starts after
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        number, position = divmod(index, self.page_size)
+        loaded = self._pages.get(number)
+        if loaded is None:
+            loaded = self._load(number)
+        else:
+            self._pages.move_to_end(number)
+        return loaded[0][position]
+
+    def __setitem__(self, index, row):
+        # A patient was saved: refresh its row if its page is loaded
+        loaded = self._pages.get(index // self.page_size)
+        if loaded is not None:
+            loaded[0][index % self.page_size] = row
+
+    def __delitem__(self, index):
+        # Later rows move up a place, so their pages are read again
+        self.count -= 1
+        number = index // self.page_size
+        for loaded in [loaded for loaded in self._pages if loaded >= number]:
+            del self._pages[loaded]
+        for later in [later for later in self._after if later > number]:
+            del self._after[later]
+
+    def append(self, row):
+        """Add a newly registered patient's row at the end."""
+        self.count += 1
+        self._pages.pop((self.count - 1) // self.page_size, None)
+
+    def index_of(self, patient_id):
+        """Return the index of a patient's row, or None."""
+        patient_id = int(patient_id)
+        for number, (page, read) in self._pages.items():
+            # Only the rows read from the database, not the blanks after them
+            if read and page[0][0] <= patient_id <= page[read - 1][0]:
+                position = bisect_left([row[0] for row in page[:read]], patient_id)
+                if position < read and page[position][0] == patient_id:
+                    return number * self.page_size + position
+                return None
+        # Not on a loaded page: its index is the number of patients before it
+        index, found = self._conn().execute(
+            "SELECT (SELECT COUNT(*) FROM patients WHERE id < ?), "
+            "EXISTS (SELECT 1 FROM patients WHERE id = ?)", (patient_id, patient_id)).fetchone()
+        return index if found and index < self.count else None
+
+    def _conn(self):
+        return get_connection_manager(self.db_path).connection()
+
+    def _load(self, number):
+        start = self._start(number)
+        rows = [] if start is None else fetch_patient_page(self._conn(), start, self.page_size, self.columns)
+        if len(rows) == self.page_size:
+            self._after[number + 1] = rows[-1][0]
+        # Patients added or deleted elsewhere since the count can shift the
+        # rows by a few places until the next reload; missing rows are blank
+        size = min(self.page_size, self.count - number * self.page_size)
+        page = rows[:size] + [('',)] * (size - len(rows))
+        self._pages[number] = loaded = (page, min(size, len(rows)))
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return loaded
+
+    def _start(self, number):
+        # Id the page starts after: known once the page above was read,
+        # otherwise found by stepping over the ids from the nearest known
+        # page above it or from the end, whichever is closer (None if the
+        # table has since shrunk above it)
+        if number in self._after:
+            return self._after[number]
+        known = max(page for page in self._after if page < number)
+        skip = (number - known) * self.page_size - 1
+        from_end = self.count - number * self.page_size
+        conn = self._conn()
+        if from_end < skip:
+            row = conn.execute("SELECT id FROM patients ORDER BY id DESC LIMIT 1 OFFSET ?",
+                               (from_end,)).fetchone()
+        else:
+            row = conn.execute("SELECT id FROM patients WHERE id > ? ORDER BY id LIMIT 1 OFFSET ?",
+                               (self._after[known], skip)).fetchone()
+        if row is None:
+            return None
+        self._after[number] = row[0]
+        return row[0]
+
+
+class VirtualPatientList:
+    """
+    Show every patient in a VirtualTreeview.
+
+    The tree materializes only the rows on screen and PatientRows reads
+    them a page at a time, so neither Tcl nor Python holds the whole table.
+    """
+
+    def __init__(self, treeview, db_path, page_size=PAGE_SIZE, columns='*'):
+        self.treeview = treeview
+        self.db_path = db_path
+        self.page_size = page_size
+        self.columns = columns
+
+    def reload(self):
+        """Show every patient again, keeping the scroll position and selection."""
+        self.treeview.update_rows(PatientRows(self.db_path, self.columns, self.page_size))
@@ -4,14 +4,37 @@ import sqlite3
 import os
 from datetime import datetime
 from tkinter import messagebox
-import random
-import tkinter as tk
+from collections import OrderedDict
+from database import statements
+from database.db_manager import get_connection_manager
+from database.patient_search import search_patients, BASIC_SEARCH_COLUMNS
+from database.db_worker import get_db_worker, deliver
+from database.patient_index import get_patient_index
+from database.query_cache import get_query_cache
+from database.duplicates import find_patient_duplicates
+from database.uid_allocator import allocate_file_uid
+from ui.tree_sync import reconcile_treeview, upsert_item, remove_item
+
+# Columns shown in the patients list, in Treeview column order. The list only
+# needs these 20 of the 43 columns; the full record is read on selection.
+# "current_date" is quoted because unquoted it is SQLite's CURRENT_DATE.
+LIST_COLUMNS = (
+    'id', 'name', 'birth_date', '"current_date"', 'age', 'weight', 'height', 'bmi', 'weight_status',
+    'systolic_bp', 'diastolic_bp', 'pulse', 'temperature', 'gender', 'photo_path', 'address',
+    'email', 'profession', 'telephone', 'marital_status'
+)
+LIST_PROJECTION = ', '.join(LIST_COLUMNS)
+
+RECORD_CACHE_SIZE = 32  # recently opened full patient records kept in memory
+
+# Callbacks told about each committed patient write, by database path
+_patient_watchers = {}
 
 def connect_db(db_path):
-    """Connect to SQLite database."""
+    """Return the calling thread's shared connection to the SQLite database."""
     try:
-        return sqlite3.connect(db_path)
-    except sqlite3.Error as e:
+        return get_connection_manager(db_path).connection()
+    except (sqlite3.Error, RuntimeError) as e:
         messagebox.showerror("Database Error", f"Could not connect to database:\n{e}")
         raise
 
@@ -34,8 +57,6 @@ def calculate_ideal_body_weight(height, gender):
         return round(45.5 + 2.3 * (height_in_inches - 60), 2)
 
 def register_patient(db_path, form_data):
-    conn = connect_db(db_path)
-    cursor = conn.cursor()
     try:
         name = form_data['name']
         birth_date = form_data['birth_date']
@@ -57,32 +78,28 @@ def register_patient(db_path, form_data):
         ideal_weight = calculate_ideal_body_weight(height, gender)
         weight_status = "Underweight" if bmi < 18.5 else "Normal" if 18.5 <= bmi < 24.9 else "Overweight" if 25 <= bmi < 29.9 else "Obese"
 
-        cursor.execute('''
-            INSERT INTO patients (
-                name, birth_date, current_date, age, weight, height, 
-                bmi, weight_status, systolic_bp, diastolic_bp, pulse, temperature, 
-                glucose, cholesterol, uric_acid, gender, menses, photo_path, address, 
-                email, profession, telephone, marital_status, diabetes, kidney, epilepsy, 
-                allergy, asthma, heart, cancer, surgery, stroke, hypertension, hypotension, 
-                smoking, sports, alcohol, ideal_weight, alerts, observations, file_UID, qrcode
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            name, birth_date, datetime.now().strftime("%d-%m-%Y"), age, weight, height,
-            bmi, weight_status, systolic_bp, diastolic_bp, pulse, temperature,
-            0, 0, 0, gender, None, "", address, email, profession,
-            telephone, marital_status, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-            ideal_weight, "", "", generate_patient_id(gender, birth_date), ""
-        ))
-
-        conn.commit()
-        conn.close()
+        # Columns not collected here (lab values, conditions, notes) take their defaults
+        record = {
+            'name': name, 'birth_date': birth_date, 'current_date': datetime.now().strftime("%d-%m-%Y"),
+            'age': age, 'weight': weight, 'height': height, 'bmi': bmi, 'weight_status': weight_status,
+            'systolic_bp': systolic_bp, 'diastolic_bp': diastolic_bp, 'pulse': pulse,
+            'temperature': temperature, 'gender': gender, 'menses': None, 'address': address,
+            'email': email, 'profession': profession, 'telephone': telephone,
+            'marital_status': marital_status, 'ideal_weight': ideal_weight,
+        }
+        if not confirm_new_patient(db_path, record):
+            return False
+        with get_connection_manager(db_path).transaction() as conn:
+            record['file_UID'] = allocate_file_uid(conn, gender, birth_date)
+            patient_id = statements.insert_patient(conn, record)
+        patient_saved(db_path, patient_id, record)
+
         messagebox.showinfo("Success", "Patient registered successfully.")
+        return True
     except Exception as e:
         messagebox.showerror("Registration Error", f"Failed to register patient:\n{e}")
 
 def update_patient(db_path, form_data, patient_id):
-    conn = connect_db(db_path)
-    cursor = conn.cursor()
     try:
         name = form_data['name']
         birth_date = form_data['birth_date']
@@ -104,20 +121,16 @@ def update_patient(db_path, form_data, patient_id):
         ideal_weight = calculate_ideal_body_weight(height, gender)
         weight_status = "Underweight" if bmi < 18.5 else "Normal" if 18.5 <= bmi < 24.9 else "Overweight" if 25 <= bmi < 29.9 else "Obese"
 
-        cursor.execute('''
-            UPDATE patients SET 
-                name=?, birth_date=?, age=?, weight=?, height=?, bmi=?, weight_status=?, 
-                systolic_bp=?, diastolic_bp=?, pulse=?, temperature=?, address=?, 
-                email=?, profession=?, telephone=?, marital_status=?, ideal_weight=?
-            WHERE id=?
-        ''', (
-            name, birth_date, age, weight, height, bmi, weight_status,
-            systolic_bp, diastolic_bp, pulse, temperature, address,
-            email, profession, telephone, marital_status, ideal_weight,
-            patient_id
-        ))
-        conn.commit()
-        conn.close()
+        changes = {
+            'name': name, 'birth_date': birth_date, 'age': age, 'weight': weight, 'height': height,
+            'bmi': bmi, 'weight_status': weight_status, 'systolic_bp': systolic_bp,
+            'diastolic_bp': diastolic_bp, 'pulse': pulse, 'temperature': temperature,
+            'address': address, 'email': email, 'profession': profession, 'telephone': telephone,
+            'marital_status': marital_status, 'ideal_weight': ideal_weight,
+        }
+        with get_connection_manager(db_path).transaction() as conn:
+            statements.update_patient(conn, patient_id, changes)
+        patient_saved(db_path, patient_id, changes)
         messagebox.showinfo("Success", "Patient updated successfully.")
     except Exception as e:
         messagebox.showerror("Update Error", f"Failed to update patient:\n{e}")
@@ -127,47 +140,229 @@ def delete_patient(db_path, patient_id):
     if not confirm:
         return
 
-    conn = connect_db(db_path)
-    cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM patients WHERE id=?", (patient_id,))
-        conn.commit()
-        conn.close()
+        with get_connection_manager(db_path).transaction() as conn:
+            statements.delete_patient(conn, patient_id)
+        patient_deleted(db_path, patient_id)
         messagebox.showinfo("Success", "Patient deleted successfully.")
     except Exception as e:
         messagebox.showerror("Delete Error", f"Failed to delete patient:\n{e}")
 
-def generate_patient_id(gender, birth_date):
-    birth_date_obj = datetime.strptime(birth_date, "%d-%m-%Y")
-    age = calculate_age(birth_date)
-    sex_code = '1' if gender == "Male" else '2'
-    age_code = f"{age:02d}"
-    birth_date_code = birth_date_obj.strftime('%d%m%y')
-    unique_id = f"{random.randint(1000, 9999)}"
-    return f"{sex_code}{age_code}{birth_date_code}{unique_id}"
+class PatientRecordCache:
+    """Small LRU cache of full patient rows keyed by (database, patient id)."""
 
-def refresh_treeview(treeview, db_path):
-    for row in treeview.get_children():
-        treeview.delete(row)
+    def __init__(self, maxsize=RECORD_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._records = OrderedDict()
+
+    def get(self, key):
+        record = self._records.get(key)
+        if record is not None:
+            self._records.move_to_end(key)
+        return record
+
+    def put(self, key, record):
+        self._records[key] = record
+        self._records.move_to_end(key)
+        while len(self._records) > self.maxsize:
+            self._records.popitem(last=False)
+
+    def invalidate(self, db_path, patient_id=None):
+        if patient_id is None:
+            for key in [key for key in self._records if key[0] == db_path]:
+                del self._records[key]
+        else:
+            self._records.pop((db_path, int(patient_id)), None)
+
+
+_record_cache = PatientRecordCache()
+
+def get_patient_record(db_path, patient_id):
+    """
+    Return the full patients row for one id.
+
+    Used when a row is selected in the list, which only holds LIST_COLUMNS.
+    Recently opened records are served from a small LRU cache.
+
+    Args:
+        db_path (str): Path to the database.
+        patient_id (int | str): Patient id (Treeview values are strings).
+
+    Returns:
+        tuple: All 43 columns in table order, or None if the patient is gone.
+    """
+    key = (os.path.abspath(db_path), int(patient_id))
+    record = _record_cache.get(key)
+    if record is None:
+        record = connect_db(db_path).execute(statements.SELECT_PATIENT, (key[1],)).fetchone()
+        if record is not None:
+            _record_cache.put(key, record)
+    return record
+
+def invalidate_patient_record(db_path, patient_id=None):
+    """Drop a cached full record (or all records of a database) after a write."""
+    _record_cache.invalidate(os.path.abspath(db_path), patient_id)
+    get_query_cache(db_path).invalidate()
+    if patient_id is None:
+        get_patient_index(db_path).clear()
+
+def patient_saved(db_path, patient_id, values):
+    """
+    Bring the in-memory lookups up to date after a committed insert or update.
+
+    Args:
+        db_path (str): Path to the database.
+        patient_id (int): The patient written.
+        values (dict): The columns written, as passed to the statements helpers.
+
+    Returns:
+        tuple: The patient's list row (LIST_COLUMNS) as now stored.
+    """
+    _record_cache.invalidate(os.path.abspath(db_path), patient_id)
+    get_query_cache(db_path).invalidate()
+    get_patient_index(db_path).put(patient_id, values)
+    row = connect_db(db_path).execute(
+        f"SELECT {LIST_PROJECTION} FROM patients WHERE id = ?", (int(patient_id),)).fetchone()
+    _notify_watchers(db_path, int(patient_id), row)
+    return row
+
+def patient_deleted(db_path, patient_id):
+    """Forget a patient in the in-memory lookups after a committed delete."""
+    _record_cache.invalidate(os.path.abspath(db_path), patient_id)
+    get_query_cache(db_path).invalidate()
+    get_patient_index(db_path).remove(patient_id)
+    _notify_watchers(db_path, int(patient_id), None)
 
+def watch_patients(db_path, callback):
+    """
+    Call `callback(patient_id, row)` after each patient write is committed.
+
+    `row` is the patient's list row as now stored, or None once the patient
+    is deleted. Calls are made from the thread that reported the write.
+
+    Returns:
+        callable: Stops the calls.
+    """
+    watchers = _patient_watchers.setdefault(os.path.abspath(db_path), [])
+    watchers.append(callback)
+
+    def stop():
+        if callback in watchers:
+            watchers.remove(callback)
+    return stop
+
+def _notify_watchers(db_path, patient_id, row):
+    for callback in list(_patient_watchers.get(os.path.abspath(db_path), ())):
+        callback(patient_id, row)
+
+def follow_patient_changes(treeview, db_path):
+    """
+    Keep a patient list current one row at a time.
+
+    Each committed write upserts or removes the one row it touched, so
+    saving a patient does not re-read or redraw the list. Stops when the
+    tree is destroyed.
+    """
+    def changed(patient_id, row):
+        if not hasattr(treeview, 'upsert_row'):
+            if row is None:
+                remove_item(treeview, patient_id)
+            else:
+                upsert_item(treeview, row)
+        elif row is None:
+            treeview.remove_row(patient_id)
+        else:
+            treeview.upsert_row(row)
+
+    stop = watch_patients(db_path, changed)
+    treeview.bind('<Destroy>', lambda event: event.widget is treeview and stop(), add='+')
+    return stop
+
+def lookup_patient(db_path, patient_id=None, file_uid=None, telephone=None):
+    """
+    Return the billing and visit columns of a patient without querying SQLite.
+
+    Give one key; file_UID and telephone are what a scanned QR code or a
+    caller at the front desk provide. A telephone shared by several
+    patients returns the first registered.
+
+    Returns:
+        dict: LOOKUP_COLUMNS of patient_index plus 'id', or None if not found.
+    """
+    index = get_patient_index(db_path)
+    if patient_id is not None:
+        return index.get(patient_id)
+    if file_uid is not None:
+        return index.find_by_file_uid(file_uid)
+    matches = index.find_by_telephone(telephone)
+    return matches[0] if matches else None
+
+def confirm_new_patient(db_path, record, parent=None):
+    """
+    Warn before registering a patient who seems to be registered already.
+
+    Returns:
+        bool: True if no likely duplicate was found or the user chose to
+        register anyway.
+    """
+    matches = find_patient_duplicates(connect_db(db_path), db_path, record)
+    if not matches:
+        return True
+    lines = [f"- {profile.name} (born {profile.birth_date or '?'}, file {profile.file_uid or '?'}): "
+             f"{', '.join(reasons)}" for profile, score, reasons in matches]
+    return messagebox.askyesno(
+        "Possible Duplicate",
+        "This patient may already be registered:\n\n" + "\n".join(lines) + "\n\nRegister anyway?",
+        parent=parent)
+
+def fetch_patient_page(conn, after_id=0, limit=200, columns='*', before_id=None):
+    """
+    Fetch one page of patients using keyset pagination on id.
+
+    Seeks straight to the page through the rowid, so the cost does not grow
+    with how far into the table the page is (unlike OFFSET).
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        after_id (int): Return rows with id greater than this.
+        limit (int): Page size.
+        columns (str): Projection; the first column must be id.
+        before_id (int): If given, return the page just before this id instead.
+
+    Returns:
+        list: Rows in ascending id order.
+    """
+    if before_id is not None:
+        rows = conn.execute(
+            f"SELECT {columns} FROM patients WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit)
+        ).fetchall()
+        rows.reverse()
+        return rows
+    return conn.execute(
+        f"SELECT {columns} FROM patients WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+    ).fetchall()
+
+def refresh_treeview(treeview, db_path):
     conn = connect_db(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM patients")
-    rows = cursor.fetchall()
-    for row in rows:
-        treeview.insert("", tk.END, values=row)
-    conn.close()
+    rows = get_query_cache(db_path).execute(conn, f"SELECT {LIST_PROJECTION} FROM patients")
+    fill_treeview(treeview, rows)
+
+def fill_treeview(treeview, rows):
+    # Rows are matched to what is shown by patient id and only the difference
+    # is applied, so the scroll position and selection survive a refresh. A
+    # VirtualTreeview keeps the rows in Python and only draws the visible ones
+    if hasattr(treeview, 'update_rows'):
+        treeview.update_rows(rows)
+    else:
+        reconcile_treeview(treeview, rows)
 
 def search_patient(treeview, db_path, search_term):
-    conn = connect_db(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM patients WHERE
-        name LIKE ? OR birth_date LIKE ? OR address LIKE ?
-    ''', ('%' + search_term + '%', '%' + search_term + '%', '%' + search_term + '%'))
-    rows = cursor.fetchall()
-    for row in treeview.get_children():
-        treeview.delete(row)
-    for row in rows:
-        treeview.insert("", tk.END, values=row)
-    conn.close()
\ No newline at end of file
+    # The query runs on the database worker; the rows are put in the list
+    # from the Tk event loop once they arrive
+    future = get_db_worker(db_path).submit(
+        get_query_cache(db_path).call, search_patients, search_term,
+        columns=BASIC_SEARCH_COLUMNS, select=LIST_PROJECTION
+    )
+    deliver(treeview, future, lambda rows: fill_treeview(treeview, rows),
+            lambda e: messagebox.showerror("Search Error", f"An error occurred during search:\n{e}"))
+    return future
\ No newline at end of file
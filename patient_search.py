@@ -0,0 +1,162 @@
+# pulse/database/patient_search.py
+
+import re
+import sqlite3
+
+from database.name_index import FUZZY_LIMIT, has_name_index, fuzzy_search_patients
+
+FTS_TABLE = 'patients_fts'
+
+# Columns mirrored into the full-text index, in index order
+FTS_COLUMNS = (
+    'name', 'birth_date', 'address', 'email', 'profession',
+    'telephone', 'marital_status', 'gender', 'file_UID'
+)
+
+# Columns searched by the patient list (name, birth date, address)
+BASIC_SEARCH_COLUMNS = ('name', 'birth_date', 'address')
+
+
+def fts5_available(conn):
+    """Check whether the SQLite build behind this connection ships FTS5."""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def has_fts_index(conn):
+    """Check whether the patients full-text index exists in this database."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (FTS_TABLE,)
+    ).fetchone()
+    return row is not None
+
+
+def create_fts_index(conn):
+    """
+    Create the FTS5 index over patients, its sync triggers, and fill it.
+
+    The index is an external-content table, so it stores only the inverted
+    index and reads column values back from `patients`. Does nothing when
+    the SQLite build has no FTS5; searches then fall back to LIKE.
+    """
+    if not fts5_available(conn):
+        return False
+
+    columns = ', '.join(FTS_COLUMNS)
+    new_values = ', '.join(f"new.{col}" for col in FTS_COLUMNS)
+    old_values = ', '.join(f"old.{col}" for col in FTS_COLUMNS)
+
+    conn.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            {columns},
+            content='patients', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS patients_fts_ai AFTER INSERT ON patients BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS patients_fts_ad AFTER DELETE ON patients BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS patients_fts_au AFTER UPDATE OF {columns} ON patients BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def build_fts_query(search_term, columns=None):
+    """
+    Turn free text typed by the user into an FTS5 prefix query.
+
+    Every whitespace-separated word must match the start of a token, e.g.
+    "jo ouag" finds "John Doe, Ouagadougou". Punctuation inside a word such
+    as "12-05-1980" becomes a phrase of its tokens.
+
+    Args:
+        search_term (str): Text typed in the search box.
+        columns (tuple): Restrict matching to these indexed columns.
+
+    Returns:
+        str: FTS5 MATCH expression, or '' if the term has no searchable text.
+    """
+    words = [w.replace('"', '""') for w in search_term.split() if re.search(r'\w', w)]
+    if not words:
+        return ''
+    query = ' AND '.join(f'"{w}"*' for w in words)
+    if columns:
+        query = '{' + ' '.join(columns) + '} : (' + query + ')'
+    return query
+
+
+def _like_search(conn, search_term, columns, select, limit):
+    pattern = '%' + search_term + '%'
+    where = ' OR '.join(f"{col} LIKE ?" for col in columns)
+    sql = f"SELECT {select} FROM patients WHERE {where} ORDER BY id"
+    params = [pattern] * len(columns)
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def _fts_search(conn, query, select, limit):
+    projection = ', '.join(f"p.{col.strip()}" for col in select.split(',')) if select != '*' else 'p.*'
+    sql = f'''
+        SELECT {projection} FROM {FTS_TABLE}
+        JOIN patients p ON p.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH ?
+        ORDER BY {FTS_TABLE}.rank
+    '''
+    params = [query]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+def search_patients(conn, search_term, columns=FTS_COLUMNS, select='*', limit=None, fuzzy=True):
+    """
+    Search patients through the full-text index, best matches first.
+
+    When nothing matches and `fuzzy` is set, falls back to the phonetic name
+    index, so misspelled or differently transliterated names still turn up.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        search_term (str): Text typed by the user.
+        columns (tuple): Indexed columns to match against.
+        select (str): Projection of `patients` columns to return.
+        limit (int): Maximum number of rows (default: all).
+        fuzzy (bool): Fall back to fuzzy name matching on no results.
+
+    Returns:
+        list: Matching patient rows, ranked by bm25 (or by name similarity).
+    """
+    query = build_fts_query(search_term, columns)
+    if not query:
+        sql = f"SELECT {select} FROM patients ORDER BY id"
+        return conn.execute(sql + (" LIMIT ?" if limit is not None else ""),
+                            (limit,) if limit is not None else ()).fetchall()
+
+    if not has_fts_index(conn):
+        rows = _like_search(conn, search_term.strip(), columns, select, limit)
+    else:
+        rows = _fts_search(conn, query, select, limit)
+
+    if not rows and fuzzy and 'name' in columns and has_name_index(conn):
+        rows = fuzzy_search_patients(conn, search_term, select, limit or FUZZY_LIMIT)
+    return rows
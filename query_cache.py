@@ -0,0 +1,143 @@
+# pulse/database/query_cache.py
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 64        # distinct queries remembered per database
+MAX_ROWS = 50000        # total rows held across all entries
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of patient search and list results.
+
+    Entries are keyed by the query and its parameters and stamped with the
+    generation they were read at. Every write to `patients` in this process
+    starts a new generation (see `invalidate`), and so does a move of
+    SQLite's data_version, which counts commits by other connections and
+    processes. That counter is per connection, so the last value seen is
+    kept for each connection, and a connection seen for the first time
+    also starts a new generation, as it cannot tell what it missed. An
+    entry from an older generation is a miss, so results never outlive a
+    write. Cached lists are shared between callers and must be treated as
+    read-only.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_rows=MAX_ROWS):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.rows = 0
+        self._entries = OrderedDict()
+        self._versions = {}     # id(conn) -> (conn, last data_version seen)
+        self._lock = threading.Lock()
+
+    def _stamp(self, conn):
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        with self._lock:
+            known = self._versions.get(id(conn))
+            if known is None:
+                # Keeping the connection keeps its id from being reused
+                # while it is listed; closed ones are dropped here
+                self._versions = {key: seen for key, seen in self._versions.items()
+                                  if not _closed(seen[0])}
+            if known is None or known[1] != version:
+                self._versions[id(conn)] = (conn, version)
+                self._new_generation()
+            return self.generation
+
+    def fetch(self, conn, key, compute):
+        """
+        Return the cached result for `key`, or compute and cache it.
+
+        Args:
+            conn (sqlite3.Connection): Connection the query would run on.
+            key (tuple): Hashable query and parameters.
+            compute (callable): Runs the query and returns its rows.
+
+        Returns:
+            list: Result rows.
+        """
+        # Stamp before reading, so a write committed meanwhile leaves the
+        # entry already stale
+        stamp = self._stamp(conn)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        rows = compute()
+
+        with self._lock:
+            if stamp == self.generation and len(rows) <= self.max_rows:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self.rows -= len(old[1])
+                self._entries[key] = (stamp, rows)
+                self.rows += len(rows)
+                while len(self._entries) > self.max_entries or self.rows > self.max_rows:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.rows -= len(evicted)
+        return rows
+
+    def execute(self, conn, sql, params=()):
+        """Run a SELECT through the cache and return its fetched rows."""
+        return self.fetch(conn, ('sql', sql, tuple(params)),
+                          lambda: conn.execute(sql, params).fetchall())
+
+    def call(self, conn, fn, *args, **kwargs):
+        """Call `fn(conn, *args, **kwargs)` through the cache; arguments must be hashable."""
+        key = (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+        return self.fetch(conn, key, lambda: fn(conn, *args, **kwargs))
+
+    def invalidate(self):
+        """Start a new generation after a write to patients."""
+        with self._lock:
+            self._new_generation()
+
+    def _new_generation(self):
+        self.generation += 1
+        self._entries.clear()
+        self.rows = 0
+
+    def stats(self):
+        """Return entry and row counts, hits, misses and the hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'rows': self.rows,
+                'generation': self.generation,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def _closed(conn):
+    try:
+        conn.total_changes
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_query_cache(db_path):
+    """Return the process-wide QueryCache for a database file."""
+    key = os.path.abspath(db_path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = QueryCache()
+        return cache
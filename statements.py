@@ -0,0 +1,193 @@
+# pulse/database/statements.py
+
+from functools import lru_cache
+
+from database.name_index import index_names
+from database.date_index import DATE_TABLES, index_dates
+
+# Every column of `patients` except id, in the order INSERTs bind them
+PATIENT_COLUMNS = (
+    'name', 'birth_date', 'current_date', 'age', 'weight', 'height',
+    'bmi', 'weight_status', 'systolic_bp', 'diastolic_bp', 'pulse', 'temperature',
+    'glucose', 'cholesterol', 'uric_acid', 'gender', 'menses', 'photo_path', 'address',
+    'email', 'profession', 'telephone', 'marital_status', 'diabetes', 'kidney', 'epilepsy',
+    'allergy', 'asthma', 'heart', 'cancer', 'surgery', 'stroke', 'hypertension', 'hypotension',
+    'smoking', 'sports', 'alcohol', 'ideal_weight', 'alerts', 'observations', 'file_UID', 'qrcode'
+)
+
+# Columns of a full patients row (SELECT_PATIENT), in table order; the
+# conditions at the end are not in PATIENT_COLUMNS order
+PATIENT_RECORD_COLUMNS = (
+    'id', 'name', 'birth_date', 'current_date', 'age', 'weight', 'height',
+    'bmi', 'weight_status', 'systolic_bp', 'diastolic_bp', 'pulse', 'temperature',
+    'glucose', 'cholesterol', 'uric_acid', 'gender', 'menses', 'photo_path', 'address',
+    'email', 'profession', 'telephone', 'marital_status', 'diabetes', 'kidney', 'epilepsy',
+    'allergy', 'asthma', 'heart', 'cancer', 'surgery', 'stroke', 'hypertension', 'hypotension',
+    'alcohol', 'sports', 'smoking', 'ideal_weight', 'alerts', 'observations', 'file_UID', 'qrcode'
+)
+
+# Every column of `visits` except id
+VISIT_COLUMNS = (
+    'patient_id', 'name', 'visit_date', 'reason', 'diagnosis', 'treatment',
+    'systolic_bp', 'diastolic_bp', 'weight', 'telephone', 'address', 'file_UID', 'qrcode'
+)
+
+CONDITION_COLUMNS = (
+    'diabetes', 'kidney', 'epilepsy', 'allergy', 'asthma', 'heart', 'cancer', 'surgery',
+    'stroke', 'hypertension', 'hypotension', 'smoking', 'sports', 'alcohol'
+)
+
+# Values stored for columns a front end does not collect
+PATIENT_DEFAULTS = dict(
+    {col: 0 for col in CONDITION_COLUMNS + ('glucose', 'cholesterol', 'uric_acid')},
+    photo_path='', alerts='', observations='', qrcode=''
+)
+
+# Distinct UPDATE column sets are few (one per form); leave room for them
+# next to the fixed statements in each connection's statement cache.
+MAX_UPDATE_SHAPES = 32
+
+
+def _quote(columns):
+    # current_date must be quoted, otherwise SQLite reads the CURRENT_DATE keyword
+    return ', '.join(f'"{col}"' for col in columns)
+
+
+def _insert_sql(table, columns):
+    return f"INSERT INTO {table} ({_quote(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+
+
+INSERT_PATIENT = _insert_sql('patients', PATIENT_COLUMNS)
+DELETE_PATIENT = "DELETE FROM patients WHERE id = ?"
+SELECT_PATIENT = f"SELECT {_quote(PATIENT_RECORD_COLUMNS)} FROM patients WHERE id = ?"
+INSERT_VISIT = _insert_sql('visits', VISIT_COLUMNS)
+DELETE_VISIT = "DELETE FROM visits WHERE id = ?"
+
+STATEMENTS = (INSERT_PATIENT, DELETE_PATIENT, SELECT_PATIENT, INSERT_VISIT, DELETE_VISIT)
+
+# Size for sqlite3's per-connection prepared statement cache
+STATEMENT_CACHE_SIZE = 128 + len(STATEMENTS) + MAX_UPDATE_SHAPES
+
+
+@lru_cache(maxsize=MAX_UPDATE_SHAPES)
+def update_patient_sql(columns):
+    """
+    Return the UPDATE statement for a tuple of patient columns.
+
+    The text is built once per column set, so repeated updates from the same
+    form hit the same prepared statement.
+    """
+    unknown = set(columns) - set(PATIENT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown patients columns: {', '.join(sorted(unknown))}")
+    assignments = ', '.join(f'"{col}" = ?' for col in columns)
+    return f"UPDATE patients SET {assignments} WHERE id = ?"
+
+
+def patient_row(record):
+    """
+    Turn a patient dict into INSERT_PATIENT parameters.
+
+    Missing columns take PATIENT_DEFAULTS, or NULL when there is no default.
+    """
+    unknown = set(record) - set(PATIENT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown patients columns: {', '.join(sorted(unknown))}")
+    return tuple(record.get(col, PATIENT_DEFAULTS.get(col)) for col in PATIENT_COLUMNS)
+
+
+def insert_patient(conn, record):
+    """Insert one patient from a column dict and return its new id."""
+    patient_id = conn.execute(INSERT_PATIENT, patient_row(record)).lastrowid
+    index_names(conn, [patient_id])
+    index_dates(conn, 'patients', [patient_id])
+    return patient_id
+
+
+def insert_patients(conn, records, index=True):
+    """
+    Insert many patients (column dicts or INSERT_PATIENT tuples) with one executemany.
+
+    Their names and dates are added to the fuzzy name and ISO date indexes
+    in the same transaction, unless `index` is False: large imports then
+    leave them queued and index them in one pass at the end, which is
+    several times faster.
+    """
+    rows = (record if isinstance(record, tuple) else patient_row(record) for record in records)
+    count = conn.executemany(INSERT_PATIENT, rows).rowcount
+    if index:
+        index_names(conn)
+        index_dates(conn, 'patients')
+    return count
+
+
+def update_patient(conn, patient_id, changes):
+    """Set the given columns of one patient; returns the number of rows changed."""
+    columns = tuple(changes)
+    params = tuple(changes[col] for col in columns) + (patient_id,)
+    count = conn.execute(update_patient_sql(columns), params).rowcount
+    if 'name' in changes:
+        index_names(conn, [patient_id])
+    if set(changes) & set(DATE_TABLES['patients'].dates):
+        index_dates(conn, 'patients', [patient_id])
+    return count
+
+
+def update_patients(conn, columns, rows):
+    """
+    Update the same columns of many patients with one executemany.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        columns (tuple): Columns being set.
+        rows (iterable): (patient_id, values) pairs, values in `columns` order.
+
+    Returns:
+        int: Number of rows changed.
+    """
+    sql = update_patient_sql(tuple(columns))
+    params = [tuple(values) + (patient_id,) for patient_id, values in rows]
+    count = conn.executemany(sql, params).rowcount
+    patient_ids = [row[-1] for row in params]
+    if 'name' in columns:
+        index_names(conn, patient_ids)
+    if set(columns) & set(DATE_TABLES['patients'].dates):
+        index_dates(conn, 'patients', patient_ids)
+    return count
+
+
+def delete_patient(conn, patient_id):
+    """Delete one patient; returns the number of rows deleted."""
+    return conn.execute(DELETE_PATIENT, (patient_id,)).rowcount
+
+
+def delete_patients(conn, patient_ids):
+    """Delete many patients with one executemany."""
+    return conn.executemany(DELETE_PATIENT, ((patient_id,) for patient_id in patient_ids)).rowcount
+
+
+def visit_row(record):
+    """Turn a visit dict into INSERT_VISIT parameters (missing columns are NULL)."""
+    unknown = set(record) - set(VISIT_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown visits columns: {', '.join(sorted(unknown))}")
+    return tuple(record.get(col) for col in VISIT_COLUMNS)
+
+
+def insert_visit(conn, record):
+    """Insert one visit from a column dict and return its new id."""
+    visit_id = conn.execute(INSERT_VISIT, visit_row(record)).lastrowid
+    index_dates(conn, 'visits', [visit_id])
+    return visit_id
+
+
+def insert_visits(conn, records):
+    """Insert many visits (column dicts) with one executemany."""
+    count = conn.executemany(INSERT_VISIT, (visit_row(record) for record in records)).rowcount
+    index_dates(conn, 'visits')
+    return count
+
+
+def delete_visits(conn, visit_ids):
+    """Delete many visits with one executemany."""
+    return conn.executemany(DELETE_VISIT, ((visit_id,) for visit_id in visit_ids)).rowcount
@@ -0,0 +1,105 @@
+# pulse/ui/stats_panel.py
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from database.clinic_stats import read_clinic_stats, STATS_DAYS
+from database.db_worker import get_db_worker, deliver
+from ui.cohort_panel import CONDITION_LABELS
+from ui.tree_sync import reconcile_treeview
+
+VITAL_LABELS = (
+    ("Age", "age"),
+    ("Weight (kg)", "weight"),
+    ("Height (m)", "height"),
+    ("BMI", "bmi"),
+    ("Systolic BP", "systolic_bp"),
+    ("Diastolic BP", "diastolic_bp"),
+    ("Pulse", "pulse"),
+    ("Temperature", "temperature"),
+    ("Glucose", "glucose"),
+    ("Cholesterol", "cholesterol"),
+    ("Uric Acid", "uric_acid"),
+)
+
+
+def _table(parent, title, headings, height):
+    frame = ttk.LabelFrame(parent, text=title, padding=(5, 5))
+    tree = ttk.Treeview(frame, columns=headings, show='headings', height=height)
+    for heading in headings:
+        tree.heading(heading, text=heading)
+        tree.column(heading, width=110, anchor='w' if heading == headings[0] else 'e')
+    tree.pack(fill=tk.BOTH, expand=True)
+    return frame, tree
+
+
+def _fill(tree, rows):
+    # Keyed by the first column, so a refresh only rewrites the changed figures
+    reconcile_treeview(tree, list(rows))
+
+
+def _percent(count, total):
+    return f"{100 * count / total:.1f} %" if total else "-"
+
+
+def open_stats_panel(root, db_path, days=STATS_DAYS):
+    """
+    Open the clinic statistics dashboard.
+
+    The figures come from the summary table kept up to date on every write,
+    so opening or refreshing the panel reads a few dozen rows.
+
+    Args:
+        root: Tkinter root window.
+        db_path: Path to the SQLite database.
+        days (int): Number of days of visit counts shown.
+    """
+    panel = tk.Toplevel(root)
+    panel.title("Dashboard")
+    panel.transient(root)
+
+    totals_var = tk.StringVar(value="Loading...")
+    ttk.Label(panel, textvariable=totals_var, font=("Helvetica", 11, "bold")).grid(
+        row=0, column=0, columnspan=3, sticky='w', padx=10, pady=5)
+
+    gender_frame, gender_tree = _table(panel, "Gender", ("Gender", "Patients", "Share"), 4)
+    gender_frame.grid(row=1, column=0, sticky='nsew', padx=10, pady=5)
+    status_frame, status_tree = _table(panel, "Weight Status", ("Status", "Patients", "Share"), 4)
+    status_frame.grid(row=1, column=1, sticky='nsew', padx=10, pady=5)
+    vitals_frame, vitals_tree = _table(panel, "Vitals", ("Vital", "Average", "Values"), len(VITAL_LABELS))
+    vitals_frame.grid(row=2, column=0, sticky='nsew', padx=10, pady=5)
+    condition_frame, condition_tree = _table(panel, "Conditions", ("Condition", "Patients", "Share"),
+                                             len(CONDITION_LABELS))
+    condition_frame.grid(row=2, column=1, sticky='nsew', padx=10, pady=5)
+    visits_frame, visits_tree = _table(panel, f"Visits, last {days} days", ("Day", "Visits"), 25)
+    visits_frame.grid(row=1, column=2, rowspan=2, sticky='nsew', padx=10, pady=5)
+
+    def show(stats):
+        refresh_button.config(state=tk.NORMAL)
+        patients = stats['patients']
+        totals_var.set(f"Patients: {patients}    Visits: {stats['visits']}")
+        _fill(gender_tree, [(key or "Not set", count, _percent(count, patients))
+                            for key, count in sorted(stats['gender'].items())])
+        _fill(status_tree, [(key or "Not set", count, _percent(count, patients))
+                            for key, count in sorted(stats['weight_status'].items())])
+        vitals = stats['vitals']
+        _fill(vitals_tree, [(label, "-" if vitals[key][0] is None else f"{vitals[key][0]:.1f}", vitals[key][1])
+                            for label, key in VITAL_LABELS])
+        conditions = stats['conditions']
+        _fill(condition_tree, [(label, conditions[key], _percent(conditions[key], patients))
+                               for label, key in CONDITION_LABELS])
+        # Most recent day first
+        _fill(visits_tree, reversed(stats['visits_per_day']))
+
+    def fail(e):
+        refresh_button.config(state=tk.NORMAL)
+        totals_var.set("")
+        messagebox.showerror("Dashboard Error", f"Could not read the statistics:\n{e}", parent=panel)
+
+    def refresh():
+        refresh_button.config(state=tk.DISABLED)
+        deliver(panel, get_db_worker(db_path).submit(read_clinic_stats, days), show, fail)
+
+    refresh_button = ttk.Button(panel, text="Refresh", command=refresh)
+    refresh_button.grid(row=3, column=2, sticky='e', padx=10, pady=5)
+    refresh()
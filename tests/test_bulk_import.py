@@ -0,0 +1,33 @@
+# pulse/tests/test_bulk_import.py
+
+import os
+import sqlite3
+import subprocess
+import sys
+
+from database.uid_allocator import patient_id_prefix
+
+# Runs the importer with tkinter made unimportable, as on a headless host
+HEADLESS_IMPORT = """
+import sys
+sys.modules['tkinter'] = None
+from database.bulk_import import main
+sys.exit(main(sys.argv[1:]))
+"""
+
+
+def test_import_runs_without_tkinter(tmp_path):
+    source = tmp_path / "patients.csv"
+    source.write_text("name,birth_date,gender,telephone\n"
+                      "Awa Traore,01-02-1990,Female,+22670000001\n", encoding='utf-8')
+    db_path = str(tmp_path / "patients.db")
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, sys.path)))
+    result = subprocess.run([sys.executable, "-c", HEADLESS_IMPORT, str(source), "--db", db_path],
+                            capture_output=True, text=True, env=env)
+
+    assert result.returncode == 0, result.stderr
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT name, file_UID FROM patients").fetchall()
+    conn.close()
+    assert rows == [("Awa Traore", patient_id_prefix("Female", "01-02-1990") + "0001")]
@@ -0,0 +1,33 @@
+# pulse/tests/test_patient_list.py
+
+import sqlite3
+
+from database.db_manager import create_tables, get_connection_manager
+from database.migrations import migrate
+from ui.patient_list import PatientRows
+
+
+def _patients_db(path, count):
+    conn = get_connection_manager(str(path)).connection()
+    create_tables(conn)
+    migrate(conn)
+    conn.executemany("INSERT INTO patients(id, name) VALUES (?, ?)",
+                     [(patient_id, f"Patient {patient_id}") for patient_id in range(1, count + 1)])
+    conn.commit()
+    return str(path)
+
+
+def test_index_of_after_rows_deleted_elsewhere(tmp_path):
+    db_path = _patients_db(tmp_path / "patients.db", 30)
+    rows = PatientRows(db_path, 'id, name', page_size=10)
+
+    other = sqlite3.connect(db_path)
+    other.execute("DELETE FROM patients WHERE id > 25")
+    other.commit()
+    other.close()
+
+    # Read top down, the last page comes back short: its missing rows are blank
+    assert [row[0] for row in rows] == list(range(1, 26)) + [''] * 5
+    assert rows.index_of(22) == 21
+    assert rows.index_of(28) is None
+    assert rows.index_of(5) == 4
@@ -0,0 +1,31 @@
+# pulse/tests/test_query_cache.py
+
+import sqlite3
+
+from database.query_cache import QueryCache
+
+
+def test_commit_elsewhere_is_seen_from_every_connection(tmp_path):
+    db_path = str(tmp_path / "patients.db")
+    writer = sqlite3.connect(db_path)
+    writer.execute("CREATE TABLE patients (id INTEGER PRIMARY KEY, name TEXT)")
+    writer.commit()
+    tk_conn, worker_conn = sqlite3.connect(db_path), sqlite3.connect(db_path)
+    cache = QueryCache()
+    sql = "SELECT COUNT(*) FROM patients"
+
+    assert cache.execute(tk_conn, sql) == [(0,)]
+    assert cache.execute(worker_conn, sql) == [(0,)]
+    assert cache.execute(tk_conn, sql) == [(0,)]
+    assert cache.hits == 1
+
+    writer.execute("INSERT INTO patients(name) VALUES ('Patient 1')")
+    writer.commit()
+    assert cache.execute(worker_conn, sql) == [(1,)]
+    assert cache.execute(tk_conn, sql) == [(1,)]
+
+    # A connection opened after the write has no baseline to compare with
+    worker_conn.close()
+    writer.execute("INSERT INTO patients(name) VALUES ('Patient 2')")
+    writer.commit()
+    assert cache.execute(sqlite3.connect(db_path), sql) == [(2,)]
@@ -0,0 +1,26 @@
+# pulse/tests/test_statements.py
+
+from database.db_manager import create_tables, get_connection_manager
+from database.migrations import migrate
+from database.patient_search import search_patients
+from database import statements
+
+
+def test_batch_update_reaches_name_and_date_indexes(tmp_path):
+    conn = get_connection_manager(str(tmp_path / "patients.db")).connection()
+    create_tables(conn)
+    migrate(conn)
+    first = statements.insert_patient(conn, {'name': 'Awa Traore', 'birth_date': '01-02-1990'})
+    second = statements.insert_patient(conn, {'name': 'Issa Kabore', 'birth_date': '03-04-1985'})
+    conn.commit()
+
+    statements.update_patients(conn, ('name', 'birth_date'), [
+        (first, ('Aminata Ouedraogo', '05-06-1970')),
+        (second, ('Issa Kabore', '07-08-1975')),
+    ])
+    conn.commit()
+
+    # A misspelling only the phonetic name index can match
+    assert [row[0] for row in search_patients(conn, 'Wedraogo', select='id')] == [first]
+    assert conn.execute("SELECT patient_id FROM patient_dates WHERE birth_date BETWEEN ? AND ? "
+                        "ORDER BY patient_id", ('1970-01-01', '1979-12-31')).fetchall() == [(first,), (second,)]
@@ -0,0 +1,121 @@
+# pulse/ui/tree_sync.py
+
+import tkinter as tk
+from bisect import bisect_left
+from weakref import WeakKeyDictionary
+
+# Values last written to each item, per tree, so unchanged rows are
+# recognized without reading them back from Tcl
+_written = WeakKeyDictionary()
+
+
+def increasing_run(values):
+    """
+    Return the positions of a longest strictly increasing run in `values`.
+
+    Given the new index of each item in its current order, these are the
+    items already in order relative to each other: they can stay put while
+    the rest are moved around them.
+    """
+    tails = []        # value ending the best run of each length
+    ends = []         # position of that value
+    previous = [None] * len(values)
+    for position, value in enumerate(values):
+        length = bisect_left(tails, value)
+        if length == len(tails):
+            tails.append(value)
+            ends.append(position)
+        else:
+            tails[length] = value
+            ends[length] = position
+        previous[position] = ends[length - 1] if length else None
+    run = []
+    position = ends[-1] if ends else None
+    while position is not None:
+        run.append(position)
+        position = previous[position]
+    run.reverse()
+    return run
+
+
+def reconcile_treeview(tree, rows, key=lambda row: row[0]):
+    """
+    Make a Treeview show `rows`, touching only the items that differ.
+
+    Items are keyed by `key(row)` (the patient id), which becomes the item
+    id. Rows that are gone are deleted in one call, rows out of place are
+    detached in one call and put back at their index, new rows are
+    inserted, and only the rows whose values changed are rewritten. Items
+    that did not move keep their place, so the selection and the scroll
+    position survive a refresh.
+
+    Args:
+        tree (ttk.Treeview): Tree filled only through this function.
+        rows (sequence): Value tuples in display order.
+        key (callable): Unique key of a row.
+
+    Returns:
+        tuple: (inserted, updated, moved, deleted) item counts.
+    """
+    wanted = {}
+    for row in rows:
+        wanted[str(key(row))] = tuple(row)
+    current = tree.get_children()
+    written = _written.setdefault(tree, {})
+
+    if len(wanted) != len(rows):
+        # Keys are not unique: no way to match items, start over
+        tree.delete(*current)
+        written.clear()
+        for row in rows:
+            tree.insert("", tk.END, values=row)
+        return len(rows), 0, 0, len(current)
+
+    gone = [iid for iid in current if iid not in wanted]
+    if gone:
+        tree.delete(*gone)
+        for iid in gone:
+            written.pop(iid, None)
+
+    index = {iid: number for number, iid in enumerate(wanted)}
+    kept = [iid for iid in current if iid in wanted]
+    staying = {kept[position] for position in increasing_run([index[iid] for iid in kept])}
+    moving = [iid for iid in kept if iid not in staying]
+    if moving:
+        tree.detach(*moving)
+
+    inserted = updated = 0
+    kept = set(kept)
+    for number, (iid, values) in enumerate(wanted.items()):
+        if iid not in kept:
+            tree.insert("", number, iid=iid, values=values)
+            written[iid] = values
+            inserted += 1
+            continue
+        if iid not in staying:
+            tree.move(iid, "", number)
+        if written.get(iid) != values:
+            tree.item(iid, values=values)
+            written[iid] = values
+            updated += 1
+    return inserted, updated, len(moving), len(gone)
+
+
+def upsert_item(tree, row, key=lambda row: row[0]):
+    """Rewrite the item keyed like `row` (see `reconcile_treeview`), or add it at the end."""
+    written = _written.setdefault(tree, {})
+    iid, values = str(key(row)), tuple(row)
+    if tree.exists(iid):
+        if written.get(iid) != values:
+            tree.item(iid, values=values)
+    else:
+        tree.insert("", tk.END, iid=iid, values=values)
+    written[iid] = values
+
+
+def remove_item(tree, key):
+    """Delete the item with key `key`, if shown."""
+    iid = str(key)
+    if tree.exists(iid):
+        tree.delete(iid)
+    _written.get(tree, {}).pop(iid, None)
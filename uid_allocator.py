@@ -0,0 +1,160 @@
+# pulse/database/uid_allocator.py
+
+from collections import Counter
+from datetime import datetime
+
+from database.patient_fields import calculate_age
+
+UID_TABLE = 'uid_sequences'
+UID_INDEX = 'idx_patients_file_uid_unique'
+
+
+def patient_id_prefix(gender: str, birth_date: str) -> str:
+    """
+    Return the demographic part of a patient ID: sex code, age and DOB.
+
+    Kept here rather than in utils.validators, which needs Tk, so that
+    migrations and headless tools can number patients.
+
+    Args:
+        gender (str): Gender of the patient.
+        birth_date (str): Date of birth in 'dd-mm-yyyy' format.
+
+    Returns:
+        str: Prefix such as '135010190' (male, 35, born 01-01-90).
+    """
+    sex_code = '1' if gender == 'Male' else '2'
+    birth_date_obj = datetime.strptime(birth_date, '%d-%m-%Y')
+    age = calculate_age(birth_date)
+    age_code = f"{age:02d}"
+    birth_date_code = birth_date_obj.strftime('%d%m%y')
+
+    return f"{sex_code}{age_code}{birth_date_code}"
+
+
+def uid_prefix(gender, birth_date):
+    """
+    Return the demographic prefix a file_UID is numbered under.
+
+    Birth dates that are not dd-mm-yyyy (rows from older versions) fall
+    back to an all-zero age and date, so every patient can be numbered.
+    """
+    try:
+        return patient_id_prefix(gender, birth_date)
+    except (TypeError, ValueError):
+        return ('1' if gender == 'Male' else '2') + '0' * 8
+
+
+def create_uid_sequences(conn):
+    """
+    Create the file_UID sequence table and make file_UID unique.
+
+    UIDs used to end in a random 4-digit number, so patients sharing a
+    gender, age and birth date could collide, and nothing caught it. Every
+    prefix now has a counter in uid_sequences, and patients without a UID
+    are given one (with their visits, which could only carry a blank UID).
+
+    UIDs already shared by several patients are left alone: visits and
+    printed QR codes carry the UID, so renumbering one holder would
+    attach them to the other. They are kept out of the UNIQUE index
+    instead, and reported by the duplicates tool (`shared_file_uids`) to
+    be merged by hand.
+    """
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {UID_TABLE} (
+            prefix TEXT PRIMARY KEY,
+            last INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    rows = conn.execute(
+        "SELECT id, gender, birth_date FROM patients WHERE COALESCE(file_UID, '') = '' ORDER BY id").fetchall()
+    uids = allocate_file_uids(conn, [(gender, birth_date) for _, gender, birth_date in rows])
+    assigned = [(uid, patient_id) for (patient_id, _, _), uid in zip(rows, uids)]
+    conn.executemany("UPDATE patients SET file_UID = ? WHERE id = ?", assigned)
+    conn.executemany("UPDATE visits SET file_UID = ? WHERE patient_id = ? AND COALESCE(file_UID, '') = ''",
+                     assigned)
+
+    # A partial index may not use a subquery, so the shared UIDs are listed
+    # as literals; the allocator never hands them out again
+    excluded = ''.join(f" AND file_UID != {_sql_string(uid)}" for uid in sorted(shared_file_uids(conn)))
+    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {UID_INDEX} ON patients(file_UID) "
+                 f"WHERE file_UID IS NOT NULL AND file_UID != ''{excluded}")
+
+
+def shared_file_uids(conn):
+    """
+    Return the file_UIDs held by more than one patient.
+
+    Returns:
+        dict: UID -> ids of its holders, in id order.
+    """
+    shared = {}
+    for uid, patient_id in conn.execute('''
+        SELECT file_UID, id FROM patients
+        WHERE file_UID IN (SELECT file_UID FROM patients WHERE file_UID != ''
+                           GROUP BY file_UID HAVING COUNT(*) > 1)
+        ORDER BY file_UID, id
+    '''):
+        shared.setdefault(uid, []).append(patient_id)
+    return shared
+
+
+def _sql_string(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _reserve(conn, prefix, count):
+    uids = []
+    while len(uids) < count:
+        needed = count - len(uids)
+        conn.execute(f"INSERT OR IGNORE INTO {UID_TABLE}(prefix, last) VALUES (?, 0)", (prefix,))
+        conn.execute(f"UPDATE {UID_TABLE} SET last = last + ? WHERE prefix = ?", (needed, prefix))
+        last = conn.execute(f"SELECT last FROM {UID_TABLE} WHERE prefix = ?", (prefix,)).fetchone()[0]
+        candidates = [f"{prefix}{number:04d}" for number in range(last - needed + 1, last + 1)]
+        # Numbers taken by the random UIDs of older versions are skipped
+        taken = file_uids_in_use(conn, candidates)
+        uids.extend(uid for uid in candidates if uid not in taken)
+    return uids
+
+
+def allocate_file_uids(conn, patients):
+    """
+    Allocate unique file_UIDs, reserving each prefix's numbers as one block.
+
+    Call it inside the transaction that stores the UIDs: the counter update
+    holds SQLite's write lock until that transaction ends, so app instances
+    allocating at the same time wait for each other instead of handing out
+    the same number, and a rollback gives the numbers back. A transaction
+    is begun (IMMEDIATE) if none is open; the caller commits.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection.
+        patients (iterable): (gender, birth_date) pairs.
+
+    Returns:
+        list: One UID per patient, in order.
+    """
+    prefixes = [uid_prefix(gender, birth_date) for gender, birth_date in patients]
+    if not prefixes:
+        return []
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    blocks = {prefix: iter(_reserve(conn, prefix, count)) for prefix, count in Counter(prefixes).items()}
+    return [next(blocks[prefix]) for prefix in prefixes]
+
+
+def allocate_file_uid(conn, gender, birth_date):
+    """Allocate the file_UID of one new patient (see `allocate_file_uids`)."""
+    return allocate_file_uids(conn, [(gender, birth_date)])[0]
+
+
+def file_uids_in_use(conn, uids):
+    """Return which of `uids` are already held by a patient."""
+    uids = list(uids)
+    taken = set()
+    for start in range(0, len(uids), 500):
+        chunk = uids[start:start + 500]
+        placeholders = ', '.join('?' for _ in chunk)
+        taken.update(row[0] for row in conn.execute(
+            f"SELECT file_UID FROM patients WHERE file_UID IN ({placeholders})", chunk))
+    return taken
@@ -0,0 +1,376 @@
+# pulse/ui/virtual_list.py
+
+import tkinter as tk
+from tkinter import ttk
+
+from ui.tree_sync import increasing_run
+
+OVERSCAN = 5              # rows materialized below the visible ones
+DEFAULT_ROW_HEIGHT = 20   # used until a drawn row can be measured
+WHEEL_ROWS = 3            # rows scrolled per mouse wheel notch
+
+
+class VirtualTreeview(ttk.Treeview):
+    """
+    A ttk.Treeview showing any number of rows with a few dozen items.
+
+    Rows stay in Python: `set_rows` takes a list (copied), or a sequence
+    that loads rows on demand and supports `index_of(key)`, item
+    assignment, deletion and `append`, like PatientRows. Only the visible
+    rows plus OVERSCAN exist as Tcl items. Scrolling hands the items that left the view to the rows coming
+    in, so a scroll step costs a few item updates at any table size.
+
+    It stands in for a plain Treeview. Scrollbars wired through `yview`
+    and `yscrollcommand` drive the virtual position. The selected row keeps
+    its own item, detached while scrolled out of view, so `focus()` and
+    `item(focus(), 'values')` still return the selected row. Selection is
+    single-row; changes made here rather than by the user do not fire
+    <<TreeviewSelect>>.
+    """
+
+    def __init__(self, master=None, overscan=OVERSCAN, **kw):
+        self._yscrollcommand = kw.pop('yscrollcommand', None)
+        kw.setdefault('selectmode', 'browse')
+        super().__init__(master, **kw)
+        self.overscan = overscan
+        self._rows = []
+        self._keys = None           # key -> index, for rows without index_of
+        self._offset = 0            # index of the top row
+        self._visible = 1           # rows that fit in the widget
+        self._row_height = int(ttk.Style(self).lookup('Treeview', 'rowheight') or DEFAULT_ROW_HEIGHT)
+        self._header_height = self._row_height
+        self._items = []            # every item created, attached or not
+        self._order = []            # attached items, top to bottom
+        self._row_of = {}           # item -> index of the row it shows
+        self._values = {}           # item -> values last written to it
+        self._selected = None       # index of the selected row
+        self._pinned = None         # item showing the selected row
+        self._muted = False
+        super().configure(yscrollcommand=self._on_native_scroll)
+
+        # Our bindings go on a tag of their own, ahead of the widget's, so
+        # the application's bind() calls do not replace them and "break"
+        # can hide the selection events caused by scrolling
+        self._tag = f"VirtualTreeview{id(self)}"
+        self.bindtags((self._tag,) + self.bindtags())
+        self.bind_class(self._tag, '<<TreeviewSelect>>', self._on_select)
+        self.bind_class(self._tag, '<Configure>', lambda event: self._refit())
+        self.bind_class(self._tag, '<MouseWheel>', self._on_wheel)
+        self.bind_class(self._tag, '<Button-4>', lambda event: self._scroll_by(-WHEEL_ROWS))
+        self.bind_class(self._tag, '<Button-5>', lambda event: self._scroll_by(WHEEL_ROWS))
+        self.bind_class(self._tag, '<Up>', lambda event: self._step(-1))
+        self.bind_class(self._tag, '<Down>', lambda event: self._step(1))
+        self.bind_class(self._tag, '<Prior>', lambda event: self._step(-self._visible))
+        self.bind_class(self._tag, '<Next>', lambda event: self._step(self._visible))
+        self.bind_class(self._tag, '<Home>', lambda event: self._step(-len(self._rows)))
+        self.bind_class(self._tag, '<End>', lambda event: self._step(len(self._rows)))
+
+    def destroy(self):
+        for sequence in self.bind_class(self._tag):
+            self.unbind_class(self._tag, sequence)
+        super().destroy()
+
+    # -- data -----------------------------------------------------------
+
+    @property
+    def rows(self):
+        """The sequence of rows shown."""
+        return self._rows
+
+    def set_rows(self, rows):
+        """Show `rows` (value tuples, the first being the row's key) from the top."""
+        self._use(rows)
+        self._offset = 0
+        self._selected = None
+        self._pinned = None
+        self._row_of.clear()
+        self._render()
+
+    def update_rows(self, rows):
+        """
+        Show `rows` in place of the current ones, matched by key (first value).
+
+        Unlike `set_rows`, the row at the top and the selected row stay put
+        if their keys are still there, and only drawn items whose values
+        changed are rewritten: a refresh that changed nothing costs no item
+        update.
+        """
+        old = self._rows
+        selected = old[self._selected][0] if self._selected is not None else None
+        drawn = [(index, old[index][0]) for index in self._window()]
+        self._use(rows)
+        rows = self._rows
+        self._selected = self._find(selected, self._selected) if selected is not None else None
+        if self._selected is None:
+            self._pinned = None
+
+        # The first drawn row still present keeps its place on screen
+        offset = 0
+        for index, key in drawn:
+            found = self._find(key, index)
+            if found is not None:
+                offset = max(0, found - (index - self._offset))
+                break
+        self._offset = offset
+
+        # Hand every drawn item the new index of the row it shows, if that
+        # row is still in view, and rewrite it only if its values changed
+        window = self._window()
+        wanted = {rows[row][0]: row for row in window}
+        if self._selected is not None:
+            wanted[selected] = self._selected
+        for item in list(self._row_of):
+            row = wanted.get(self._values[item][0])
+            if row is None or (item == self._pinned) != (row == self._selected):
+                del self._row_of[item]
+                continue
+            self._row_of[item] = row
+            values = tuple(rows[row])
+            if values != self._values[item]:
+                self.item(item, values=values)
+                self._values[item] = values
+        self._render()
+
+    def upsert_row(self, row):
+        """
+        Show `row` in place of the row with the same key, or add it at the end.
+
+        Only the item drawing that row, if any, is rewritten, so saving one
+        patient costs the same whatever the length of the list.
+        """
+        index = self._find(row[0])
+        if index is None:
+            self._rows.append(row)
+            if self._keys is not None:
+                self._keys[row[0]] = len(self._rows) - 1
+        else:
+            self._rows[index] = row
+            for item, shown in self._row_of.items():
+                if shown == index and self._values[item] != tuple(row):
+                    self._values[item] = tuple(row)
+                    self.item(item, values=row)
+        self._render()
+
+    def remove_row(self, key):
+        """Remove the row with key `key`, if present; the rows below move up."""
+        index = self._find(key)
+        if index is None:
+            return
+        del self._rows[index]
+        self._keys = None
+        if self._selected == index:
+            self._selected = self._pinned = None
+        elif self._selected is not None and self._selected > index:
+            self._selected -= 1
+        for item, row in list(self._row_of.items()):
+            if row == index:
+                del self._row_of[item]
+            elif row > index:
+                self._row_of[item] = row - 1
+        if index < self._offset:
+            self._offset -= 1
+        self._render()
+
+    def clear_selection(self):
+        """Deselect the selected row, without firing <<TreeviewSelect>>."""
+        self._selected = self._pinned = None
+        self._render()
+
+    @property
+    def selected_index(self):
+        """Index in `rows` of the selected row, or None."""
+        return self._selected
+
+    def select_row(self, index):
+        """Select a row by index and scroll it into view, as a click would."""
+        if not self._rows:
+            return
+        index = max(0, min(index, len(self._rows) - 1))
+        self.see_row(index)
+        item = next(item for item in self._order if self._row_of[item] == index)
+        self._selected, self._pinned = index, item
+        self.selection_set(item)
+        super().focus(item)
+
+    def see_row(self, index):
+        """Scroll just enough for a row to be visible."""
+        if index < self._offset:
+            self._scroll_to(index)
+        elif index >= self._offset + self._visible:
+            self._scroll_to(index - self._visible + 1)
+
+    def focus(self, item=None):
+        """Return the selected row's item (even while scrolled away), or focus `item`."""
+        if item is None:
+            return self._pinned if self._selected is not None else ''
+        return super().focus(item)
+
+    # -- scrolling ------------------------------------------------------
+
+    def yview(self, *args):
+        """Report or move the virtual position, like Treeview.yview."""
+        count = len(self._rows)
+        if not args:
+            if not count:
+                return 0.0, 1.0
+            return self._offset / count, min(1.0, (self._offset + self._visible) / count)
+        if args[0] == 'moveto':
+            self._scroll_to(round(float(args[1]) * count))
+        elif args[0] == 'scroll':
+            step = self._visible if str(args[2]).startswith('page') else 1
+            self._scroll_by(int(args[1]) * step)
+
+    def yview_moveto(self, fraction):
+        self.yview('moveto', fraction)
+
+    def yview_scroll(self, number, what):
+        self.yview('scroll', number, what)
+
+    def configure(self, cnf=None, **kw):
+        if isinstance(cnf, dict) and 'yscrollcommand' in cnf:
+            cnf = dict(cnf)
+            self._yscrollcommand = cnf.pop('yscrollcommand')
+        if 'yscrollcommand' in kw:
+            self._yscrollcommand = kw.pop('yscrollcommand')
+            self._update_scrollbar()
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    def _scroll_to(self, offset):
+        offset = max(0, min(offset, len(self._rows) - self._visible))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _scroll_by(self, rows):
+        self._scroll_to(self._offset + rows)
+        return 'break'
+
+    def _on_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        notches = event.delta // 120 if abs(event.delta) >= 120 else (1 if event.delta > 0 else -1)
+        return self._scroll_by(-notches * WHEEL_ROWS)
+
+    def _step(self, rows):
+        if self._rows:
+            start = self._selected if self._selected is not None else self._offset - (rows > 0)
+            self.select_row(start + rows)
+        return 'break'
+
+    def _on_native_scroll(self, first, last):
+        # The Treeview scrolled its own items, e.g. to show an overscan row
+        # the user reached; turn that into a virtual scroll
+        first = float(first)
+        if first > 0 and self._order:
+            shift = round(first * len(self._order))
+            self.tk.call(self._w, 'yview', 'moveto', 0)
+            self._scroll_by(shift)
+
+    def _update_scrollbar(self):
+        if self._yscrollcommand:
+            self._yscrollcommand(*self.yview())
+
+    def _refit(self):
+        if self._order:
+            bbox = self.bbox(self._order[0])
+            if bbox:
+                self._header_height, self._row_height = bbox[1], bbox[3]
+        visible = max(1, (self.winfo_height() - self._header_height) // max(1, self._row_height))
+        if visible != self._visible:
+            self._visible = visible
+            self._render()
+
+    # -- items ----------------------------------------------------------
+
+    def _use(self, rows):
+        # Lists are copied, so editing rows never touches the caller's list
+        # (it may be a cached query result)
+        self._rows = rows if hasattr(rows, 'index_of') else list(rows)
+        self._keys = None
+
+    def _find(self, key, hint=-1):
+        # Index of the row keyed `key` (None if absent), looking at `hint` first
+        rows = self._rows
+        if 0 <= hint < len(rows) and rows[hint][0] == key:
+            return hint
+        if hasattr(rows, 'index_of'):
+            return rows.index_of(key)
+        if self._keys is None:
+            self._keys = {}
+            for index in range(len(rows) - 1, -1, -1):
+                self._keys[rows[index][0]] = index
+        return self._keys.get(key)
+
+    def _window(self):
+        count = len(self._rows)
+        self._offset = max(0, min(self._offset, count - self._visible))
+        return range(self._offset, min(count, self._offset + self._visible + self.overscan))
+
+    def _render(self):
+        window = self._window()
+        shown = {row: item for item, row in self._row_of.items()}
+        free = [item for item in self._items
+                if item != self._pinned and self._row_of.get(item) not in window]
+        order = []
+        for row in window:
+            item = shown.get(row)
+            if item is None:
+                item = free.pop() if free else self._new_item()
+                self._row_of[item] = row
+                self._values[item] = tuple(self._rows[row])
+                self.item(item, values=self._values[item])
+            order.append(item)
+        for item in free:
+            self._row_of.pop(item, None)
+
+        # The attached items whose rows are still in ascending order stay;
+        # the rest are detached and put back at their place, top down, so
+        # scrolling by one row moves a single item
+        drawn = set(order)
+        attached = [item for item in self._order if item in drawn]
+        kept = {attached[position] for position in
+                increasing_run([self._row_of[item] for item in attached])}
+        placed = [item for item in self._order if item not in kept]
+        if placed:
+            self.detach(*placed)
+        for index, item in enumerate(order):
+            if item not in kept:
+                self.move(item, '', index)
+        self._order = order
+        self.tk.call(self._w, 'yview', 'moveto', 0)
+
+        self._sync_selection()
+        self._update_scrollbar()
+
+    def _new_item(self):
+        item = f"v{len(self._items)}"
+        self.insert('', tk.END, iid=item)
+        self._items.append(item)
+        return item
+
+    def _sync_selection(self):
+        item = self._pinned if self._selected is not None else None
+        wanted = (item,) if item in self._order else ()
+        if tuple(self.selection()) != wanted:
+            self._mute()
+            self.selection_set(wanted)
+
+    def _mute(self):
+        # The <<TreeviewSelect>> of a programmatic change is queued; it is
+        # delivered before idle callbacks run
+        self._muted = True
+        self.after_idle(self._unmute)
+
+    def _unmute(self):
+        self._muted = False
+
+    def _on_select(self, event):
+        if self._muted:
+            return 'break'
+        selection = self.selection()
+        item = selection[0] if selection else None
+        if item in self._row_of:
+            self._selected, self._pinned = self._row_of[item], item
+        else:
+            self._selected = self._pinned = None
@@ -0,0 +1,138 @@
+# pulse/database/visit_history.py
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from database.db_worker import get_db_worker
+from database.date_index import refresh_date_index
+
+VISIT_PAGE_SIZE = 20     # visits shown per page of a patient's history
+VISIT_CACHE_SIZE = 64    # pages of history kept in memory
+
+# Walks idx_visit_dates_patient_id_visit_date backwards, so the visits come
+# out already in date order; undated visits (NULL) come last
+SELECT_VISIT_PAGE = (
+    "SELECT v.* FROM visit_dates d JOIN visits v ON v.id = d.visit_id "
+    "WHERE d.patient_id = ? ORDER BY d.visit_date DESC, d.visit_id DESC LIMIT ? OFFSET ?"
+)
+COUNT_VISITS = "SELECT COUNT(*) FROM visit_dates WHERE patient_id = ?"
+
+
+def fetch_visit_page(conn, patient_id, page=0, page_size=VISIT_PAGE_SIZE):
+    """
+    Return one page of a patient's visits, most recent first.
+
+    The lookup seeks the ISO visit date index by patient, so its cost
+    depends on the patient's own visits rather than the size of the table,
+    and stored dates in any format (the billing DateEntry writes m/d/yy)
+    sort correctly. Only the page's rows are read.
+
+    Returns:
+        tuple: (rows, page_count)
+    """
+    refresh_date_index(conn)
+    count = conn.execute(COUNT_VISITS, (int(patient_id),)).fetchone()[0]
+    rows = conn.execute(SELECT_VISIT_PAGE, (int(patient_id), page_size, page * page_size)).fetchall()
+    return rows, max(1, -(-count // page_size))
+
+
+class VisitHistory:
+    """
+    Paged visit history per patient, with prefetch.
+
+    Pages are read from SQL and the last few are kept in an LRU, so paging
+    back and reopening the billing window do not query again. Before a
+    cached page is used, the connection's data_version (commits by other
+    connections and processes) and total_changes (its own writes) are
+    compared with the values last seen on that connection, as PatientIndex
+    does; any move, or a connection seen for the first time, empties the
+    cache, so a visit written from anywhere shows up. `prefetch` reads a
+    patient's first page on the database worker when they are selected.
+    """
+
+    def __init__(self, db_path, page_size=VISIT_PAGE_SIZE, max_pages=VISIT_CACHE_SIZE):
+        self.db_path = db_path
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._pages = OrderedDict()     # (patient id, page) -> (rows, page_count)
+        self._versions = {}             # id(conn) -> (conn, (data_version, total_changes))
+        self._lock = threading.Lock()
+
+    def prefetch(self, patient_id):
+        """Read a patient's most recent visits on the database worker; returns the Future."""
+        return get_db_worker(self.db_path).submit(self.page, patient_id)
+
+    def page(self, conn, patient_id, page=0):
+        """
+        Return one page of a patient's visits.
+
+        Args:
+            conn (sqlite3.Connection): Connection used if the page is not cached.
+            patient_id (int): Patient id.
+            page (int): Page number, 0 being the most recent visits.
+
+        Returns:
+            tuple: (rows, page_count)
+        """
+        key = (int(patient_id), page)
+        refresh_date_index(conn)  # a visit written meanwhile is a change seen below
+        self._check(conn)
+        with self._lock:
+            cached = self._pages.get(key)
+            if cached is not None:
+                self._pages.move_to_end(key)
+                return cached
+        cached = fetch_visit_page(conn, patient_id, page, self.page_size)
+        with self._lock:
+            self._pages[key] = cached
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return cached
+
+    def invalidate(self, patient_id=None):
+        """Forget one patient's pages (or everyone's) after a write."""
+        with self._lock:
+            if patient_id is None:
+                self._pages.clear()
+            else:
+                for key in [key for key in self._pages if key[0] == int(patient_id)]:
+                    del self._pages[key]
+
+    def _check(self, conn):
+        # data_version only counts other connections' commits, and only
+        # within one connection, so each connection keeps its own baseline
+        seen = (conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+        with self._lock:
+            known = self._versions.get(id(conn))
+            if known is None:
+                # Holding the connection keeps its id from being reused
+                # while listed; closed ones are dropped here
+                self._versions = {key: value for key, value in self._versions.items()
+                                  if not _closed(value[0])}
+            if known is None or known[1] != seen:
+                self._versions[id(conn)] = (conn, seen)
+                self._pages.clear()
+
+
+def _closed(conn):
+    try:
+        conn.total_changes
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+_histories = {}
+_histories_lock = threading.Lock()
+
+
+def get_visit_history(db_path):
+    """Return the process-wide VisitHistory for a database file."""
+    key = os.path.abspath(db_path)
+    with _histories_lock:
+        history = _histories.get(key)
+        if history is None:
+            history = _histories[key] = VisitHistory(db_path)
+        return history